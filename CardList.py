@@ -1,4 +1,4 @@
-import yaml
+from yaml_io import YAMLError, load_yaml
 
 
 class CardList:
@@ -6,11 +6,11 @@ class CardList:
     def __init__(self, path, list_name):
         with open(path, 'r') as stream:
             try:
-                yaml_data = yaml.safe_load(stream)
+                yaml_data = load_yaml(stream)
                 card_list = list()
                 for cards in yaml_data:
                     card_list.append(cards)
-            except yaml.YAMLError as exc:
+            except YAMLError as exc:
                 print(exc)
         self.yaml_data = yaml_data
         self.card_list = card_list
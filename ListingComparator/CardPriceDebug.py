@@ -113,6 +113,10 @@ class CardPriceDebugger:
         self.debug_file_contents(file1_path)
         self.debug_file_contents(file2_path)
         
+        if self.parser.cache is not None:
+            cache = self.parser.cache
+            print(f"\nSnapshot cache ({cache.cache_dir}): {cache.hits} hits, {cache.misses} misses")
+
         print("\n=== STARTING COMPARISON ===")
         try:
             results = self.parser.compare_dates(date1, date2)
@@ -0,0 +1,294 @@
+"""
+Card Price Engine - Multi-date comparisons
+Loads any number of snapshot dates once into a card x date x metric array and
+answers pairwise, rolling and first-vs-last comparisons from that structure.
+"""
+
+import csv
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from CardPriceParser import CardPriceParser, CardPriceData, CardEntry, DEFAULT_LIST_NAME
+
+METRICS = ('min', 'max', 'mean', 'median', 'quantity')
+PRICE_METRICS = METRICS[:4]
+
+
+class CardPriceEngine:
+    """Comparison engine over a cached card x date x metric array."""
+
+    def __init__(self, parser: Optional[CardPriceParser] = None, list_name: str = DEFAULT_LIST_NAME,
+                 workers: Optional[int] = None):
+        """
+        Initialize the engine with a parser used to read snapshot files.
+
+        Args:
+            parser: CardPriceParser instance; a default one is created if omitted
+            list_name: List whose snapshots are compared
+            workers: Number of processes used to parse new dates, defaults to the CPU count
+        """
+        self.parser = parser or CardPriceParser()
+        self.list_name = list_name
+        self.workers = workers
+        self.dates: List[str] = []
+        self.card_keys: List[str] = []
+        self.card_index: Dict[str, int] = {}
+        self.file_order: Dict[str, List[int]] = {}  # Card rows per date in file order
+        self.cube = np.full((0, 0, len(METRICS)), np.nan)
+
+    def available_dates(self, start: Optional[str] = None, end: Optional[str] = None) -> List[str]:
+        """
+        List snapshot dates that have a file on disk, optionally within a range.
+
+        Args:
+            start: First date to include in YYYY-MM-DD format
+            end: Last date to include in YYYY-MM-DD format
+
+        Returns:
+            Sorted list of dates in YYYY-MM-DD format
+        """
+        return [date_str for date_str, list_files in self.parser.build_directory_index().items()
+                if self.list_name in list_files and
+                (start is None or date_str >= start) and (end is None or date_str <= end)]
+
+    def load_range(self, start: str, end: str) -> 'CardPriceEngine':
+        """
+        Load every snapshot date between start and end inclusive.
+
+        Args:
+            start: First date in YYYY-MM-DD format
+            end: Last date in YYYY-MM-DD format
+
+        Returns:
+            The engine, for chaining
+        """
+        return self.load_dates(self.available_dates(start, end))
+
+    def load_dates(self, dates: List[str]) -> 'CardPriceEngine':
+        """
+        Parse each date's snapshot once and add it to the array.
+
+        Dates already loaded are not parsed again.
+
+        Args:
+            dates: Dates in YYYY-MM-DD format
+
+        Returns:
+            The engine, for chaining
+
+        Raises:
+            FileNotFoundError: If a date has no snapshot file
+        """
+        new_dates = sorted(set(dates) - set(self.dates))
+        if not new_dates:
+            return self
+
+        list_files = [(date_str, self.parser.parse_date_to_path(date_str, self.list_name)) for date_str in new_dates]
+        parsed = dict(self.parser.parse_lists(list_files, self.workers))
+
+        for date_str in new_dates:
+            for card_key, _, _ in parsed[date_str]:
+                if card_key not in self.card_index:
+                    self.card_index[card_key] = len(self.card_keys)
+                    self.card_keys.append(card_key)
+
+        all_dates = sorted(self.dates + new_dates)
+        cube = np.full((len(self.card_keys), len(all_dates), len(METRICS)), np.nan)
+        if self.dates:
+            old_columns = [all_dates.index(date_str) for date_str in self.dates]
+            cube[:self.cube.shape[0], old_columns, :] = self.cube
+
+        for date_str in new_dates:
+            column = all_dates.index(date_str)
+            rows = []
+            for card_key, data, qty in parsed[date_str]:
+                row = self.card_index[card_key]
+                cube[row, column] = (data.min_price, data.max_price, data.mean_price, data.median_price, qty)
+                rows.append(row)
+            self.file_order[date_str] = rows
+
+        self.dates = all_dates
+        self.cube = cube
+        return self
+
+    def _column(self, date_str: str) -> int:
+        if date_str not in self.dates:
+            self.load_dates([date_str])
+        return self.dates.index(date_str)
+
+    def price_data(self, row: int, column: int) -> CardPriceData:
+        """Rebuild the CardPriceData for one card on one date."""
+        values = self.cube[row, column]
+        return CardPriceData(
+            min_price=float(values[0]),
+            max_price=float(values[1]),
+            mean_price=float(values[2]),
+            median_price=float(values[3]),
+            quantity=int(values[4])
+        )
+
+    def difference_arrays(self, date1: str, date2: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Vectorised differences between two dates for every card.
+
+        Args:
+            date1: First date in YYYY-MM-DD format
+            date2: Second date in YYYY-MM-DD format
+
+        Returns:
+            Tuple of (common_mask, absolute_diffs, percent_diffs); the diff
+            arrays are card x price metric and NaN where a card is missing
+        """
+        self.load_dates([date1, date2])  # Before taking columns, loading a date shifts the later ones
+        values1 = self.cube[:, self._column(date1), :]
+        values2 = self.cube[:, self._column(date2), :]
+        common = ~np.isnan(values1[:, 0]) & ~np.isnan(values2[:, 0])
+
+        abs_diffs = values2[:, :4] - values1[:, :4]
+        old_values = values1[:, :4]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent_diffs = np.where(old_values != 0, (abs_diffs / old_values) * 100, 0.0)
+        return common, abs_diffs, percent_diffs
+
+    def compare(self, date1: str, date2: str) -> List[CardEntry]:
+        """
+        Compare card prices between two loaded dates.
+
+        Produces the same entries as CardPriceParser.compare_dates without
+        reading either file again.
+
+        Args:
+            date1: First date in YYYY-MM-DD format
+            date2: Second date in YYYY-MM-DD format
+
+        Returns:
+            List of CardEntry objects in the first date's file order
+        """
+        common = self.difference_arrays(date1, date2)[0]
+        column1, column2 = self._column(date1), self._column(date2)
+        list_name = self.list_name if self.list_name != DEFAULT_LIST_NAME else ''
+
+        results = []
+        for row in self.file_order[date1]:
+            if not common[row]:
+                continue
+            data1 = self.price_data(row, column1)
+            data2 = self.price_data(row, column2)
+            # Same builder as compare_dates / compare_collections, so the entries cannot drift apart
+            entry = self.parser.build_card_entry(self.card_keys[row], data1, data2, data1.quantity,
+                                                 data2.quantity, date1, date2)
+            entry.list_name = list_name
+            results.append(entry)
+        return results
+
+    def compare_pairs(self, pairs: List[Tuple[str, str]]) -> Dict[Tuple[str, str], List[CardEntry]]:
+        """
+        Compare several date pairs, loading any missing dates once up front.
+
+        Args:
+            pairs: List of (date1, date2) tuples
+
+        Returns:
+            Dictionary of (date1, date2) to comparison results
+        """
+        self.load_dates([date_str for pair in pairs for date_str in pair])
+        return {(date1, date2): self.compare(date1, date2) for date1, date2 in pairs}
+
+    def rolling(self, window: int = 1) -> Dict[Tuple[str, str], List[CardEntry]]:
+        """
+        Compare each loaded date with the date ``window`` snapshots later.
+
+        Args:
+            window: Number of snapshots between the compared dates
+
+        Returns:
+            Dictionary of (date1, date2) to comparison results in date order
+        """
+        pairs = [(self.dates[i], self.dates[i + window]) for i in range(len(self.dates) - window)]
+        return self.compare_pairs(pairs)
+
+    def first_vs_last(self) -> List[CardEntry]:
+        """Compare the earliest and latest loaded dates."""
+        if len(self.dates) < 2:
+            return []
+        return self.compare(self.dates[0], self.dates[-1])
+
+    def export_comparisons(self, comparisons: Dict[Tuple[str, str], List[CardEntry]]) -> List[str]:
+        """
+        Export every comparison to its own CSV file.
+
+        Args:
+            comparisons: Output of compare_pairs, rolling or similar
+
+        Returns:
+            Paths to the created CSV files
+        """
+        return [self.parser.export_to_csv(results) for results in comparisons.values() if results]
+
+    def export_history_csv(self, filename: Optional[str] = None) -> str:
+        """
+        Export the whole card x date x metric array as one long-format CSV.
+
+        Args:
+            filename: Optional filename, will generate one if not provided
+
+        Returns:
+            Path to the created CSV file
+        """
+        output_dir = Path("card_price_comparisons")
+        output_dir.mkdir(exist_ok=True)
+
+        if not filename:
+            if self.dates:
+                filename = f"history_{self.dates[0]}_to_{self.dates[-1]}.csv"
+            else:
+                filename = f"history_{datetime.now().strftime('%Y-%m-%d')}.csv"
+
+        filepath = output_dir / filename
+        with open(filepath, 'w', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['card_name', 'condition', 'date', *METRICS])
+            for row, card_key in enumerate(self.card_keys):
+                name, condition = self.parser.split_card_key(card_key)
+                for column, date_str in enumerate(self.dates):
+                    values = self.cube[row, column]
+                    if np.isnan(values[0]):
+                        continue
+                    writer.writerow([name, condition, date_str,
+                                     *[float(value) for value in values[:4]], int(values[4])])
+
+        print(f"History exported to: {filepath}")
+        return str(filepath)
+
+
+def main():
+    """Main entry point for multi-date comparisons."""
+    engine = CardPriceEngine()
+
+    # Example usage
+    start_date = "2025-01-01"
+    end_date = "2025-12-31"
+
+    try:
+        engine.load_range(start_date, end_date)
+        print(f"Loaded {len(engine.dates)} dates and {len(engine.card_keys)} cards")
+
+        results = engine.first_vs_last()
+        engine.parser.print_comparison_report(results)
+        if results:
+            engine.parser.export_to_csv(results)
+
+        engine.export_comparisons(engine.rolling())
+        engine.export_history_csv()
+
+    except FileNotFoundError as e:
+        print(f"Error: {e}")
+    except Exception as e:
+        print(f"Unexpected error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,13 +3,19 @@ Card Price Parser - Production Version
 Analyzes and compares Yu-Gi-Oh card prices across different dates.
 """
 
+import io
+import json
+import os
 import re
 import csv
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 from dataclasses import dataclass
 from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 
+from SnapshotCache import SnapshotCache
+
 
 @dataclass
 class CardPriceData:
@@ -39,26 +45,45 @@ class CardEntry:
     quantity_diff: int
     date1: str
     date2: str
+    list_name: str = ''
+
+
+DEFAULT_LIST_NAME = "max_rarity_binder"
+LIST_FILE_PATTERN = re.compile(r'^(?P<list_name>.+)-(?P<date>\d{4}-\d{2}-\d{2})\.txt$')
+SIDECAR_SUFFIX = '.jsonl'  # Structured twin of each snapshot, written by the scraper since it was added
+DAY_FOLDER_PATTERN = re.compile(r'^\d{4}/\d{2}-[A-Za-z]{3}/\d{2}$')
+
+
+def _parse_list_file(base_path: str, cache_dir: Optional[str], list_name: str,
+                     file_path: Path) -> Tuple[str, List[Tuple[str, CardPriceData, int]]]:
+    """Worker entry point for parsing one list file in a separate process."""
+    parser = CardPriceParser(base_path, cache_dir)
+    return list_name, parser.parse_file(file_path)
 
 
 class CardPriceParser:
     """Parser for Yu-Gi-Oh card price data files."""
 
-    def __init__(self, base_path: str = "../full_listings"):
+    def __init__(self, base_path: str = "../full_listings", cache_dir: Optional[str] = "snapshot_cache"):
         """
         Initialize the parser with the base directory path.
 
         Args:
             base_path: Base directory containing the price data files
+            cache_dir: Directory for pre-parsed snapshot cache files, None to disable caching
         """
         self.base_path = Path(base_path)
+        self.cache_dir = cache_dir
+        self.cache = SnapshotCache(cache_dir) if cache_dir else None
+        self._directory_index: Optional[Dict[str, Dict[str, Path]]] = None
     
-    def parse_date_to_path(self, date_str: str) -> Path:
+    def parse_date_to_path(self, date_str: str, list_name: str = DEFAULT_LIST_NAME) -> Path:
         """
         Convert a date string to the corresponding file path.
         
         Args:
             date_str: Date in format "YYYY-MM-DD"
+            list_name: List the snapshot belongs to, e.g. "collection_old_school"
             
         Returns:
             Path object to the file
@@ -72,11 +97,127 @@ class CardPriceParser:
             month = date_obj.strftime("%m-%b")  # "07-Jul"
             day = date_obj.strftime("%d")
             
-            filename = f"max_rarity_binder-{date_str}.txt"
+            filename = f"{list_name}-{date_str}.txt"
             return self.base_path / year / month / day / filename
         except ValueError as e:
             raise ValueError(f"Invalid date format. Please use YYYY-MM-DD: {e}")
     
+    def build_directory_index(self, refresh: bool = False) -> Dict[str, Dict[str, Path]]:
+        """
+        Index every list file in the regular YYYY/MM-Mon/DD day folders.
+
+        Side folders such as "pre iqr" or "19 - updated buylist" are skipped.
+
+        Args:
+            refresh: Rescan the directory tree even if an index already exists
+
+        Returns:
+            Dictionary of date to {list_name: file path}
+        """
+        if self._directory_index is not None and not refresh:
+            return self._directory_index
+
+        index: Dict[str, Dict[str, Path]] = {}
+        for dirpath, _, filenames in os.walk(self.base_path):
+            relative_dir = Path(dirpath).relative_to(self.base_path).as_posix()
+            if not DAY_FOLDER_PATTERN.match(relative_dir):
+                continue
+            for filename in filenames:
+                match = LIST_FILE_PATTERN.match(filename)
+                if match:
+                    index.setdefault(match.group('date'), {})[match.group('list_name')] = Path(dirpath) / filename
+
+        self._directory_index = {date_str: dict(sorted(lists.items())) for date_str, lists in sorted(index.items())}
+        return self._directory_index
+
+    def list_files_for_date(self, date_str: str) -> Dict[str, Path]:
+        """
+        Get every list file scraped on a date.
+
+        Args:
+            date_str: Date in format "YYYY-MM-DD"
+
+        Returns:
+            Dictionary of list name to file path, sorted by list name
+        """
+        self.parse_date_to_path(date_str)  # Validates the date format
+        return self.build_directory_index().get(date_str, {})
+
+    def parse_lists(self, list_files: List[Tuple[str, Path]],
+                    workers: Optional[int] = None) -> List[Tuple[str, List[Tuple[str, CardPriceData, int]]]]:
+        """
+        Parse several list files, using a process pool when there is more than one.
+
+        Args:
+            list_files: List of (label, file_path) tuples, the label is usually the list name
+            workers: Number of worker processes, defaults to the CPU count
+
+        Returns:
+            List of (label, parsed cards) tuples in input order
+        """
+        if workers == 1 or len(list_files) <= 1:
+            return [(list_name, self.parse_file(file_path)) for list_name, file_path in list_files]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_parse_list_file, str(self.base_path), self.cache_dir, list_name, file_path)
+                       for list_name, file_path in list_files]
+            return [future.result() for future in futures]
+
+    def parse_date(self, date_str: str,
+                   workers: Optional[int] = None) -> Dict[Tuple[str, str, str], Tuple[CardPriceData, int]]:
+        """
+        Parse every list scraped on a date into one combined dataset.
+
+        Args:
+            date_str: Date in format "YYYY-MM-DD"
+            workers: Number of worker processes, defaults to the CPU count
+
+        Returns:
+            Dictionary of (list_name, card_name, condition) to (CardPriceData, quantity)
+
+        Raises:
+            FileNotFoundError: If no list files exist for the date
+        """
+        return self.parse_dates([date_str], workers)[date_str]
+
+    def parse_dates(self, dates: List[str], workers: Optional[int] = None
+                    ) -> Dict[str, Dict[Tuple[str, str, str], Tuple[CardPriceData, int]]]:
+        """
+        Parse every list for several dates in a single process pool.
+
+        Args:
+            dates: Dates in format "YYYY-MM-DD"
+            workers: Number of worker processes, defaults to the CPU count
+
+        Returns:
+            Dictionary of date to combined dataset, see parse_date
+
+        Raises:
+            FileNotFoundError: If no list files exist for one of the dates
+        """
+        jobs = []
+        for date_str in dates:
+            list_files = self.list_files_for_date(date_str)
+            if not list_files:
+                raise FileNotFoundError(f"No list files found for {date_str} in {self.base_path}")
+            jobs.extend((date_str, list_name, file_path) for list_name, file_path in list_files.items())
+
+        parsed = self.parse_lists([(list_name, file_path) for _, list_name, file_path in jobs], workers)
+
+        datasets: Dict[str, Dict[Tuple[str, str, str], Tuple[CardPriceData, int]]] = {date_str: {} for date_str in dates}
+        for (date_str, _, _), (list_name, cards_data) in zip(jobs, parsed):
+            for card_key, price_data, quantity in cards_data:
+                name, condition = self.split_card_key(card_key)
+                datasets[date_str][(list_name, name, condition)] = (price_data, quantity)
+        return datasets
+
+    def split_card_key(self, card_key: str) -> Tuple[str, str]:
+        """Split a "Card Name - Condition" key into its name and condition."""
+        parts = card_key.rsplit(' - ', 1)
+        name = parts[0] if len(parts) == 2 else card_key
+        condition = parts[1] if len(parts) == 2 else "Unknown"
+        return name, condition
+
     def extract_card_info(self, line: str) -> Tuple[str, str, int]:
         """
         Extract card name, condition, and quantity from the header line.
@@ -147,12 +288,70 @@ class CardPriceParser:
         """
         if not file_path.exists():
             raise FileNotFoundError(f"File not found: {file_path}")
-        
-        cards_data = []
-        
+
+        sidecar_path = file_path.with_suffix(SIDECAR_SUFFIX)
+        if sidecar_path.exists():
+            return self.parse_sidecar(sidecar_path)
+
+        if self.cache is not None:
+            records = self.cache.load(file_path, self._parse_raw_records, self.base_path)
+            return [(card_key, CardPriceData(min_price, max_price, mean_price, median_price, quantity), quantity)
+                    for card_key, min_price, max_price, mean_price, median_price, quantity in records]
+
         with open(file_path, 'r', encoding='utf-8') as file:
             lines = file.readlines()
-        
+        return self.parse_lines(lines)
+
+    def parse_sidecar(self, sidecar_path: Path) -> List[Tuple[str, CardPriceData, int]]:
+        """
+        Read a snapshot's JSON Lines sidecar instead of parsing its text tables.
+
+        Timed out cards have no table in the text file and are skipped here too,
+        so both sources yield the same entries.
+
+        Args:
+            sidecar_path: Path to the .jsonl sidecar
+
+        Returns:
+            List of tuples: (card_key, CardPriceData, quantity) in file order
+        """
+        cards_data = []
+        with open(sidecar_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if record['status'] == 'timeout':
+                    continue
+                quantity = int(record['listings'])
+                price_data = CardPriceData(
+                    min_price=float(record['min']),
+                    max_price=float(record['max']),
+                    mean_price=float(record['mean']),
+                    median_price=float(record['median']),
+                    quantity=quantity
+                )
+                cards_data.append((f"{record['card']} - {record['condition']}", price_data, quantity))
+        return cards_data
+
+    def _parse_raw_records(self, raw: bytes) -> List[Tuple[str, float, float, float, float, int]]:
+        """Parse raw file bytes into flat records for the snapshot cache."""
+        lines = io.StringIO(raw.decode('utf-8'), newline=None).readlines()
+        return [(card_key, data.min_price, data.max_price, data.mean_price, data.median_price, quantity)
+                for card_key, data, quantity in self.parse_lines(lines)]
+
+    def parse_lines(self, lines: List[str]) -> List[Tuple[str, CardPriceData, int]]:
+        """
+        Extract all card data from the lines of a snapshot file.
+
+        Args:
+            lines: All lines from the file
+
+        Returns:
+            List of tuples: (card_key, CardPriceData, quantity) in file order
+        """
+        cards_data = []
+
         i = 0
         while i < len(lines):
             line = lines[i].strip()
@@ -270,37 +469,79 @@ class CardPriceParser:
             if card_key in cards2_dict:
                 data2, qty2 = cards2_dict[card_key]
                 
-                # Calculate differences
-                abs_diffs, percent_diffs = self.calculate_differences(data1, data2)
-                
-                # Parse card name and condition
-                parts = card_key.rsplit(' - ', 1)
-                name = parts[0] if len(parts) == 2 else card_key
-                condition = parts[1] if len(parts) == 2 else "Unknown"
-                
-                # Create CardEntry object
-                entry = CardEntry(
-                    name=name,
-                    condition=condition,
-                    date1_data=data1,
-                    date2_data=data2,
-                    min_diff=abs_diffs['min'],
-                    max_diff=abs_diffs['max'],
-                    mean_diff=abs_diffs['mean'],
-                    median_diff=abs_diffs['median'],
-                    min_percent=percent_diffs['min'],
-                    max_percent=percent_diffs['max'],
-                    mean_percent=percent_diffs['mean'],
-                    median_percent=percent_diffs['median'],
-                    quantity_diff=qty2 - qty1,
-                    date1=date1,
-                    date2=date2
-                )
-                
+                entry = self.build_card_entry(card_key, data1, data2, qty1, qty2, date1, date2)
                 comparison_results.append(entry)
         
         return comparison_results
     
+    def compare_collections(self, date1: str, date2: str, workers: Optional[int] = None) -> List[CardEntry]:
+        """
+        Compare every list scraped on both dates in one call.
+
+        All list files for both dates are parsed together across worker processes.
+
+        Args:
+            date1: First date in YYYY-MM-DD format
+            date2: Second date in YYYY-MM-DD format
+            workers: Number of worker processes, defaults to the CPU count
+
+        Returns:
+            List of CardEntry objects with list_name set, ordered by list then first date's file order
+        """
+        datasets = self.parse_dates([date1, date2], workers)
+        dataset2 = datasets[date2]
+
+        comparison_results = []
+        for key, (data1, qty1) in datasets[date1].items():
+            if key in dataset2:
+                list_name, name, condition = key
+                data2, qty2 = dataset2[key]
+                entry = self.build_card_entry(f"{name} - {condition}", data1, data2, qty1, qty2, date1, date2)
+                entry.list_name = list_name
+                comparison_results.append(entry)
+
+        return comparison_results
+
+    def build_card_entry(self, card_key: str, data1: CardPriceData, data2: CardPriceData,
+                         qty1: int, qty2: int, date1: str, date2: str) -> CardEntry:
+        """
+        Build the comparison entry for one card present on both dates.
+
+        Args:
+            card_key: "Card Name - Condition" key from the parsed files
+            data1: First date's price data
+            data2: Second date's price data
+            qty1: First date's quantity
+            qty2: Second date's quantity
+            date1: First date in YYYY-MM-DD format
+            date2: Second date in YYYY-MM-DD format
+
+        Returns:
+            CardEntry with absolute and percentage differences
+        """
+        abs_diffs, percent_diffs = self.calculate_differences(data1, data2)
+
+        # Parse card name and condition
+        name, condition = self.split_card_key(card_key)
+
+        return CardEntry(
+            name=name,
+            condition=condition,
+            date1_data=data1,
+            date2_data=data2,
+            min_diff=abs_diffs['min'],
+            max_diff=abs_diffs['max'],
+            mean_diff=abs_diffs['mean'],
+            median_diff=abs_diffs['median'],
+            min_percent=percent_diffs['min'],
+            max_percent=percent_diffs['max'],
+            mean_percent=percent_diffs['mean'],
+            median_percent=percent_diffs['median'],
+            quantity_diff=qty2 - qty1,
+            date1=date1,
+            date2=date2
+        )
+
     def format_direction_arrow(self, value: float) -> str:
         """
         Return a colored arrow indicating price direction.
@@ -394,12 +635,15 @@ class CardPriceParser:
                 'min_percent', 'max_percent', 'mean_percent', 'median_percent',
                 'quantity_diff'
             ]
+            include_list_name = any(entry.list_name for entry in results)
+            if include_list_name:
+                fieldnames.insert(0, 'list_name')
 
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
             writer.writeheader()
 
             for entry in results:
-                writer.writerow({
+                row = {
                     'card_name': entry.name,
                     'condition': entry.condition,
                     'date1': entry.date1,
@@ -423,19 +667,24 @@ class CardPriceParser:
                     'mean_percent': entry.mean_percent,
                     'median_percent': entry.median_percent,
                     'quantity_diff': entry.quantity_diff
-                })
+                }
+                if include_list_name:
+                    row['list_name'] = entry.list_name
+                writer.writerow(row)
 
         print(f"Results exported to: {filepath}")
         return str(filepath)
 
 
-def main():
-    """Main entry point for the card price comparison tool."""
-    parser = CardPriceParser()
+def main(date1: str = "2025-02-07", date2: str = "2025-07-14", parser: Optional[CardPriceParser] = None):
+    """Main entry point for the card price comparison tool.
 
-    # Example usage
-    date1 = "2025-02-07"
-    date2 = "2025-07-14"
+    Args:
+        date1: Earlier snapshot date, "YYYY-MM-DD"
+        date2: Later snapshot date, "YYYY-MM-DD"
+        parser: Parser to reuse, e.g. the warm one held by the repo root cli.py daemon
+    """
+    parser = parser or CardPriceParser()
 
     try:
         results = parser.compare_dates(date1, date2)
@@ -454,4 +703,5 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import sys
+    main(*sys.argv[1:3])
@@ -0,0 +1,122 @@
+"""
+Snapshot Cache - Pre-parsed full_listings files
+Stores each parsed snapshot as a compact binary file next to a hash of the
+source text so unchanged snapshots never have to be parsed again.
+"""
+
+import hashlib
+import os
+import struct
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+CACHE_MAGIC = b'CPS1'
+HEADER = struct.Struct('<4s20sQqI')  # magic, sha1, source size, source mtime_ns, record count
+KEY_LENGTH = struct.Struct('<H')
+RECORD = struct.Struct('<4di')  # min, max, mean, median, quantity
+
+
+class SnapshotCache:
+    """On-disk cache of parsed snapshot files keyed by source content hash."""
+
+    def __init__(self, cache_dir: str = "snapshot_cache"):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: Directory holding the binary cache files
+        """
+        self.cache_dir = Path(cache_dir)
+        self.hits = 0
+        self.misses = 0
+
+    def cache_path(self, file_path: Path, base_path: Optional[Path] = None) -> Path:
+        """
+        Map a snapshot file to its cache file.
+
+        Args:
+            file_path: Path to the snapshot text file
+            base_path: Root of the snapshot tree, used to mirror its layout
+
+        Returns:
+            Path of the binary cache file
+        """
+        try:
+            relative = Path(file_path).resolve().relative_to(Path(base_path).resolve())
+        except (TypeError, ValueError):
+            relative = Path(hashlib.sha1(str(Path(file_path).resolve()).encode('utf-8')).hexdigest())
+        return self.cache_dir / relative.with_name(relative.name + '.bin')
+
+    def load(self, file_path: Path, parse: Callable[[bytes], List[Tuple]],
+             base_path: Optional[Path] = None) -> List[Tuple]:
+        """
+        Return parsed records for a snapshot, parsing only if it changed.
+
+        The cache is trusted when the source size and modification time match.
+        Otherwise the source is hashed and only reparsed if its content changed.
+
+        Args:
+            file_path: Path to the snapshot text file
+            parse: Function turning the raw file bytes into
+                (card_key, min, max, mean, median, quantity) tuples
+            base_path: Root of the snapshot tree
+
+        Returns:
+            List of (card_key, min, max, mean, median, quantity) tuples in file order
+
+        Raises:
+            FileNotFoundError: If file doesn't exist
+        """
+        file_path = Path(file_path)
+        stat = file_path.stat()
+        cache_file = self.cache_path(file_path, base_path)
+        cached = self._read(cache_file)
+
+        if cached and cached[1] == stat.st_size and cached[2] == stat.st_mtime_ns:
+            self.hits += 1
+            return cached[3]
+
+        raw = file_path.read_bytes()
+        digest = hashlib.sha1(raw).digest()
+        if cached and cached[0] == digest:
+            records = cached[3]
+            self.hits += 1
+        else:
+            records = parse(raw)
+            self.misses += 1
+        self._write(cache_file, digest, stat, records)
+        return records
+
+    def _read(self, cache_file: Path) -> Optional[Tuple[bytes, int, int, List[Tuple]]]:
+        try:
+            data = cache_file.read_bytes()
+            magic, digest, size, mtime_ns, count = HEADER.unpack_from(data, 0)
+            if magic != CACHE_MAGIC:
+                return None
+            offset = HEADER.size
+            records = []
+            for _ in range(count):
+                (key_length,) = KEY_LENGTH.unpack_from(data, offset)
+                offset += KEY_LENGTH.size
+                card_key = data[offset:offset + key_length].decode('utf-8')
+                offset += key_length
+                records.append((card_key, *RECORD.unpack_from(data, offset)))
+                offset += RECORD.size
+            return digest, size, mtime_ns, records
+        except (OSError, struct.error, UnicodeDecodeError):
+            return None
+
+    def _write(self, cache_file: Path, digest: bytes, stat: os.stat_result, records: List[Tuple]) -> None:
+        chunks = [HEADER.pack(CACHE_MAGIC, digest, stat.st_size, stat.st_mtime_ns, len(records))]
+        for card_key, min_price, max_price, mean_price, median_price, quantity in records:
+            encoded_key = card_key.encode('utf-8')
+            chunks.append(KEY_LENGTH.pack(len(encoded_key)))
+            chunks.append(encoded_key)
+            chunks.append(RECORD.pack(min_price, max_price, mean_price, median_price, quantity))
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = cache_file.with_name(cache_file.name + '.tmp')
+            temp_file.write_bytes(b''.join(chunks))
+            os.replace(temp_file, cache_file)
+        except OSError as e:
+            print(f"Error writing snapshot cache {cache_file}: {e}")
@@ -0,0 +1,212 @@
+"""
+Image Match Index
+Prebuilt, persisted index over the card image folder used by the infographic
+generator to find the best image for a card name without rescoring every file.
+"""
+
+import os
+import pickle
+import re
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+INDEX_VERSION = 1
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz0123456789'
+MATCH_THRESHOLD = 0.5  # Minimum combined score for a match to be returned
+
+
+def normalize_string(s: str) -> str:
+    """Normalize string for comparison by removing special characters and spaces"""
+    return re.sub(r'[^a-zA-Z0-9]', '', s.lower())
+
+
+class ImageMatchIndex:
+    """
+    Character-count index over every ``*.jpg`` under the image folder.
+
+    Scoring is unchanged from the original linear scan: the SequenceMatcher
+    ratio of the normalised names averaged with the fraction of card words
+    found in the filename. The index stores each filename's character counts so
+    an upper bound on that score (difflib's ``quick_ratio``) can be computed for
+    every image in one vectorised step. Exact scoring then runs on candidates in
+    descending bound order and stops as soon as no remaining candidate can beat
+    the best score, so the chosen image is always identical to a full scan.
+    """
+
+    def __init__(self, image_folder: Path):
+        """
+        Initialize an empty index for the given image folder.
+
+        Args:
+            image_folder: Root directory containing the card images
+        """
+        self.image_folder = Path(image_folder)
+        self.signature: Tuple = ()
+        self.paths: List[str] = []
+        self.stems_lower = np.array([], dtype=str)
+        self.normalized: List[str] = []
+        self.lengths = np.zeros(0, dtype=np.int64)
+        self.char_counts = np.zeros((0, len(ALPHABET)), dtype=np.int32)
+        self.filename_paths: Dict[str, str] = {}
+
+    @classmethod
+    def load_or_build(cls, image_folder: Path, cache_path: Path) -> 'ImageMatchIndex':
+        """
+        Load the persisted index, rebuilding it if the image folder changed.
+
+        Args:
+            image_folder: Root directory containing the card images
+            cache_path: Location of the pickled index
+
+        Returns:
+            An index that is current for the image folder
+        """
+        index = cls(image_folder)
+        signature = index._folder_signature()
+
+        if cache_path.exists():
+            try:
+                with open(cache_path, 'rb') as file:
+                    cached = pickle.load(file)
+                if (cached.get('version') == INDEX_VERSION and
+                        cached.get('image_folder') == str(index.image_folder) and
+                        cached.get('signature') == signature):
+                    index._restore(cached)
+                    return index
+            except (OSError, pickle.UnpicklingError, EOFError, AttributeError, KeyError) as e:
+                print(f"Ignoring unreadable image index cache: {e}")
+
+        index.build(signature)
+        try:
+            with open(cache_path, 'wb') as file:
+                pickle.dump(index._state(), file, protocol=pickle.HIGHEST_PROTOCOL)
+        except OSError as e:
+            print(f"Error saving image index cache: {e}")
+        return index
+
+    def _folder_signature(self) -> Tuple:
+        """Directory modification times; adding, removing or renaming an image changes them."""
+        if not self.image_folder.exists():
+            return ()
+        signature = []
+        for dirpath, _, _ in os.walk(self.image_folder):
+            signature.append((os.path.relpath(dirpath, self.image_folder), os.stat(dirpath).st_mtime_ns))
+        return tuple(sorted(signature))
+
+    def build(self, signature: Optional[Tuple] = None) -> None:
+        """Scan the image folder and build the index."""
+        self.signature = self._folder_signature() if signature is None else signature
+        if not self.image_folder.exists():
+            return
+
+        # Same glob as the original scan so ties resolve to the same file
+        image_paths = list(self.image_folder.glob("**/*.jpg"))
+        self.paths = [str(path) for path in image_paths]
+        self.stems_lower = np.array([path.stem.lower() for path in image_paths], dtype=str)
+        self.normalized = [normalize_string(path.stem) for path in image_paths]
+        self.lengths = np.array([len(name) for name in self.normalized], dtype=np.int64)
+        self.char_counts = np.zeros((len(self.normalized), len(ALPHABET)), dtype=np.int32)
+        for row, name in enumerate(self.normalized):
+            self.char_counts[row] = self._count_chars(name)
+
+        # First path for every filename, in the order glob("**/<name>") would return it
+        self.filename_paths = {}
+        for path in self.image_folder.glob("**/*"):
+            key = os.path.normcase(path.name)
+            if key not in self.filename_paths and path.is_file():
+                self.filename_paths[key] = str(path)
+
+    def _state(self) -> dict:
+        return {
+            'version': INDEX_VERSION,
+            'image_folder': str(self.image_folder),
+            'signature': self.signature,
+            'paths': self.paths,
+            'stems_lower': self.stems_lower,
+            'normalized': self.normalized,
+            'lengths': self.lengths,
+            'char_counts': self.char_counts,
+            'filename_paths': self.filename_paths,
+        }
+
+    def _restore(self, state: dict) -> None:
+        self.signature = state['signature']
+        self.paths = state['paths']
+        self.stems_lower = state['stems_lower']
+        self.normalized = state['normalized']
+        self.lengths = state['lengths']
+        self.char_counts = state['char_counts']
+        self.filename_paths = state['filename_paths']
+
+    @staticmethod
+    def _count_chars(name: str) -> np.ndarray:
+        counts = np.zeros(len(ALPHABET), dtype=np.int32)
+        for char in name:
+            counts[ALPHABET.index(char)] += 1
+        return counts
+
+    def find_filename(self, filename: str) -> Optional[str]:
+        """
+        Find the first image with the given filename in any subdirectory.
+
+        Args:
+            filename: Bare filename such as ``Honest-LODT-EN-GR-1E.jpg``
+
+        Returns:
+            Path to the image, or None if it is not in the folder
+        """
+        if '/' in filename or '\\' in filename:
+            for image_path in self.image_folder.glob(f"**/{filename}"):
+                return str(image_path)
+            return None
+        return self.filename_paths.get(os.path.normcase(filename))
+
+    def best_match(self, card_name: str) -> Optional[str]:
+        """
+        Find the best matching image for a card name.
+
+        Args:
+            card_name: Card name as it appears in the comparison CSV
+
+        Returns:
+            Path of the best scoring image above the threshold, or None
+        """
+        if not self.paths:
+            return None
+
+        normalized_card_name = normalize_string(card_name)
+        card_words = card_name.lower().split()
+
+        word_hits = np.zeros(len(self.paths), dtype=np.int64)
+        for word in card_words:
+            word_hits += np.char.find(self.stems_lower, word) >= 0
+        word_scores = word_hits / len(card_words)
+
+        query_counts = self._count_chars(normalized_card_name)
+        shared = np.minimum(self.char_counts, query_counts).sum(axis=1)
+        total_length = self.lengths + len(normalized_card_name)
+        quick_ratios = np.where(total_length > 0, 2.0 * shared / np.maximum(total_length, 1), 1.0)
+        bounds = (quick_ratios + word_scores) / 2 + 1e-9
+
+        candidates = np.flatnonzero(bounds > MATCH_THRESHOLD)
+        candidates = candidates[np.lexsort((candidates, -bounds[candidates]))]
+
+        best_index = None
+        best_score = 0
+        matcher = SequenceMatcher(None, normalized_card_name)
+        for index in candidates:
+            if bounds[index] < best_score:
+                break
+            matcher.set_seq2(self.normalized[index])
+            combined_score = (matcher.ratio() + float(word_scores[index])) / 2
+            if combined_score > best_score or (combined_score == best_score and best_index is not None and
+                                               index < best_index):
+                best_score = combined_score
+                best_index = index
+
+        if best_index is not None and best_score > MATCH_THRESHOLD:
+            return self.paths[best_index]
+        return None
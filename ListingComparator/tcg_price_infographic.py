@@ -7,19 +7,17 @@ an infographic showing card images with their price changes.
 """
 
 import os
+import sys
 import csv
-import glob
 import yaml
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 from dataclasses import dataclass
-from difflib import SequenceMatcher
-import re
 from datetime import datetime
 
 from PIL import Image, ImageDraw, ImageFont
-import pandas as pd
-import numpy as np
+
+from image_match_index import ImageMatchIndex, normalize_string
 
 # Configuration constants
 CARDS_PER_ROW = 10  # Number of cards per row in the infographic
@@ -29,6 +27,8 @@ PADDING = 30  # Padding between cards
 BACKGROUND_COLOR = "white"  # Background color of the infographic
 FONT_SIZE = 18  # Font size for text
 HEADER_FONT_SIZE = 27  # Font size for headers
+SHOW_HISTORY_METRICS = True  # Adds volatility, drawdown and percentile of history under the prices
+PRICE_INFO_HEIGHT = 220 if SHOW_HISTORY_METRICS else 180  # Space below each card image for the price rows
 
 
 @dataclass
@@ -55,6 +55,9 @@ class CardData:
     mean_percent: float
     median_percent: float
     image_path: Optional[str] = None
+    volatility: Optional[float] = None  # From history_metrics, Min price at the card's latest scrape
+    drawdown: Optional[float] = None
+    percentile: Optional[float] = None
 
 
 class CardPriceInfographic:
@@ -69,6 +72,8 @@ class CardPriceInfographic:
         self.output_folder = self.base_path / "infographics"
         self.cards_data: List[CardData] = []
         self.card_image_mappings: Dict[str, str] = {}
+        self.image_index_path = self.base_path / "image_match_index.pickle"
+        self.image_index: Optional[ImageMatchIndex] = None
 
         # Create output folder if it doesn't exist
         self.output_folder.mkdir(parents=True, exist_ok=True)
@@ -266,9 +271,13 @@ class CardPriceInfographic:
 
     def normalize_string(self, s: str) -> str:
         """Normalize string for comparison by removing special characters and spaces"""
-        # Remove special characters and convert to lowercase
-        s = re.sub(r'[^a-zA-Z0-9]', '', s.lower())
-        return s
+        return normalize_string(s)
+
+    def get_image_index(self) -> ImageMatchIndex:
+        """Load the persisted image match index, building it on first use"""
+        if self.image_index is None:
+            self.image_index = ImageMatchIndex.load_or_build(self.image_folder, self.image_index_path)
+        return self.image_index
 
     def find_best_image_match(self, card_name: str) -> Optional[str]:
         """Find the best matching image file for a given card name"""
@@ -276,45 +285,17 @@ class CardPriceInfographic:
         if card_name in self.card_image_mappings:
             mapped_filename = self.card_image_mappings[card_name]
             # Search for this exact filename in all subdirectories
-            for image_path in self.image_folder.glob(f"**/{mapped_filename}"):
+            image_path = self.get_image_index().find_filename(mapped_filename)
+            if image_path:
                 print(f"Using hard-coded mapping for '{card_name}' -> '{mapped_filename}'")
-                return str(image_path)
+                return image_path
             print(f"Warning: Hard-coded image '{mapped_filename}' not found for '{card_name}'")
 
         if not self.image_folder.exists():
             return None
 
-        # Normalize the card name for comparison
-        normalized_card_name = self.normalize_string(card_name)
-
-        best_match = None
-        best_score = 0
-
-        # Search through all subdirectories
-        for image_path in self.image_folder.glob("**/*.jpg"):
-            # Get just the filename without extension
-            filename = image_path.stem
-            normalized_filename = self.normalize_string(filename)
-
-            # Calculate similarity score
-            score = SequenceMatcher(None, normalized_card_name, normalized_filename).ratio()
-
-            # Also check if all words from card name are in filename
-            card_words = card_name.lower().split()
-            filename_lower = filename.lower()
-            word_match_score = sum(1 for word in card_words if word in filename_lower) / len(card_words)
-
-            # Combined score
-            combined_score = (score + word_match_score) / 2
-
-            if combined_score > best_score:
-                best_score = combined_score
-                best_match = str(image_path)
-
         # Only return if we have a reasonably good match
-        if best_score > 0.5:
-            return best_match
-        return None
+        return self.get_image_index().best_match(card_name)
 
     def match_images_to_cards(self) -> None:
         """Match image files to each card in the dataset"""
@@ -336,6 +317,29 @@ class CardPriceInfographic:
 
         print(f"Successfully matched {matched_count} out of {len(self.cards_data)} cards")
 
+    def load_history_metrics(self) -> None:
+        """Attach volatility, drawdown and percentile of history from the project's history_store"""
+        store_root = self.project_root / "history_store"
+        if not store_root.exists():
+            print(f"History store not found at {store_root}, skipping history metrics")
+            return
+        if str(self.project_root) not in sys.path:
+            sys.path.insert(0, str(self.project_root))  # history_metrics lives in the project root
+        from history_metrics import load_metrics, latest_metrics
+
+        metrics = load_metrics(0, str(store_root))
+        matched = 0
+        for card in self.cards_data:
+            # Rows last scraped before the compared date are stale variants of the card, not its current series
+            values = latest_metrics(metrics, card.card_name, card.condition, since=card.date2)
+            if values is None:
+                continue
+            card.volatility = values['volatility']
+            card.drawdown = values['drawdown']
+            card.percentile = values['percentile']
+            matched += 1
+        print(f"History metrics found for {matched} of {len(self.cards_data)} cards")
+
     def get_price_change_indicators(self, value: float) -> Tuple[str, str]:
         """Get arrow symbol and color based on value change"""
         if value > 0:
@@ -395,7 +399,7 @@ class CardPriceInfographic:
         """Create an image for a single card with its price information"""
         # Create a white background for the card info
         info_width = CARD_IMAGE_WIDTH
-        info_height = CARD_IMAGE_HEIGHT + 180  # Extra space for price data
+        info_height = CARD_IMAGE_HEIGHT + PRICE_INFO_HEIGHT  # Extra space for price data
         card_image = Image.new('RGB', (info_width, info_height), 'white')
         draw = ImageDraw.Draw(card_image)
 
@@ -470,6 +474,20 @@ class CardPriceInfographic:
                 arrow_text = self.get_text_indicators(percent)
                 draw.text((x_positions[4], y_pos), arrow_text, fill=color, font=font)
 
+        if SHOW_HISTORY_METRICS and card.percentile is not None:
+            self._add_history_metrics_to_card(card, draw, mono_font, y_offset + len(price_data) * 40)
+
+    def _add_history_metrics_to_card(self, card: CardData, draw: ImageDraw.Draw,
+                                     mono_font: ImageFont.FreeTypeFont, y_pos: int) -> None:
+        """Add volatility, drawdown from peak and percentile of history below the price rows"""
+        def text(value: Optional[float], suffix: str = "%") -> str:
+            return "-" if value is None or value != value else f"{value:.0f}{suffix}"  # NaN != NaN
+
+        draw.text((5, y_pos), f"Vol {text(card.volatility)}", fill='black', font=mono_font)
+        drawdown_color = "#FF0000" if card.drawdown and card.drawdown < 0 else "#808080"
+        draw.text((110, y_pos), f"DD {text(card.drawdown)}", fill=drawdown_color, font=mono_font)
+        draw.text((220, y_pos), f"P{text(card.percentile, '')}", fill='black', font=mono_font)
+
     def calculate_infographic_dimensions(self, cards_per_row: int) -> Tuple[int, int, int, int]:
         """Calculate the dimensions for the infographic"""
         num_cards = len(self.cards_data)
@@ -477,7 +495,7 @@ class CardPriceInfographic:
 
         # Calculate image dimensions
         card_total_width = CARD_IMAGE_WIDTH + PADDING
-        card_total_height = CARD_IMAGE_HEIGHT + 180 + PADDING
+        card_total_height = CARD_IMAGE_HEIGHT + PRICE_INFO_HEIGHT + PADDING
 
         img_width = cards_per_row * card_total_width + PADDING
         img_height = num_rows * card_total_height + PADDING + 75  # Extra space for header
@@ -580,6 +598,10 @@ def main():
     # Match images to cards
     generator.match_images_to_cards()
 
+    # Volatility, drawdown and percentile of history from history_store
+    if SHOW_HISTORY_METRICS:
+        generator.load_history_metrics()
+
     # Create the infographic
     if generator.create_infographic(cards_per_row=CARDS_PER_ROW):
         print("Infographic created successfully!")
@@ -0,0 +1,69 @@
+import statistics
+import subprocess
+import sys
+
+# Configs
+entry_modules = ['yaml_io', 'collection_model', 'utils', 'decklist_gallery', 'format_list_generator', 'price_graph',
+                 'decklist_checker', 'history_store', 'main']
+heavy_packages = ['cv2', 'matplotlib', 'selenium', 'bs4', 'pandas', 'numpy', 'prettytable', 'PIL']
+# Modules that must not pull in any of these at import time, only the code paths that use them may
+must_not_import = {
+    'yaml_io': heavy_packages,
+    'collection_model': heavy_packages,
+    'utils': ['cv2', 'matplotlib', 'selenium', 'bs4', 'pandas', 'numpy'],
+    'decklist_gallery': ['cv2', 'matplotlib', 'selenium', 'bs4', 'pandas', 'numpy'],
+    'format_list_generator': ['cv2', 'matplotlib', 'selenium', 'bs4', 'pandas', 'numpy'],
+    'price_graph': ['cv2', 'matplotlib', 'selenium', 'bs4', 'pandas', 'numpy'],
+}
+repeats = 5
+
+
+def import_time(module):
+    # One fresh interpreter per run, -X importtime writes '<self us> | <cumulative us> | <module>' lines to stderr
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import {}'.format(module)],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None, set(), result.stderr.strip().splitlines()[-1] if result.stderr.strip() else 'failed'
+    cumulative = 0
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, total, name = line.split('|')
+        name = name.strip()
+        imported.add(name.split('.')[0])
+        if name == module:
+            cumulative = int(total)
+    return cumulative / 1000, imported, None
+
+
+def run_benchmark():
+    failures = 0
+    print('{:<24}{:>12}  {}'.format('Module', 'import ms', 'heavy packages loaded'))
+    for module in entry_modules:
+        times = []
+        imported = set()
+        error = None
+        for _ in range(repeats):
+            milliseconds, imported, error = import_time(module)
+            if error:
+                break
+            times.append(milliseconds)
+        if error:
+            print('{:<24}{:>12}  {}'.format(module, '-', error))
+            continue
+        heavy = [package for package in heavy_packages if package in imported]
+        print('{:<24}{:>12.1f}  {}'.format(module, statistics.median(times), ', '.join(heavy) or '-'))
+        unexpected = [package for package in must_not_import.get(module, []) if package in imported]
+        if unexpected:
+            failures += 1
+            sys.stderr.write('{} imports {} at import time\n'.format(module, ', '.join(unexpected)))
+    return failures == 0
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run_benchmark() else 1)
+
+# From the repo root:
+# python -m benchmarks.import_benchmark
+#       Median import time per entry module and the heavy packages each one loads before doing any work
@@ -0,0 +1,82 @@
+import re
+import statistics
+
+# Frozen copy of utils.extract_listing_prices from before the single pass rewrite, kept as the reference the
+# regression check compares against. Do not fix bugs here.
+
+
+def legacy_extract_listing_prices(raw_html, card):
+    text_only = raw_html.get_text()
+    text_only = text_only.split('Clear All')[1].split('TCGplayer Core Value')[0]  # Last Configurable filter on Left hand side
+    # Previous = Ship To UNITED STATES
+
+    list_extract = []
+    x = text_only.split('Shipping')
+    for item in x:
+        item = item.replace('\n', '')
+        list_extract.append(item)
+
+    for item in list_extract:
+        if '$' not in item:
+            list_extract.remove(item)
+
+    second_list = []
+    for x in range(0, len(list_extract)):
+        second_list.append([0, 0, 0])
+
+    # Trim listings with "Free Shipping on Orders over $5"
+    for x in range(0, len(list_extract)):
+        if 'on Orders Over' in list_extract[x]:
+            list_extract[x] = list_extract[x][20:]  # trim out 'on Orders Over $511  '
+
+    # Get Card Price
+    x = 0
+    for item in list_extract:
+        try:
+            price = item.split('$')[1].split('.')[0].replace(',', '')
+        except IndexError:
+            print('Unexpected Index Error for {}. Skipping this one'.format(card))
+            continue
+        try:
+            second_list[x][0] = int(price)
+        except ValueError:
+            print('Value Error for {}. Skipping. Price: {}'.format(card, price))
+            second_list[x][0] = second_list[x - 1][0]
+        x += 1
+
+    # Get Seller # Sales
+    x = 0
+    for item in list_extract:
+        try:
+            seller_stats = item.split('Sales)')[0].split('(')[1]
+            second_list[x][1] = seller_stats
+        except IndexError:
+            print('Index Error for Seller Stats. Skipping')
+            second_list[x][1] = 0
+        x += 1
+
+    # Get Seller % Stat
+    x = 0
+    for item in list_extract:
+        percent_index = item.find('%')
+        percent_lower_bound = percent_index - 4
+        seller_percent = item[percent_lower_bound:percent_index]
+        result = re.sub(r'[^0-9\.]', '', seller_percent)
+        second_list[x][2] = result
+        x += 1
+
+    # trim second_list for listings out of iqr range (1.5) - remove extremities
+    if not second_list:
+        print('Empty list')
+        return second_list
+
+    calc_median_list = []
+    for item in second_list:
+        calc_median_list.append(int(item[0]))
+    median_val = statistics.median(calc_median_list)
+
+    trimmed_list = []
+    for x, item in enumerate(second_list):
+        if median_val / 2 < second_list[x][0] < median_val * 1.75:
+            trimmed_list.append(second_list[x])
+    return trimmed_list
@@ -0,0 +1,64 @@
+import sys
+
+import numpy as np
+
+import history_metrics
+
+
+def make_fixture():
+    # Same shape as the store: a current series, an older single point variant of it priced higher, a card
+    # only scraped once long ago, and two current rarities of one card on the same dates
+    dates = np.array(['2024-05-20', '2024-08-01', '2024-11-01', '2025-02-01', '2025-05-01', '2025-07-02'],
+                     dtype='datetime64[D]')
+    nan = np.nan
+    rows = [('Abyss Dweller UTR', 'Near Mint', [nan, 51, 40, 28, 16, 13]),
+            ('Abyss Dweller UTR - TCG', 'Near Mint', [27, nan, nan, nan, nan, nan]),
+            ('Bystial Saronir', 'Near Mint 1st', [3, nan, nan, nan, nan, nan]),
+            ('Lonefire Blossom Super', 'Near Mint 1st', [10, 11, 12, 12, 13, 14]),
+            ('Lonefire Blossom Secret', 'Near Mint 1st', [40, 42, 41, 45, 44, 46])]
+    prices = np.array([row[2] for row in rows], dtype=float)
+    metrics = {'cards': np.array([row[0] for row in rows]), 'conditions': np.array([row[1] for row in rows]),
+               'dates': dates, 'prices': prices}
+    metrics.update(history_metrics.compute_metrics(prices, dates, np.arange(len(dates))))
+    return metrics
+
+
+def run_regression():
+    metrics = make_fixture()
+    checks = [
+        # (description, found card or None, expected card or None)
+        ('stale higher priced variant is skipped',
+         history_metrics.latest_metrics(metrics, 'Abyss Dweller'), 'Abyss Dweller UTR'),
+        ('exact name still wins over the substring match',
+         history_metrics.latest_metrics(metrics, 'Abyss Dweller UTR - TCG'), 'Abyss Dweller UTR - TCG'),
+        ('exact name scraped before the table date is unmatched',
+         history_metrics.latest_metrics(metrics, 'Abyss Dweller UTR - TCG', since='2025-07-02'), None),
+        ('single point card scraped before the table date is unmatched',
+         history_metrics.latest_metrics(metrics, 'Bystial Saronir', since='2025-07-02'), None),
+        ('single point card on the table date still matches',
+         history_metrics.latest_metrics(metrics, 'Bystial Saronir', since='2024-05-20'), 'Bystial Saronir'),
+        ('same latest date picks the priciest rarity',
+         history_metrics.latest_metrics(metrics, 'Lonefire Blossom', since='2025-07-02'), 'Lonefire Blossom Secret'),
+    ]
+    failures = 0
+    for description, found, expected in checks:
+        card = found['card'] if found is not None else None
+        if card != expected:
+            failures += 1
+            sys.stderr.write('{}: expected {}, got {}\n'.format(description, expected, card))
+
+    current = history_metrics.latest_metrics(metrics, 'Abyss Dweller')
+    if current is not None and not (current['drawdown'] < -70 and current['percentile'] < 100):
+        failures += 1
+        sys.stderr.write('Abyss Dweller metrics are not from its current series: {}\n'.format(current))
+
+    print('Checks: {}, failures: {}'.format(len(checks) + 1, failures))
+    return failures == 0
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run_regression() else 1)
+
+# From the repo root:
+# python -m benchmarks.metrics_regression
+#       Checks history_metrics.find_card on a small fixture with stale variant rows, no history store needed
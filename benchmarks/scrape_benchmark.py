@@ -0,0 +1,343 @@
+"""Replays saved product pages through utils.scrape_website to time the scrape and catch changed listings.
+
+The committed fixtures are synthetic, written by generate_fixtures() from make_product_page(), markup this
+module invents ('Showing 1 - 50 of 132 Listings' headers, listing-item divs). The parity and pagination checks
+only confirm the parser reads what the generator wrote, they do not validate real TCGplayer product page markup.
+Record live pages with the record command before trusting a parser change against the real site.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from selenium.common.exceptions import NoSuchElementException
+
+import utils
+from collection_model import load_yaml_file
+
+# Configs
+fixtures_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+manifest_name = 'manifest.json'  # card name -> {'url', 'edition', 'qty'}, same layout as a list yaml
+expected_name = 'expected.json'  # product id -> extract_listing_prices output
+baseline_name = 'baseline.json'  # Last accepted cards_per_sec / parse_ms_per_page / peak_kb_per_page, per machine so not committed
+regression_threshold = 0.20  # Fail when any metric is this much worse than the baseline
+repeats = 3  # Best of N
+
+
+class FakeBrowser:
+    # Replays saved product pages through the same get / page_source / find_element calls scrape_website makes
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.tabs = {'main': ''}  # Window handle -> page source, extra listing pages open in their own tab
+        self.current_window_handle = 'main'
+        self.switch_to = self
+
+    @property
+    def page_source(self):
+        return self.tabs[self.current_window_handle]
+
+    @property
+    def window_handles(self):
+        return list(self.tabs)
+
+    @property
+    def current_url(self):
+        return self.current_window_handle
+
+    def get(self, url):
+        self.tabs[self.current_window_handle] = self.pages.get(page_key(url), '<html></html>')
+
+    def execute_script(self, script, *args):
+        if script.startswith('window.open'):
+            self.tabs['tab{}'.format(len(self.tabs))] = self.pages.get(page_key(args[0]), '<html></html>')
+
+    def window(self, handle):
+        self.current_window_handle = handle
+
+    def close(self):
+        self.tabs.pop(self.current_window_handle)
+
+    def find_element(self, by=None, value=None):
+        if value and value not in self.page_source:
+            raise NoSuchElementException('{} not in fixture'.format(value))
+        return self
+
+    def find_elements(self, by=None, value=None):
+        return [self] if not value or value in self.page_source else []
+
+    def quit(self):
+        pass
+
+
+def page_key(url):
+    # '<product id>' for the first page, '<product id>-page<N>' for later listing pages, matching the fixture names
+    product_id = url.split('/product/')[1].split('?')[0]
+    page = re.search(r'&page=(\d+)', url)
+    return product_id if not page or page.group(1) == '1' else '{}-page{}'.format(product_id, page.group(1))
+
+
+# Fixtures #
+
+
+def load_fixtures(root=fixtures_root):
+    with open(os.path.join(root, manifest_name), 'r') as file:
+        manifest = json.load(file)
+    pages = {}
+    for file_name in os.listdir(root):
+        if file_name.endswith('.html'):
+            with open(os.path.join(root, file_name), 'r', encoding='utf-8') as file:
+                pages[file_name[:-len('.html')]] = file.read()
+    return manifest, pages
+
+
+def extra_page_keys(pages, product_id):
+    keys = []
+    while '{}-page{}'.format(product_id, len(keys) + 2) in pages:
+        keys.append('{}-page{}'.format(product_id, len(keys) + 2))
+    return keys
+
+
+def load_json(path, default=None):
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def save_json(path, data):
+    with open(path, 'w') as file:
+        json.dump(data, file, indent=1, sort_keys=True)
+        file.write('\n')
+
+
+def parse_page(html, card, extra_htmls=()):
+    # Same steps scrape_website runs on browser.page_source and any later listing pages
+    return utils.extract_listing_prices(utils.html_to_soup(html), card,
+                                        [utils.html_to_soup(extra_html) for extra_html in extra_htmls])
+
+
+def extract_all(manifest, pages):
+    results = {}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for card in manifest:
+            product_id = str(manifest[card]['url'])
+            extra_htmls = [pages[key] for key in extra_page_keys(pages, product_id)]
+            results[product_id] = [[listing.price, listing.seller_sales, listing.seller_rating]
+                                   for listing in parse_page(pages[product_id], card, extra_htmls)]
+    return results
+
+
+def make_listing_html(rng, index, edition):
+    price = rng.randint(90, 140) if rng.random() < 0.8 else rng.choice([rng.randint(1, 30), rng.randint(200, 2500)])
+    if rng.random() < 0.2:
+        shipping = 'Free Shipping on Orders Over $5'
+    else:
+        shipping = '+ ${}.{:02d} Shipping'.format(rng.randint(0, 5), rng.randint(0, 99))
+    return ('<div class="listing-item"><div class="listing-item__seller">'
+            '<a class="seller-info__name">Seller{0}</a> <span class="seller-info__sales">({1} Sales)</span>'
+            '<span class="seller-info__rating">{2}.{3}%</span></div>'
+            '<div class="listing-item__condition">{4}</div>'
+            '<div class="listing-item__price">${5:,}.{6:02d}</div>'
+            '<div class="listing-item__shipping">{7}</div></div>\n').format(
+        index, rng.randint(1, 99999), rng.randint(90, 99), rng.randint(0, 9), edition,
+        price, rng.randint(0, 99), shipping)
+
+
+def make_product_page(rng, card, edition, listing_count, total_listings=None, first_listing=0):
+    listings = ''.join(make_listing_html(rng, first_listing + index, edition) for index in range(listing_count))
+    header = ''
+    if total_listings:
+        header = '<div class="listings-header">Showing {} - {} of {} Listings</div>'.format(
+            first_listing + 1, first_listing + listing_count, total_listings)
+    return ('<html><head><style>.listing-item {{ color: #000 }}</style>'
+            '<script>window.__price = "$5";</script></head><body>\n'
+            '<h1 class="product-details__name">{0}</h1>\n'
+            '<section class="product-details__listings">{2}<div class="filters">Condition Printing Language '
+            'Clear All</div>\n{1}</section>\n'
+            '<footer>TCGplayer Core Value Browse</footer></body></html>\n').format(card, listings, header)
+
+
+def generate_fixtures(root=fixtures_root, count=16, seed=2023):
+    # Synthetic pages modelled on the live layout, not captured from it, used until real pages are recorded
+    rng = random.Random(seed)
+    editions = ['Near Mint 1st Edition', 'Lightly Played Unlimited', 'Near Mint Limited', 'Moderately Played 1st Edition']
+    os.makedirs(root, exist_ok=True)
+    manifest = {}
+    for index in range(count):
+        card = 'Benchmark Card {:02d}'.format(index)
+        edition = rng.choice(editions)
+        listing_count = 0 if index == 0 else rng.randint(1, 50)
+        product_id = str(900000 + index)
+        with open(os.path.join(root, product_id + '.html'), 'w', encoding='utf-8') as file:
+            file.write(make_product_page(rng, card, edition, listing_count))
+        manifest[card] = {'url': product_id, 'edition': edition.replace(' Edition', ''), 'qty': rng.randint(1, 3)}
+
+    # One card with more listings than fit on a page, spread over <id>.html, <id>-page2.html, ...
+    card, product_id, total_listings = 'Benchmark Card Paged', str(900000 + count), 132
+    edition = rng.choice(editions)
+    for page in range(-(-total_listings // utils.listings_per_page)):
+        first_listing = page * utils.listings_per_page
+        page_name = product_id if page == 0 else '{}-page{}'.format(product_id, page + 1)
+        with open(os.path.join(root, page_name + '.html'), 'w', encoding='utf-8') as file:
+            file.write(make_product_page(rng, card, edition, min(utils.listings_per_page, total_listings - first_listing),
+                                         total_listings, first_listing))
+    manifest[card] = {'url': product_id, 'edition': edition.replace(' Edition', ''), 'qty': 1}
+    save_json(os.path.join(root, manifest_name), manifest)
+    return manifest
+
+
+def record_fixtures(list_yaml, root=fixtures_root, limit=None):
+    # Saves live product pages for the cards of a list yaml, after logging in the same way main.py does
+    from selenium import webdriver
+    card_data_yaml = load_yaml_file(list_yaml)
+    manifest = load_json(os.path.join(root, manifest_name), {})
+    browser = webdriver.Chrome()
+    try:
+        browser.get('https://www.tcgplayer.com/product/33224')
+        input('Enter any key Selecting 50 view count: ')
+        for count, card in enumerate(card_data_yaml):
+            if limit is not None and count >= limit:
+                break
+            url_mod = utils.condition_edition_url_filters(card_data_yaml[card]['edition'])
+            browser.get('{}{}{}'.format(utils.base_url, card_data_yaml[card]['url'], ''.join(url_mod)))
+            time.sleep(utils.listing_settle_seconds)
+            with open(os.path.join(root, str(card_data_yaml[card]['url']) + '.html'), 'w', encoding='utf-8') as file:
+                file.write(browser.page_source)
+            manifest[card] = dict(card_data_yaml[card])
+            print('Recorded {}'.format(card))
+    finally:
+        browser.quit()
+    save_json(os.path.join(root, manifest_name), manifest)
+    return manifest
+
+
+# Measurements #
+
+
+def measure_pipeline(manifest, pages):
+    # Whole scrape_website loop inside a scratch directory so no real pricing files are touched
+    settings = (utils.listing_wait_seconds, utils.listing_settle_seconds, utils.record_scrape_timing)
+    utils.listing_wait_seconds, utils.listing_settle_seconds, utils.record_scrape_timing = 0, 0, False
+    cwd = os.getcwd()
+    scratch = tempfile.mkdtemp(prefix='scrape_benchmark_')
+    try:
+        os.chdir(scratch)
+        os.makedirs('sorted_pricing')
+        timings = []
+        for _ in range(repeats):
+            for metric in ['min', 'max', 'mean', 'median']:
+                with open('sorted_pricing/{}_prices.yaml'.format(metric), 'w') as file:
+                    file.write('{}\n')
+            shutil.rmtree('full_listings', ignore_errors=True)
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                utils.scrape_website(manifest, 'benchmark', FakeBrowser(pages))
+            timings.append(time.perf_counter() - start)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(scratch, ignore_errors=True)
+        utils.listing_wait_seconds, utils.listing_settle_seconds, utils.record_scrape_timing = settings
+    return len(manifest) / min(timings)
+
+
+def measure_parsing(manifest, pages):
+    parse_times = []
+    peaks = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for card in manifest:
+            html = pages[str(manifest[card]['url'])]
+            extra_htmls = [pages[key] for key in extra_page_keys(pages, str(manifest[card]['url']))]
+            best = None
+            for _ in range(repeats):
+                start = time.perf_counter()
+                parse_page(html, card, extra_htmls)
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            parse_times.append(best)
+
+            tracemalloc.start()
+            parse_page(html, card, extra_htmls)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return statistics.mean(parse_times) * 1000, statistics.mean(peaks) / 1024
+
+
+def run_benchmark(root=fixtures_root, update_baseline=False, update_expected=False, threshold=regression_threshold):
+    manifest, pages = load_fixtures(root)
+    failures = []
+
+    expected_path = os.path.join(root, expected_name)
+    results = extract_all(manifest, pages)
+    expected = load_json(expected_path)
+    if update_expected or expected is None:
+        save_json(expected_path, results)
+        print('Saved expected listings for {} fixtures'.format(len(results)))
+    else:
+        for product_id in sorted(results):
+            if results[product_id] != expected.get(product_id):
+                failures.append('extract_listing_prices changed for fixture {}'.format(product_id))
+
+    cards_per_sec = measure_pipeline(manifest, pages)
+    parse_ms, peak_kb = measure_parsing(manifest, pages)
+    metrics = {'cards_per_sec': cards_per_sec, 'parse_ms_per_page': parse_ms, 'peak_kb_per_page': peak_kb}
+
+    baseline_path = os.path.join(root, baseline_name)
+    baseline = load_json(baseline_path)
+    print('{:<20}{:>12}{:>12}'.format('Metric', 'Current', 'Baseline'))
+    for name, value in metrics.items():
+        print('{:<20}{:>12.2f}{:>12}'.format(name, value, '{:.2f}'.format(baseline[name]) if baseline else '-'))
+    if baseline and not update_baseline:
+        if cards_per_sec < baseline['cards_per_sec'] * (1 - threshold):
+            failures.append('cards/sec regressed: {:.2f} < {:.2f}'.format(cards_per_sec, baseline['cards_per_sec']))
+        for name in ['parse_ms_per_page', 'peak_kb_per_page']:
+            if metrics[name] > baseline[name] * (1 + threshold):
+                failures.append('{} regressed: {:.2f} > {:.2f}'.format(name, metrics[name], baseline[name]))
+    if update_baseline or baseline is None:
+        save_json(baseline_path, {name: round(value, 3) for name, value in metrics.items()})
+        print('Saved baseline: {}'.format(baseline_path))
+
+    for failure in failures:
+        print('FAIL: {}'.format(failure))
+    return not failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline scrape benchmark over saved product pages')
+    parser.add_argument('command', nargs='?', default='run', choices=['run', 'generate', 'record'])
+    parser.add_argument('list_yaml', nargs='?', help='List yaml to record live pages from')
+    parser.add_argument('--fixtures', default=fixtures_root)
+    parser.add_argument('--limit', type=int, help='Max cards to record')
+    parser.add_argument('--threshold', type=float, default=regression_threshold)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--update-expected', action='store_true')
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        print('Generated {} fixtures'.format(len(generate_fixtures(args.fixtures))))
+        return 0
+    if args.command == 'record':
+        if not args.list_yaml:
+            parser.error('record needs a list yaml')
+        record_fixtures(args.list_yaml, args.fixtures, args.limit)
+        return 0
+    return 0 if run_benchmark(args.fixtures, args.update_baseline, args.update_expected, args.threshold) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# From the repo root:
+# python -m benchmarks.scrape_benchmark                     Replays fixtures, fails on a >20% regression or changed listings
+# python -m benchmarks.scrape_benchmark --update-baseline   Accept current numbers after an intended change
+# python -m benchmarks.scrape_benchmark record <list>.yaml  Save live pages as new fixtures (needs a logged in Chrome)
+# python -m benchmarks.scrape_benchmark generate            Rebuild the synthetic fixtures
@@ -0,0 +1,121 @@
+import glob
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import yaml
+
+import yaml_io
+
+# Configs
+config_files = ['lists.yaml'] + sorted(glob.glob('decks/**/*.yaml', recursive=True))
+repeats = 5
+price_cards = 300  # Size of the sorted_pricing yaml that price_yaml_generator rewrites once per card and price
+price_updates = 100
+
+
+def best_time(function, *args):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def load_all_pure(paths):
+    for path in paths:
+        with open(path, 'r') as stream:
+            yaml.safe_load(stream)
+
+
+def load_all_fast(paths):
+    for path in paths:
+        yaml_io.read_yaml(path)
+
+
+def load_all_cached(paths):
+    for path in paths:
+        yaml_io.read_config(path)
+
+
+def update_prices_pure(yaml_name, updates):
+    # price_yaml_generator before yaml_io
+    for card_name, price in updates:
+        with open(yaml_name, 'r') as stream:
+            current_yaml = yaml.safe_load(stream)
+            current_yaml.update({card_name: price})
+        with open(yaml_name, 'w') as stream:
+            yaml.safe_dump(current_yaml, stream)
+
+
+def update_prices_fast(yaml_name, updates):
+    for card_name, price in updates:
+        current_yaml = yaml_io.read_yaml(yaml_name)
+        current_yaml.update({card_name: price})
+        yaml_io.write_yaml(yaml_name, current_yaml)
+
+
+def check_parity(paths):
+    mismatches = []
+    for path in paths:
+        with open(path, 'r') as stream:
+            if yaml.safe_load(stream) != yaml_io.read_yaml(path):
+                mismatches.append(path)
+    return mismatches
+
+
+def time_price_updates(function, rng):
+    scratch = tempfile.mkdtemp(prefix='yaml_benchmark_')
+    try:
+        yaml_name = os.path.join(scratch, 'min_prices.yaml')
+        prices = {'Card {}'.format(index): rng.randint(1, 500) for index in range(price_cards)}
+        updates = [('Card {}'.format(rng.randrange(price_cards * 2)), rng.randint(1, 500))
+                   for _ in range(price_updates)]
+
+        def run():
+            with open(yaml_name, 'w') as stream:
+                yaml.safe_dump(prices, stream)
+            function(yaml_name, updates)
+            with open(yaml_name, 'r') as stream:
+                return stream.read()
+
+        return best_time(run), run()
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def run_benchmark():
+    print('libyaml: {}, {} config files'.format(yaml_io.WITH_LIBYAML, len(config_files)))
+    mismatches = check_parity(config_files)
+    for path in mismatches:
+        sys.stderr.write('Parsed differently: {}\n'.format(path))
+
+    pure = best_time(load_all_pure, config_files)
+    fast = best_time(load_all_fast, config_files)
+    load_all_cached(config_files)
+    cached = best_time(load_all_cached, config_files)
+    print('{:<28}{:>12}{:>10}'.format('Config load', 'ms', 'speedup'))
+    for name, seconds in [('yaml.safe_load', pure), ('yaml_io.read_yaml', fast), ('yaml_io.read_config warm', cached)]:
+        print('{:<28}{:>12.1f}{:>9.1f}x'.format(name, seconds * 1000, pure / seconds if seconds else 0))
+
+    pure_updates, pure_output = time_price_updates(update_prices_pure, random.Random(43))
+    fast_updates, fast_output = time_price_updates(update_prices_fast, random.Random(43))
+    print('Price yaml updates ({} cards, {} writes): safe_load/safe_dump {:.0f}ms, yaml_io {:.0f}ms ({:.1f}x)'.format(
+        price_cards, price_updates, pure_updates * 1000, fast_updates * 1000,
+        pure_updates / fast_updates if fast_updates else 0))
+    if pure_output != fast_output:
+        sys.stderr.write('Price yaml written differently by the C dumper\n')
+    return not mismatches and pure_output == fast_output
+
+
+if __name__ == '__main__':
+    sys.exit(0 if run_benchmark() else 1)
+
+# From the repo root:
+# python -m benchmarks.yaml_benchmark
+#       Load time of lists.yaml and every yaml under decks/ before (pure Python) and after (libyaml, cached configs)
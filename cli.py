@@ -0,0 +1,378 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+
+# Configs
+daemon_host = '127.0.0.1'  # Local only, the daemon runs whatever a client asks for
+daemon_port = 8765
+daemon_connect_timeout = 0.2  # Seconds to wait for a daemon before running the command in this process
+comparison_root = 'full_listings'
+comparison_cache = 'ListingComparator/snapshot_cache'
+
+DAEMON_COMMANDS = ('price-decks', 'gallery', 'history', 'portfolio', 'movers', 'charts', 'compare',
+                   'check-decks')  # scrape always runs locally
+METRICS = {'min': 0, 'max': 1, 'mean': 2, 'median': 3}
+
+_history = None  # (manifest stamp, load_history() columns), kept warm between daemon requests
+_rollups = {}  # period -> (manifest stamp, load_rollups() columns)
+_comparison_parser = None  # CardPriceParser holding its directory index and snapshot cache
+
+
+@contextlib.contextmanager
+def module_flags(module, **values):
+    # Sets the config flags given on the command line for one command, the daemon serves the next one clean
+    previous = {name: getattr(module, name) for name, value in values.items() if value is not None}
+    for name in previous:
+        setattr(module, name, values[name])
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(module, name, value)
+
+
+def warm_history(refresh=False):
+    global _history
+    import history_store
+    manifest_path = os.path.join(history_store.history_store_root, history_store.MANIFEST_NAME)
+    stamp = os.stat(manifest_path).st_mtime_ns if os.path.exists(manifest_path) else None
+    if _history is None or _history[0] != stamp or refresh:
+        _history = (stamp, history_store.load_history())
+    return _history[1]
+
+
+def warm_rollups(period):
+    import history_store
+    manifest_path = os.path.join(history_store.history_store_root, history_store.MANIFEST_NAME)
+    stamp = os.stat(manifest_path).st_mtime_ns if os.path.exists(manifest_path) else None
+    if period not in _rollups or _rollups[period][0] != stamp:
+        _rollups[period] = (stamp, history_store.load_rollups(period))
+    return _rollups[period][1]
+
+
+def comparison_parser():
+    global _comparison_parser
+    if _comparison_parser is None:
+        sys.path.insert(0, os.path.abspath('ListingComparator'))  # Its modules import each other flat
+        from CardPriceParser import CardPriceParser
+        _comparison_parser = CardPriceParser(comparison_root, comparison_cache)
+    return _comparison_parser
+
+
+# Commands #
+
+
+def command_scrape(args):
+    import main
+    main.run_scrape(args.worker, args.workers, args.lists)
+
+
+def command_price_decks(args):
+    import decklist_gallery
+    with module_flags(decklist_gallery, use_max_rarity_pricing=args.max_rarity,
+                      display_rarity_in_decklist=args.show_rarity):
+        decklist_gallery.run_decklists(args.decks, gallery=False, prices=True, binders=False,
+                                       pricing_variables=args.tables)
+
+
+def command_gallery(args):
+    if args.table:
+        import collection_table_gallery
+        collection_table_gallery.generate_collection_table(args.table, args.name, args.rows, args.cols, args.overlap)
+        return
+    import decklist_gallery
+    decklist_gallery.run_decklists(args.decks, gallery=not args.binders_only, prices=False,
+                                   binders=args.binders or args.binders_only)
+
+
+def command_history(args):
+    import history_store
+    if args.ingest:
+        history_store.ingest_archive()
+    history = warm_rollups(args.period) if args.period else warm_history(refresh=args.ingest)
+    # m0..m3 mean Min/Max/Mean/Median in 2023+ tables but TCG Lowest/Last Sold/Market/- before, never mix them
+    table_format = {name: value for value, name in history_store.FORMAT_NAMES.items()}[args.format]
+    keep = history['format'] == table_format
+    if args.list:
+        keep &= history['list'] == args.list
+    history = {column: values[keep] for column, values in history.items()}
+    card_name = history_store.match_card_name(history, args.card, METRICS[args.metric], args.condition)
+    if card_name is None:
+        print('No history for {}'.format(args.card))
+        return
+    if card_name != args.card:
+        print('History for {}'.format(card_name))
+    if args.period:  # Low / high / last value per week or month
+        rows = list(zip(*history_store.card_rollup(history, card_name, METRICS[args.metric], args.condition)))
+        line_format = '{}  {:>10.2f}{:>10.2f}{:>10.2f}'
+    else:
+        rows = list(zip(*history_store.card_history(history, card_name, METRICS[args.metric], args.condition)))
+        line_format = '{}  {:>10.2f}'
+    if not rows:
+        print('No history for {}'.format(args.card))
+        return
+    for row in rows[-args.last:] if args.last else rows:
+        print(line_format.format(*row))
+
+
+def command_portfolio(args):
+    import history_store
+    import portfolio
+    from utils import human_format
+    if args.ingest:
+        history_store.ingest_archive()
+    table_format = {name: value for value, name in history_store.FORMAT_NAMES.items()}[args.format]
+    dates, lists, values = portfolio.list_values(portfolio.load_portfolio(), METRICS[args.metric], args.lists or None,
+                                                 portfolio.parse_since(args.since), table_format=table_format)
+    if not len(dates):
+        print('No snapshots in the history store for these lists')
+        return
+    if args.csv:
+        portfolio.export_csv(args.csv, dates, lists, values)
+    if args.chart:
+        portfolio.plot_portfolio(args.chart, dates, lists, values,
+                                 'Collection value (Sum of {})'.format(args.metric.capitalize()))
+    totals = values.sum(axis=0)
+    rows = list(zip(dates.astype(str), totals, values.T))
+    for date, total, row in rows[-args.last:] if args.last else rows:
+        by_list = '  ' + ', '.join('{} {}'.format(name, human_format(value)) for name, value in zip(lists, row)
+                                   if value) if args.by_list else ''
+        print('{}  ${:>12,.2f}{}'.format(date, total, by_list))
+
+
+def command_movers(args):
+    import history_store
+    import movers
+    if args.ingest:
+        history_store.ingest_archive()
+    with module_flags(movers, top_count=args.top, min_price=args.min_price):
+        movers.write_report(warm_history(refresh=args.ingest), METRICS[args.metric], args.lists or None)
+
+
+def command_charts(args):
+    import price_graph
+    price_graph.batch_price_graphs(args.source, args.format, args.workers)
+
+
+def command_compare(args):
+    parser = comparison_parser()
+    from CardPriceParser import main as compare_main
+    compare_main(args.date1, args.date2, parser)
+
+
+def command_check_decks(args):
+    import decklist_checker
+    decklist_checker.run_check(args.decks)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='cli.py', description='Scraper, deck and price history tools')
+    parser.add_argument('--local', action='store_true', help='Run here even when a daemon is listening')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    scrape = commands.add_parser('scrape', help='Scrape the lists in lists.yaml (main.py)')
+    scrape.add_argument('--worker', type=int, default=0)
+    scrape.add_argument('--workers', type=int, default=1)
+    scrape.add_argument('--lists', nargs='+', help='Only these lists.yaml entries')
+    scrape.set_defaults(function=command_scrape)
+
+    price_decks = commands.add_parser('price-decks', help='Write decklist price tables (decklist_gallery.py)')
+    price_decks.add_argument('decks', nargs='*', help='Deck names from list_of_decks.yaml, all by default')
+    price_decks.add_argument('--tables', nargs='+', help='Sorted price files, e.g. min_prices_sorted.txt')
+    price_decks.add_argument('--max-rarity', dest='max_rarity', action='store_true', default=None,
+                             help='Price every card at its max rarity')
+    price_decks.add_argument('--listed-rarity', dest='max_rarity', action='store_false',
+                             help='Price cards at the rarity written in the decklist')
+    price_decks.add_argument('--show-rarity', dest='show_rarity', action='store_true', default=None)
+    price_decks.add_argument('--hide-rarity', dest='show_rarity', action='store_false')
+    price_decks.set_defaults(function=command_price_decks)
+
+    gallery = commands.add_parser('gallery', help='Decklist / binder images, or a collection table gallery')
+    gallery.add_argument('decks', nargs='*', help='Deck names from list_of_decks.yaml, all by default')
+    gallery.add_argument('--binders', action='store_true', help='Also build the binder pages')
+    gallery.add_argument('--binders-only', action='store_true')
+    gallery.add_argument('--table', help='Collection yaml for collection_table_gallery.py instead')
+    gallery.add_argument('--name', help='Output name for --table')
+    gallery.add_argument('--rows', type=int)
+    gallery.add_argument('--cols', type=int)
+    gallery.add_argument('--overlap', type=float)
+    gallery.set_defaults(function=command_gallery)
+
+    history = commands.add_parser('history', help='Price history of one card from history_store')
+    history.add_argument('card')
+    history.add_argument('--metric', choices=list(METRICS), default='min')
+    history.add_argument('--condition')
+    history.add_argument('--list', help='Only snapshots of this list')
+    history.add_argument('--format', choices=['listings', 'tcg'], default='listings',
+                         help='2023+ listing prices (Min/Max/Mean/Median) or pre-2023 TCG prices '
+                              '(Lowest/Last Sold/Market)')
+    history.add_argument('--last', type=int, help='Only the most recent N points')
+    history.add_argument('--ingest', action='store_true', help='Ingest new snapshots first')
+    history.add_argument('--period', choices=['weekly', 'monthly'], help='Low, high and last value per period')
+    history.set_defaults(function=command_history)
+
+    portfolio = commands.add_parser('portfolio', help='Collection value over time from history_store')
+    portfolio.add_argument('lists', nargs='*', help='Lists to add up, every list except buylists by default')
+    portfolio.add_argument('--metric', choices=list(METRICS), default='min')
+    portfolio.add_argument('--since', help="'3y', '6m', '8w', '90d' or YYYY-MM-DD")
+    portfolio.add_argument('--format', choices=['listings', 'tcg'], default='listings',
+                           help='2023+ listing prices or pre-2023 TCG prices (min/max/mean = Lowest/Last Sold/Market)')
+    portfolio.add_argument('--last', type=int, help='Only print the most recent N dates')
+    portfolio.add_argument('--by-list', action='store_true', help='Print the value of every list per date')
+    portfolio.add_argument('--csv', help='Write date, total and one column per list to this file')
+    portfolio.add_argument('--chart', help='Save a stacked value chart to this file (.png / .svg)')
+    portfolio.add_argument('--ingest', action='store_true', help='Ingest new snapshots first')
+    portfolio.set_defaults(function=command_portfolio)
+
+    movers = commands.add_parser('movers', help='Top gainers / losers of every card over 1W to 4Y windows')
+    movers.add_argument('lists', nargs='*', help='Lists that get their own sections, every current list by default')
+    movers.add_argument('--metric', choices=list(METRICS), default='min')
+    movers.add_argument('--top', type=int, help='Cards per ranking')
+    movers.add_argument('--min-price', type=float, help='Leave cards cheaper than this out of the rankings')
+    movers.add_argument('--ingest', action='store_true', help='Ingest new snapshots first')
+    movers.set_defaults(function=command_movers)
+
+    charts = commands.add_parser('charts', help='Price charts for every card of a deck, list or the collection')
+    charts.add_argument('source', help="Deck or list name, or 'collection' for every scraped list")
+    charts.add_argument('--format', choices=['png', 'svg'], default='png')
+    charts.add_argument('--workers', type=int, help='Render processes, one per CPU by default')
+    charts.set_defaults(function=command_charts)
+
+    compare = commands.add_parser('compare', help='Compare two snapshot dates (ListingComparator)')
+    compare.add_argument('date1')
+    compare.add_argument('date2')
+    compare.set_defaults(function=command_compare)
+
+    check_decks = commands.add_parser('check-decks', help='Which decks the binders can build (decklist_checker.py)')
+    check_decks.add_argument('decks', nargs='*', help='Decks to build together, repeat a name for two copies')
+    check_decks.set_defaults(function=command_check_decks)
+
+    serve = commands.add_parser('serve', help='Keep the catalogue, price tables and history warm for other calls')
+    serve.add_argument('--port', type=int, default=daemon_port)
+    serve.set_defaults(function=command_serve)
+
+    stop = commands.add_parser('stop', help='Stop a running daemon')
+    stop.add_argument('--port', type=int, default=daemon_port)
+    stop.set_defaults(function=None)
+    return parser
+
+
+def run_command(argv):
+    args = build_parser().parse_args(argv)
+    args.function(args)
+
+
+# Daemon #
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    # One JSON line in: {'argv': [...], 'cwd': ...}, one JSON line out: {'status': 0/1, 'output': text}
+
+    def handle(self):
+        request = json.loads(self.rfile.readline())
+        if request['argv'] == ['stop']:
+            self.reply(0, 'Daemon stopped\n')
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+        if os.path.abspath(request.get('cwd', '')) != os.getcwd():
+            self.reply(1, 'Daemon serves {}, run from there or use --local\n'.format(os.getcwd()))
+            return
+        if not request['argv'] or request['argv'][0] not in DAEMON_COMMANDS:  # main() only forwards these
+            self.reply(1, 'Daemon only runs {}\n'.format(', '.join(sorted(DAEMON_COMMANDS))))
+            return
+
+        output = io.StringIO()
+        status = 0
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            try:
+                run_command(request['argv'])
+            except SystemExit as e:
+                status = e.code if isinstance(e.code, int) else 1
+            except Exception:
+                traceback.print_exc()
+                status = 1
+        print('{:>8.3f}s  {}'.format(time.perf_counter() - start, ' '.join(request['argv'])))
+        self.reply(status, output.getvalue())
+
+    def reply(self, status, output):
+        self.wfile.write((json.dumps({'status': status, 'output': output}) + '\n').encode('utf-8'))
+
+
+def warm_up():
+    # Everything repeat queries would otherwise reload: catalogue and decklists, card images, history, price tables
+    from collection_model import get_collection
+    import decklist_gallery
+    import portfolio
+    start = time.perf_counter()
+    collection = get_collection()
+    if os.path.isdir(decklist_gallery.card_images_root):
+        decklist_gallery.card_image_index()
+    for pricing_variable in decklist_gallery.pricing_tables:
+        if os.path.exists('sorted_pricing/' + pricing_variable):
+            decklist_gallery.get_card_value_data_table(decklist_gallery.price_collections, pricing_variable)
+    history = warm_history()
+    portfolio.load_portfolio()
+    print('Warm in {:.2f}s: {} decks, {} catalogue cards, {} history rows'.format(
+        time.perf_counter() - start, len(collection.decks), len(collection.catalogue), len(history['date'])))
+
+
+def command_serve(args):
+    warm_up()
+    socketserver.TCPServer.allow_reuse_address = True
+    with socketserver.TCPServer((daemon_host, args.port), DaemonHandler) as server:
+        print('Listening on {}:{}, stop with: python .\\cli.py stop'.format(daemon_host, args.port))
+        server.serve_forever()
+
+
+def send_to_daemon(argv, port=daemon_port):
+    """(status, output) from a running daemon, None when there is none"""
+    try:
+        connection = socket.create_connection((daemon_host, port), timeout=daemon_connect_timeout)
+    except OSError:
+        return None
+    with connection:
+        connection.settimeout(None)  # Commands can take a while, only the connect is quick
+        connection.sendall((json.dumps({'argv': argv, 'cwd': os.getcwd()}) + '\n').encode('utf-8'))
+        response = json.loads(connection.makefile('rb').readline())
+    return response['status'], response['output']
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = build_parser().parse_args(argv)
+    if args.command == 'stop':
+        response = send_to_daemon(['stop'], args.port)
+        print(response[1].rstrip() if response else 'No daemon listening on port {}'.format(args.port))
+        return 0
+    if args.command in DAEMON_COMMANDS and not args.local:
+        response = send_to_daemon([arg for arg in argv if arg != '--local'])
+        if response is not None:
+            sys.stdout.write(response[1])
+            return response[0]
+    args.function(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+# One entry point for every workflow, e.g.
+# python .\cli.py scrape --worker 1 --workers 3
+# python .\cli.py price-decks 2009-02-teledad --tables min_prices_sorted.txt
+# python .\cli.py gallery --table decks/decklists/collection-max-rarity.yaml --rows 26 --cols 15 --overlap 0.9
+# python .\cli.py history "Judgment Dragon" --metric median --last 20
+# python .\cli.py charts collection --format svg
+# python .\cli.py compare 2025-02-07 2025-07-14
+# python .\cli.py check-decks 2009-02-teledad 2008-03-returndad
+# Optional daemon, later calls from this folder are answered by it with everything already loaded:
+# python .\cli.py serve
+# python .\cli.py stop
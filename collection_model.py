@@ -0,0 +1,163 @@
+import os
+import pickle
+import time
+from yaml_io import YAMLError, file_stamp, load_yaml
+
+# Configs
+lists_index = 'lists.yaml'  # Lists main.py scrapes
+decks_index = 'decks/decklists/list_of_decks.yaml'
+binders_index = 'decks/decklists/list_of_binders.yaml'
+catalogue_file = 'decks/decklists/card_code_list.yaml'  # Card name -> image codes, max rarity first
+cache_file = 'collection_cache/collection.pickle'
+use_cache = True
+
+CACHE_VERSION = 1
+INDEX_FILES = (lists_index, decks_index, binders_index)
+
+_collection = None  # Loaded once per process, see get_collection()
+
+
+def parse_yaml_file(path):
+    # Same as CardList / get_card_lists: a broken file prints the error and loads as None
+    with open(path, 'r') as stream:
+        try:
+            return load_yaml(stream)
+        except YAMLError as exc:
+            print(exc)
+            return None
+
+
+class CardSet:
+    # One list, deck or binder yaml. Same getters as CardList, so it drops in wherever one used to be built
+
+    __slots__ = ('name', 'path', 'data')
+
+    def __init__(self, name, path, data):
+        self.name = name
+        self.path = path
+        self.data = data  # Parsed yaml, shared by every tool in the process so treat it as read only
+
+    def get_card_list(self):
+        return list(self.data or ())
+
+    def get_yaml_data(self):
+        return self.data
+
+    def get_path(self):
+        return self.path
+
+    def get_list_name(self):
+        return self.name
+
+
+class Collection:
+    # Every list, deck and binder plus the card code catalogue, parsed once. lists / decks / binders map the
+    # index names to CardSets in index order, so they can stand in for the old get_card_lists() dicts.
+
+    __slots__ = ('files', 'lists', 'decks', 'binders', 'catalogue')
+
+    def __init__(self, files):
+        self.files = files  # path -> ((mtime_ns, size), parsed yaml) for every source file
+        self.lists = self.card_sets(lists_index)
+        self.decks = self.card_sets(decks_index)
+        self.binders = self.card_sets(binders_index)
+        self.catalogue = self.files[catalogue_file][1] or {}
+
+    def card_sets(self, index_path):
+        card_sets = {}
+        for name, entry in (self.files[index_path][1] or {}).items():
+            if entry:  # Entries commented down to just the name load as None
+                card_sets[name] = CardSet(name, entry['path'], self.files[entry['path']][1])
+        return card_sets
+
+    def load_file(self, path):
+        """Parsed yaml of any file, e.g. a collection list outside the indexes, cached like the rest"""
+        cached = self.files.get(path)
+        stamp = file_stamp(path)
+        if cached is None or cached[0] != stamp:
+            self.files[path] = (stamp, parse_yaml_file(path))
+            if use_cache:
+                write_cache(self.files)
+        return self.files[path][1]
+
+
+# Cache #
+
+
+def read_cache(path=cache_file):
+    try:
+        with open(path, 'rb') as file:
+            version, files = pickle.load(file)
+    except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError):
+        return {}
+    return files if version == CACHE_VERSION else {}
+
+
+def write_cache(files, path=cache_file):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'wb') as file:
+        pickle.dump((CACHE_VERSION, files), file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
+
+
+def load_files(paths, previous):
+    # Reuses the cached parse of every file whose mtime and size are unchanged
+    files = {}
+    for path in paths:
+        stamp = file_stamp(path)
+        cached = previous.get(path)
+        files[path] = cached if cached is not None and cached[0] == stamp else (stamp, parse_yaml_file(path))
+    return files
+
+
+def build_collection(previous=None):
+    previous = previous or {}
+    files = load_files(INDEX_FILES + (catalogue_file,), previous)
+    referenced = [entry['path'] for index_path in INDEX_FILES for entry in (files[index_path][1] or {}).values()
+                  if entry]
+    files.update(load_files(referenced, previous))
+    # Files read through load_file() stay cached while they still exist
+    files.update(load_files([path for path in previous if path not in files and os.path.exists(path)], previous))
+    return Collection(files)
+
+
+def is_current(collection):
+    # Every source file still has the stamp it was parsed with, a few stats per call
+    try:
+        return all(file_stamp(path) == cached[0] for path, cached in collection.files.items())
+    except OSError:  # A file was removed or renamed
+        return False
+
+
+def get_collection(refresh=False):
+    """The collection for this process, parsing only the yaml files that changed since the cache was written.
+
+    Re-checks the file stamps on every call, so a long lived process (cli.py serve) picks up edited decks,
+    binders and lists without a restart.
+    """
+    global _collection
+    if _collection is None or refresh or not is_current(_collection):
+        if _collection is not None and not refresh:
+            previous = _collection.files
+        else:
+            previous = read_cache() if use_cache else {}
+        _collection = build_collection(previous)
+        if use_cache and (len(previous) != len(_collection.files) or
+                          any(previous.get(path) is not cached for path, cached in _collection.files.items())):
+            write_cache(_collection.files)
+    return _collection
+
+
+def load_yaml_file(path):
+    return get_collection().load_file(path)
+
+
+if __name__ == '__main__':
+    start = time.perf_counter()
+    collection = get_collection()
+    print('{} lists, {} decks, {} binders, {} catalogue cards from {} files in {:.3f}s'.format(
+        len(collection.lists), len(collection.decks), len(collection.binders), len(collection.catalogue),
+        len(collection.files), time.perf_counter() - start))
+
+# Warms (or refreshes) the collection cache, every tool reuses it through get_collection()
+# python .\collection_model.py
@@ -1,7 +1,7 @@
 import os
 import cv2
 import numpy as np
-from utils import get_card_lists
+from collection_model import get_collection, load_yaml_file
 
 # Configs
 overlay_percentage = 0.33  # How much of the card width to show (0.33 = 1/3 width visible)
@@ -289,10 +289,10 @@ def add_header_to_image(image, header_text):
 def generate_collection_table(yaml_file, output_name=None, custom_rows=None, custom_cols=None, custom_overlap=None):
     """Main function to generate collection table gallery"""
     # Load card code list for decoding
-    card_code_list = get_card_lists('decks/decklists/card_code_list.yaml')
+    card_code_list = get_collection().catalogue
 
     # Load card list from yaml
-    card_data = get_card_lists(yaml_file)
+    card_data = load_yaml_file(yaml_file)
 
     # Get header if exists
     header = card_data.get('Header', '')
@@ -336,7 +336,7 @@ def generate_custom_list_table(card_list, output_name, header_text=None, custom_
         return
 
     # Load card code list for decoding
-    card_code_list = get_card_lists('decks/decklists/card_code_list.yaml')
+    card_code_list = get_collection().catalogue
 
     # Convert simple list to format expected by create_table_gallery
     formatted_list = [(card, None) for card in card_list]
@@ -1,5 +1,11 @@
-from utils import get_card_lists
-from CardList import CardList
+import re
+import time
+import numpy as np
+from collection_model import get_collection
+
+# Configs
+merge_alternate_prints = True  # 'Dark Armed Dragon.' (a second print in the binder) counts as 'Dark Armed Dragon'
+chosen_decks = ['2009-02-teledad', '2009-02-teledad']  # Repeat a deck to build more than one copy of it
 
 
 def convert_decklist_yaml_to_clean_dictionary(decklist_yaml_data):
@@ -16,19 +22,132 @@ def convert_decklist_yaml_to_clean_dictionary(decklist_yaml_data):
     return converted_data
 
 
+def parse_quantity(value):
+    # Binder / deck quantities are ints or strings such as '3 ScR'
+    if isinstance(value, int):
+        return value
+    match = re.match(r'\s*(\d+)', str(value)) if value is not None else None
+    return int(match.group(1)) if match else 0
+
+
+def normalise_card_name(card_name):
+    return card_name.rstrip('.').strip() if merge_alternate_prints else card_name
+
+
+class DeckAllocator:
+    # Card x deck quantity matrix over the whole binder inventory, answers every allocation question with numpy
+    # column sums instead of subtracting one deck at a time.
+
+    def __init__(self, inventory, decks):
+        # inventory: {card: qty} summed over binders, decks: {deck name: {card: qty}}
+        self.deck_names = list(decks)
+        self.deck_index = {deck_name: column for column, deck_name in enumerate(self.deck_names)}
+        card_names = sorted({card for deck in decks.values() for card in deck})
+        self.card_names = card_names
+        card_index = {card: row for row, card in enumerate(card_names)}
+
+        self.matrix = np.zeros((len(card_names), len(self.deck_names)), dtype=np.int32)
+        for column, deck_name in enumerate(self.deck_names):
+            for card, quantity in decks[deck_name].items():
+                self.matrix[card_index[card], column] += quantity
+        self.inventory = np.array([inventory.get(card, 0) for card in card_names], dtype=np.int32)
+
+    def deck_counts(self, deck_names):
+        counts = np.zeros(len(self.deck_names), dtype=np.int32)
+        for deck_name in deck_names:
+            counts[self.deck_index[deck_name]] += 1
+        return counts
+
+    def required(self, deck_names):
+        return self.matrix @ self.deck_counts(deck_names)
+
+    def can_build_together(self, deck_names):
+        return bool((self.required(deck_names) <= self.inventory).all())
+
+    def buy_list(self, deck_names):
+        """{card: copies to buy} so every deck in deck_names can be built at the same time"""
+        missing = np.maximum(self.required(deck_names) - self.inventory, 0)
+        return {self.card_names[row]: int(missing[row]) for row in np.flatnonzero(missing)}
+
+    def buildable_alone(self):
+        return [deck_name for deck_name, fits in zip(self.deck_names, (self.matrix <= self.inventory[:, None]).all(axis=0))
+                if fits]
+
+    def max_buildable_set(self, deck_names=None):
+        """Largest set of distinct decks that can all be built at once, branch and bound over the decks"""
+        candidates = [self.deck_index[deck_name] for deck_name in (deck_names or self.buildable_alone())]
+        # Decks using the least of the scarcest cards first, so good sets are found early and prune more
+        scarcity = self.matrix / np.maximum(self.inventory, 1)[:, None]
+        candidates.sort(key=lambda column: scarcity[:, column].sum())
+        columns = self.matrix[:, candidates].T.copy()
+
+        best = []
+        chosen = []
+
+        def search(position, remaining):
+            nonlocal best
+            if len(chosen) > len(best):
+                best = list(chosen)
+            if position == len(columns):
+                return
+            # Bound: per card, how many of the later decks that still fit could share what is left of it
+            fits = (columns[position:] <= remaining).all(axis=1)
+            if len(chosen) + int(fits.sum()) <= len(best):
+                return
+            per_card = (np.cumsum(np.sort(columns[position:][fits], axis=0), axis=0) <= remaining).sum(axis=0)
+            if len(chosen) + int(per_card.min(initial=len(fits))) <= len(best):
+                return
+            for offset in np.flatnonzero(fits):
+                column = position + offset
+                chosen.append(column)
+                search(column + 1, remaining - columns[column])
+                chosen.pop()
+                if len(chosen) + int(fits[offset + 1:].sum()) <= len(best):
+                    return
+
+        search(0, self.inventory.copy())
+        return [self.deck_names[candidates[column]] for column in best]
+
+
+def load_binder_inventory(decklist_checker):
+    # Sums every binder, the same card can sit in more than one
+    inventory = {}
+    list_of_binders = decklist_checker.get_list_of_binders()
+    for current_binder_list in list_of_binders:
+        decklist_checker.get_yaml_list_data_binders(current_binder_list, list_of_binders)
+        for card, quantity in decklist_checker.get_yaml_data()['Monsters'].items():
+            card = normalise_card_name(card)
+            inventory[card] = inventory.get(card, 0) + parse_quantity(quantity)
+    return inventory
+
+
+def load_decks(decklist_checker, deck_names=None):
+    decks = {}
+    for deck in deck_names or decklist_checker.list_of_decks:
+        decklist_checker.get_yaml_list_data(decklist_checker.list_of_decks[deck])
+        clean_decklist_data = convert_decklist_yaml_to_clean_dictionary(decklist_checker.get_yaml_data())['Monsters']
+        deck_cards = {}
+        for card, quantity in clean_decklist_data.items():
+            card = normalise_card_name(card)
+            deck_cards[card] = deck_cards.get(card, 0) + parse_quantity(quantity)
+        decks[deck] = deck_cards
+    return decks
+
+
 class Decklist_Checker:
     def __init__(self):
-        self.list_of_decks = get_card_lists('decks/decklists/list_of_decks.yaml')
-        self.list_of_binders = get_card_lists('decks/decklists/list_of_binders.yaml')
+        collection = get_collection()
+        self.list_of_decks = collection.decks
+        self.list_of_binders = collection.binders
 
     def get_yaml_list_data(self, current_deck_list):
-        self.current_list = CardList(current_deck_list['path'], current_deck_list)
+        self.current_list = current_deck_list
         self.list_name = (self.current_list.get_list_name())
         self.yaml_data = (self.current_list.get_yaml_data())
         self.path = (self.current_list.get_path())
 
     def get_yaml_list_data_binders(self, current_deck_list, full_card_lists):
-        self.current_list = CardList(full_card_lists[current_deck_list]['path'], current_deck_list)
+        self.current_list = full_card_lists[current_deck_list]
         self.list_name = (self.current_list.get_list_name())
         self.yaml_data = (self.current_list.get_yaml_data())
         self.path = (self.current_list.get_path())
@@ -43,41 +162,30 @@ class Decklist_Checker:
         return self.yaml_data
 
 
-if __name__ == '__main__':
+def run_check(deck_names=None):
+    chosen = deck_names or chosen_decks
     decklist_checker = Decklist_Checker()
-    list_of_binders = decklist_checker.get_list_of_binders()
+    start = time.time()
+    allocator = DeckAllocator(load_binder_inventory(decklist_checker), load_decks(decklist_checker))
+    loaded = time.time()
 
-    # list_of_decks = ['2009-twilight', '2009-twilight']
-    list_of_decks = ['2009-teledad', '2009-teledad']
-    # list_of_decks = ['2009-twilight', '2009-teledad']
-    # list_of_decks = ['2011-tenguplant', '2011-tenguplant']
-    # list_of_decks = ['2012-dinorabbit', '2012-dinorabbit']
-    # list_of_decks = ['2011-tenguplant', '2012-dinorabbit']
-    full_binder_card_list = {}
+    alone = allocator.buildable_alone()
+    print('Buildable on their own ({}/{}): {}'.format(len(alone), len(allocator.deck_names), ', '.join(alone)))
 
-    # getting the binder list json yaml
-    for current_binder_list in list_of_binders:
-        decklist_checker.get_yaml_list_data_binders(current_binder_list, list_of_binders)
-        binder_list_name = decklist_checker.get_list_name()
-        card_list_in_deck = decklist_checker.get_yaml_data()
-
-        binder_card_list = (card_list_in_deck['Monsters'])
-        full_binder_card_list.update(binder_card_list)
-
-    # getting the deck list json yaml
-    for deck in list_of_decks:
-        current_deck_list = (decklist_checker.list_of_decks[deck])
-        decklist_checker.get_yaml_list_data(current_deck_list)
-        deck_list_name = decklist_checker.get_list_name()
-        card_list_in_deck = decklist_checker.get_yaml_data()
-
-        clean_decklist_data = (convert_decklist_yaml_to_clean_dictionary(card_list_in_deck))
-        clean_decklist_data = (clean_decklist_data['Monsters'])
-        # start subtracting from full binder card list
-
-        for item, quantity in clean_decklist_data.items():
-            if item in full_binder_card_list and full_binder_card_list[item] >= quantity:
-                full_binder_card_list[item] -= quantity
-            else:
-                print(
-                    f"Not enough copies of {item}. Available: {full_binder_card_list.get(item, 0)}, Requested: {quantity}")
+    if allocator.can_build_together(chosen):
+        print('Can build together: {}'.format(', '.join(chosen)))
+    else:
+        print('Cannot build together: {}'.format(', '.join(chosen)))
+        required = allocator.required(chosen)
+        for item, quantity in allocator.buy_list(chosen).items():
+            row = allocator.card_names.index(item)
+            print(f"Not enough copies of {item}. Available: {allocator.inventory[row]}, Requested: {required[row]}, "
+                  f"Buy: {quantity}")
+
+    best = allocator.max_buildable_set()
+    print('Most decks at once ({}): {}'.format(len(best), ', '.join(best)))
+    print('Loaded in {:.2f}s, solved in {:.3f}s'.format(loaded - start, time.time() - loaded))
+
+
+if __name__ == '__main__':
+    run_check()
@@ -1,9 +1,7 @@
 import os
-import cv2
-import numpy as np
-from utils import get_card_lists, get_number_out_of_string
-from CardList import CardList
-from prettytable import PrettyTable
+from utils import get_number_out_of_string
+from collection_model import get_collection
+from yaml_io import file_stamp
 from datetime import datetime
 import datetime
 
@@ -13,6 +11,18 @@ display_rarity_in_decklist = True
 generate_decklist_gallery = False  # Generate the Pic Images
 generate_decklist_prices = True    # Generate .txt of deck prices
 generate_binder_gallery = False    # Generate Binder Gallery
+card_images_root = 'decks/decklists/raw_imgs'
+price_collections = ['collection_deck_builder', 'collection_deck_core',
+                     'collection_extra_deck', 'collection_old_school',
+                     'buylist_2007_08_max_deck', 'buylist_cool_singles_t2',
+                     'buylist_edison', 'buylist_lightswornrulers',
+                     ]
+pricing_tables = ['min_prices_sorted.txt', 'max_prices_sorted.txt',
+                  'mean_prices_sorted.txt', 'median_prices_sorted.txt']  # Full
+# pricing_tables = ['min_prices_sorted.txt']  # Single
+
+_card_image_index = None  # (folder mtimes, image name -> path), see card_image_index()
+_price_table_cache = {}  # (price table, collections) -> ((mtime_ns, size), data table)
 
 
 # Generating Decklist Gallery #
@@ -29,39 +39,50 @@ def calculate_row_cols(deck_of_decoded_cards, image_name):
     return rows, cols
 
 
+def card_image_index(refresh=False):
+    # One walk over every image folder instead of one per card, first folder in walk order wins.
+    # Adding, removing or renaming an image changes its folder's mtime, so a long lived process (cli.py serve)
+    # only stats the folders on later calls and walks again when one of them changed.
+    global _card_image_index
+    if _card_image_index is None or refresh or not image_folders_unchanged(_card_image_index[0]):
+        folder_stamps = {}
+        image_index = {}
+        for dirpath, dirnames, list_of_images in os.walk(card_images_root):
+            folder_stamps[dirpath] = os.stat(dirpath).st_mtime_ns
+            for file in list_of_images:
+                image_index.setdefault(file, os.path.join(dirpath, file))
+        _card_image_index = (folder_stamps, image_index)
+    return _card_image_index[1]
+
+
+def image_folders_unchanged(folder_stamps):
+    try:
+        return bool(folder_stamps) and all(os.stat(folder).st_mtime_ns == stamp
+                                           for folder, stamp in folder_stamps.items())
+    except OSError:  # A folder was removed
+        return False
+
+
 def get_full_deck_list_image_paths(deck_of_decoded_cards):
     full_deck_list_image_paths = []
-    path_to_card_images = "decks/decklists/raw_imgs"  # root directory of images
+    image_index = card_image_index()
     for current_card in deck_of_decoded_cards:  # For every card in my deck
         current_card = current_card + '.jpg'
-        card_image_found = False
-        for dirpath, dirnames, list_of_images in os.walk(path_to_card_images):  # check in every folder card
-            for file in list_of_images:
-                if current_card == file:
-                    card_image_found = True
-                    image_paths = [os.path.join(dirpath, current_card)]
-                    full_deck_list_image_paths.append(image_paths)
-                    break
-
-        if not card_image_found:
+        if current_card not in image_index:
             print('Trying .png. Image Not Found: {}'.format(current_card))  # Card must be in card_code_list.yaml
             current_card = current_card.replace(".jpg", ".png")
-            card_image_found = False
-            for dirpath, dirnames, list_of_images in os.walk(path_to_card_images):  # check in every folder card
-                for file in list_of_images:
-                    if current_card == file:
-                        card_image_found = True
-                        image_paths = [os.path.join(dirpath, current_card)]
-                        full_deck_list_image_paths.append(image_paths)
-                        break
-
-        if not card_image_found:
+
+        if current_card in image_index:
+            full_deck_list_image_paths.append([image_index[current_card]])
+        else:
             print('Image Not Found: {}'.format(current_card))  # Card must be in card_code_list.yaml
 
     return full_deck_list_image_paths
 
 
 def create_binder_grid_image(deck_of_decoded_cards):
+    import cv2  # OpenCV / NumPy only load when images are generated, DeckBuilder users don't pay for them
+    import numpy as np
     rows, cols = 3, 3
     image_width = 450
     image_height = 657
@@ -88,6 +109,8 @@ def create_binder_grid_image(deck_of_decoded_cards):
 
 
 def create_grid_image(deck_of_decoded_cards, image_name):
+    import cv2
+    import numpy as np
     rows, cols = calculate_row_cols(deck_of_decoded_cards, image_name)
     image_width = 450
     image_height = 657
@@ -191,6 +214,8 @@ def generate_image(card_list_in_deck, img_name):
 
 
 def place_header_on_decklist(full_image, header):
+    import cv2
+    import numpy as np
     font = cv2.FONT_HERSHEY_TRIPLEX
     font_scale = 4
     color = (255, 255, 255)  # White
@@ -203,6 +228,7 @@ def place_header_on_decklist(full_image, header):
 
 
 def combine_images(main_image, side_image, extra_image, deck_list_name, header):
+    import cv2
     pics_to_combine = list(filter(lambda x: x is not None, [main_image, side_image, extra_image]))
     combined_pic = cv2.vconcat(pics_to_combine)
     final_image_with_header = place_header_on_decklist(combined_pic, header)
@@ -210,6 +236,7 @@ def combine_images(main_image, side_image, extra_image, deck_list_name, header):
 
 
 def combine_binder_images(page_1, page_2, index):
+    import cv2
     pics_to_combine = list(filter(lambda x: x is not None, [page_1, page_2]))
     combined_pic = cv2.hconcat(pics_to_combine)
     cv2.imwrite('RemasteredDeckLists/binders/' + binder_list_name + '_{}'.format(index) + '.jpg', combined_pic)
@@ -218,14 +245,21 @@ def combine_binder_images(page_1, page_2, index):
 
 
 def get_card_value_data_table(collection_name, list_name):
-    price_table_path_root = 'sorted_pricing/'
-    final_data_table = ''
+    # Every deck reads the same tables, so each is only rescanned once the sorted price file changes
+    price_table_path = 'sorted_pricing/' + list_name
+    key = (list_name, tuple(collection_name))
+    stamp = file_stamp(price_table_path)
+    cached = _price_table_cache.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
 
-    with open(price_table_path_root + list_name, 'r') as file:
+    final_data_table = ''
+    with open(price_table_path, 'r') as file:
         lines = file.readlines()
         for coll in collection_name:
             final_data_table += (get_data_table_of_last_instance(coll, lines))
 
+    _price_table_cache[key] = (stamp, final_data_table)
     return final_data_table
 
 
@@ -320,6 +354,7 @@ def search_thru_price_data_for_card(card_list_in_deck, most_recent_price_data):
 
 
 def generate_pretty_table_decklist_price(full_deck_prices, deck_list_name, pricing_variable):
+    from prettytable import PrettyTable
     value_index, qty_index, rarity_index = 0, 1, 2
     sectional_prices = {}
     my_table = PrettyTable(['Card', '$'])
@@ -367,6 +402,7 @@ def generate_pretty_table_decklist_price(full_deck_prices, deck_list_name, prici
 
 
 def generate_binder_dicts():
+    import cv2
     binder_dict = {}
     page_x = []
     page_number = 0
@@ -433,9 +469,10 @@ def generate_binder_dicts():
 
 class DeckBuilder:
     def __init__(self):
-        self.list_of_decks = get_card_lists('decks/decklists/list_of_decks.yaml')
-        self.card_code_list = get_card_lists('decks/decklists/card_code_list.yaml')
-        self.list_of_binders = get_card_lists('decks/decklists/list_of_binders.yaml')
+        collection = get_collection()
+        self.list_of_decks = collection.decks
+        self.card_code_list = collection.catalogue
+        self.list_of_binders = collection.binders
 
         self.current_list = ''
         self.list_name = ''
@@ -481,34 +518,30 @@ class DeckBuilder:
         self.deck_of_decoded_cards = []
 
     def get_yaml_list_data(self, current_deck_list, full_card_lists):
-        self.current_list = CardList(full_card_lists[current_deck_list]['path'], current_deck_list)
+        self.current_list = full_card_lists[current_deck_list]
         self.list_name = (self.current_list.get_list_name())
         self.yaml_data = (self.current_list.get_yaml_data())
         self.path = (self.current_list.get_path())
 
 
-if __name__ == '__main__':
+def run_decklists(deck_names=None, gallery=None, prices=None, binders=None, pricing_variables=None):
+    # The module flags are the defaults, cli.py passes its options in here
+    global deckbuilder, card_code_list, list_of_binders, card_list_in_deck, binder_list_name
+    gallery = generate_decklist_gallery if gallery is None else gallery
+    prices = generate_decklist_prices if prices is None else prices
+    binders = generate_binder_gallery if binders is None else binders
     deckbuilder = DeckBuilder()
     list_of_decks = deckbuilder.get_list_of_decks()
     card_code_list = deckbuilder.get_card_code_list()
     list_of_binders = deckbuilder.get_list_of_binders()
 
-    collection_name = ['collection_deck_builder', 'collection_deck_core',
-                       'collection_extra_deck', 'collection_old_school',
-                       'buylist_2007_08_max_deck', 'buylist_cool_singles_t2',
-                       'buylist_edison', 'buylist_lightswornrulers',
-                       ]
-    pricing_variable_full = ['min_prices_sorted.txt', 'max_prices_sorted.txt',
-                             'mean_prices_sorted.txt', 'median_prices_sorted.txt']  # Full
-    # pricing_variable_full = ['min_prices_sorted.txt']  # Single
-
-    for current_deck_list in list_of_decks:
+    for current_deck_list in deck_names or list_of_decks:
         deckbuilder.get_yaml_list_data(current_deck_list, list_of_decks)
         deck_list_name = deckbuilder.get_list_name()
         card_list_in_deck = deckbuilder.get_yaml_data()
 
         # # Generate Decklist Gallery
-        if generate_decklist_gallery:
+        if gallery:
             header = deckbuilder.get_header()
             combine_images(generate_image(card_list_in_deck, 'Main'),
                            generate_image(card_list_in_deck, 'Side'),
@@ -516,14 +549,14 @@ if __name__ == '__main__':
                            deck_list_name, header)
 
         # # Generate Decklist Prices
-        if generate_decklist_prices:
-            for pricing_variable in pricing_variable_full:
-                most_recent_price_data = get_card_value_data_table(collection_name, pricing_variable)
+        if prices:
+            for pricing_variable in pricing_variables or pricing_tables:
+                most_recent_price_data = get_card_value_data_table(price_collections, pricing_variable)
                 full_deck_prices = search_thru_price_data_for_card(card_list_in_deck, most_recent_price_data)
                 generate_pretty_table_decklist_price(full_deck_prices, deck_list_name, pricing_variable)
 
     # # Generate Binder Gallery
-    if generate_binder_gallery:
+    if binders:
         for current_binder_list in list_of_binders:
             deckbuilder.get_yaml_list_data(current_binder_list, list_of_binders)
             binder_list_name = deckbuilder.get_list_name()
@@ -532,6 +565,10 @@ if __name__ == '__main__':
             generate_binder_dicts()
 
 
+if __name__ == '__main__':
+    run_decklists()
+
+
 # To Run PS C:\Users\Richard Le\PycharmProjects\SellerPortalDatabase> python .\decklist_gallery.py
 #       Updates new text data based on already scraped .txt database. Recommended running after price scraping (weekly)
 
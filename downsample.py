@@ -0,0 +1,62 @@
+import numpy as np
+
+# Configs
+default_buckets = 1000  # About one bucket per pixel column of a 10in chart at 100 dpi
+
+PERIODS = ('weekly', 'monthly')
+
+
+def as_numbers(x):
+    # Dates ('YYYY-MM-DD' strings, datetime.date or datetime64) -> float days, numbers pass through
+    x = np.asarray(x)
+    if x.dtype.kind in 'USO':
+        x = x.astype('datetime64[D]')
+    if x.dtype.kind == 'M':
+        return x.astype('datetime64[D]').astype(np.int64).astype(np.float64)
+    return x.astype(np.float64)
+
+
+# Plotting #
+
+
+def minmax_downsample(x, y, buckets=default_buckets):
+    """Indexes of the lowest and highest point in every one of `buckets` equal x ranges, plus the first and last
+    point, in x order. One bucket per pixel column keeps every spike a full resolution plot would show."""
+    count = len(y)
+    if count <= 2 * buckets:
+        return np.arange(count)
+    x = as_numbers(x)
+    y = np.asarray(y, dtype=np.float64)
+    span = x[-1] - x[0]
+    if span <= 0:
+        return np.array([int(np.argmin(y)), int(np.argmax(y))]) if count > 1 else np.arange(count)
+    bucket = np.minimum(((x - x[0]) / span * buckets).astype(np.int64), buckets - 1)
+    order = np.lexsort((y, bucket))  # By bucket, then by value
+    sorted_bucket = bucket[order]
+    starts = np.flatnonzero(np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]])
+    ends = np.r_[starts[1:], count] - 1
+    return np.unique(np.r_[0, order[starts], order[ends], count - 1])
+
+
+# Rollups #
+
+
+def period_starts(dates, period):
+    """First day of the week (Monday) or month of every date, as datetime64[D]"""
+    days = np.asarray(dates).astype('datetime64[D]')
+    if period == 'weekly':
+        return days - (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+    if period == 'monthly':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    raise ValueError('Unknown period {}, expected one of {}'.format(period, PERIODS))
+
+
+def rollup(dates, values, period):
+    """(period start, min, max, last value) arrays for a date sorted series, missing values are ignored"""
+    starts = period_starts(dates, period)
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return starts, values, values, values
+    first = np.flatnonzero(np.r_[True, starts[1:] != starts[:-1]])
+    last = np.r_[first[1:], len(values)] - 1
+    return starts[first], np.fmin.reduceat(values, first), np.fmax.reduceat(values, first), values[last]
@@ -3,6 +3,9 @@ from decklist_gallery import DeckBuilder
 from utils import convert_raw_days_to_simplified_notation, calculate_difference_between_timedelta, \
     get_date_price_value_list, find_lines_of_all_input, format_difference_string
 
+# Configs
+show_history_metrics = True  # Adds 3M volatility, drawdown from peak and percentile of history (history_metrics.py)
+
 
 def get_rarity_from_card_code(card):  # Duplicate Func
     for decode in card_code_list:  # Decoded english name of decode cards
@@ -58,6 +61,7 @@ def price_data_dict(card_name):
                 card_price_data_dict[card_name][convert_raw_days_to_simplified_notation(delta)] = [difference,
                                                                                                    percent_diff]
                 card_price_data_dict[card_name]['now_price'] = values[-1]
+                card_price_data_dict[card_name]['now_date'] = dates[-1]
                 closest_dates.update(closest_date)
         data_lock = True
     return card_price_data_dict, closest_dates
@@ -74,17 +78,34 @@ def add_row_to_format_list_table(card, item, table):
         full_data_list.append(convert_price_change_list_to_string(item[card][x]))
     card_data = [card, item[card]['rarity'], item[card]['now_price']]
     card_data.extend(full_data_list)
+    if show_history_metrics:
+        card_data.extend(item[card]['metrics'])
     table.add_row([*card_data])
 
 
+def history_metric_columns(metrics, card, now_date):
+    from history_metrics import latest_metrics, format_metric
+    values = latest_metrics(metrics, card, since=now_date)  # Variants last scraped before the table's price are stale
+    if values is None:
+        return ['-', '-', '-']
+    return [format_metric(values['volatility']), format_metric(values['drawdown']),
+            format_metric(values['percentile'], '')]
+
+
 def generate_format_history_table(list_of_cards):
     full_table = []
+    if show_history_metrics:
+        from history_metrics import load_metrics
+        metrics = load_metrics(0)  # Min, same as price_data_dict
     for node in list_of_cards:
         if node == 'Header':
             continue
         for card in list_of_cards[node]:
             try:
                 card_price_data_dict, closest_dates = price_data_dict(card)
+                if show_history_metrics:
+                    now_date = card_price_data_dict[card]['now_date']
+                    card_price_data_dict[card]['metrics'] = history_metric_columns(metrics, card, now_date)
                 full_table.append(card_price_data_dict)
             except IndexError:
                 pass
@@ -98,7 +119,8 @@ def generate_format_history_table(list_of_cards):
                             '6M {}'.format(closest_dates['6M']),
                             '1Y {}'.format(closest_dates['1Y']),
                             '2Y {}'.format(closest_dates['2Y']),
-                            '4Y {}'.format(closest_dates['4Y'])])
+                            '4Y {}'.format(closest_dates['4Y'])] +
+                           (['Vol 3M', 'Drawdown', 'Pctl'] if show_history_metrics else []))
     my_table.align = 'l'
     my_table.align['$'] = 'r'
 
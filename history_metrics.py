@@ -0,0 +1,249 @@
+import os
+import time
+import warnings
+import numpy as np
+import history_store
+from movers import price_matrix
+
+# Configs
+metrics_directory = 'metrics'  # history_store/metrics/m<metric>.npz, updated after every ingest that adds dates
+metrics_format = history_store.FORMAT_LISTINGS  # Pre-2023 TCG prices are a different metric, never mixed in
+rolling_days = 90  # Volatility and rolling median look back this many days from every scrape date
+chunk_columns = 32  # Dates per vectorised block, bounds the cards x dates x window arrays
+
+METRICS = ('volatility', 'drawdown', 'rolling_median', 'percentile')
+METRICS_VERSION = 1
+
+_metrics = {}  # metric -> (manifest stamp, metric columns) for this process, see load_metrics()
+
+
+# Rolling windows #
+
+
+def window_starts(dates, days=rolling_days):
+    # First date column inside (date - days, date] for every date column
+    day_numbers = dates.astype('datetime64[D]').astype(np.int64)
+    return np.searchsorted(day_numbers, day_numbers - days, side='right')
+
+
+def rolling_view(values, starts, columns):
+    """values[card, column - k] for every column and k < widest window, NaN outside each column's window"""
+    width = int((columns - starts[columns]).max()) + 1 if len(columns) else 1
+    offsets = columns[:, None] - np.arange(width)[None, :]
+    inside = offsets >= starts[columns][:, None]
+    return np.where(inside[None], values[:, np.maximum(offsets, 0)], np.nan)
+
+
+def log_returns(prices):
+    # log(price / previous priced point of the same card), NaN where either is missing
+    card_count, date_count = prices.shape
+    priced = ~np.isnan(prices)
+    previous = np.maximum.accumulate(np.where(priced, np.arange(date_count), -1), axis=1)
+    prior = np.hstack([np.full((card_count, 1), -1), previous[:, :-1]])
+    old = np.take_along_axis(prices, np.maximum(prior, 0), axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(priced & (prior >= 0), np.log(prices / old), np.nan)
+
+
+def compute_metrics(prices, dates, columns):
+    """Every metric of every card (row) for the given date columns, from the full price rows.
+
+    volatility: std of log returns between scrapes over the rolling window, in percent
+    drawdown: percent below the highest price up to that date
+    rolling_median: median price over the rolling window
+    percentile: percent of the card's prices up to that date at or below the price on that date
+    Cards without a price on a date get NaN for it.
+    """
+    card_count = len(prices)
+    results = {name: np.full((card_count, len(columns)), np.nan) for name in METRICS}
+    if not card_count or not len(columns):
+        return results
+    starts = window_starts(dates)
+    returns = log_returns(prices)
+    peaks = np.fmax.accumulate(prices, axis=1)
+    priced = ~np.isnan(prices[:, columns])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        results['drawdown'] = np.where(priced, (prices[:, columns] / peaks[:, columns] - 1) * 100, np.nan)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # All-NaN windows and single-return windows stay NaN
+        for chunk_start in range(0, len(columns), chunk_columns):
+            chunk = columns[chunk_start:chunk_start + chunk_columns]
+            block = slice(chunk_start, chunk_start + len(chunk))
+            results['rolling_median'][:, block] = np.nanmedian(rolling_view(prices, starts, chunk), axis=2)
+            window_returns = rolling_view(returns, starts, chunk)
+            enough = (~np.isnan(window_returns)).sum(axis=2) >= 2
+            results['volatility'][:, block] = np.where(enough, np.nanstd(window_returns, axis=2, ddof=1) * 100,
+                                                       np.nan)
+
+            # Expanding window: every earlier column of the card, compared at once
+            history = prices[:, :chunk.max() + 1]
+            earlier = np.arange(history.shape[1])[None, :] <= chunk[:, None]
+            current = prices[:, chunk][:, :, None]
+            at_or_below = ((history[:, None, :] <= current) & earlier[None]).sum(axis=2)
+            counted = ((~np.isnan(history))[:, None, :] & earlier[None]).sum(axis=2)
+            results['percentile'][:, block] = at_or_below / np.maximum(counted, 1) * 100
+
+    for name in METRICS:
+        results[name][~priced] = np.nan
+    return results
+
+
+# Cache #
+
+
+def metrics_path(store_root, metric):
+    return os.path.join(store_root, metrics_directory, 'm{}.npz'.format(metric))
+
+
+def manifest_stamp(store_root):
+    manifest_path = os.path.join(store_root, history_store.MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return np.array([0, 0], dtype=np.int64)
+    stat = os.stat(manifest_path)
+    return np.array([stat.st_mtime_ns, stat.st_size], dtype=np.int64)
+
+
+def read_metrics(path):
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            columns = {column: data[column] for column in data.files}
+    except (OSError, ValueError):
+        return None
+    if 'version' not in columns or int(columns['version']) != METRICS_VERSION:
+        return None
+    return columns
+
+
+def reusable_rows(previous, cards, conditions, dates, prices):
+    """Previous row of every card whose earlier prices are unchanged, -1 where the card needs a full rebuild"""
+    reuse = np.full(len(cards), -1, dtype=np.int64)
+    old_count = len(previous['dates'])
+    if old_count > len(dates) or not np.array_equal(previous['dates'], dates[:old_count]):
+        return reuse  # A date was added or dropped before the tail, everything shifts
+    old_keys = {key: row for row, key in enumerate(zip(previous['cards'].tolist(), previous['conditions'].tolist()))}
+    for row, key in enumerate(zip(cards.tolist(), conditions.tolist())):
+        reuse[row] = old_keys.get(key, -1)
+    found = np.flatnonzero(reuse >= 0)
+    same = np.array([np.array_equal(prices[row, :old_count], previous['prices'][reuse[row]], equal_nan=True)
+                     for row in found], dtype=bool)
+    reuse[found[~same]] = -1
+    return reuse
+
+
+def update_metrics(metric=0, store_root=history_store.history_store_root, history=None):
+    """Metrics of every card for one price metric, computing only the dates added since the last update.
+
+    Cards with a new or re-ingested earlier price are rebuilt in full, the rest only get their new tail.
+    """
+    start = time.time()
+    path = metrics_path(store_root, metric)
+    stamp = manifest_stamp(store_root)
+    previous = read_metrics(path)
+    if previous is not None and np.array_equal(previous['stamp'], stamp):
+        return previous
+
+    history = history_store.load_history(store_root) if history is None else history
+    cards, conditions, dates, prices, _ = price_matrix(history, metric, metrics_format)
+    columns = {'cards': cards, 'conditions': conditions, 'dates': dates, 'prices': prices}
+    for name in METRICS:
+        columns[name] = np.full(prices.shape, np.nan)
+
+    reuse = reusable_rows(previous, cards, conditions, dates, prices) if previous is not None \
+        else np.full(len(cards), -1, dtype=np.int64)
+    old_count = len(previous['dates']) if previous is not None else 0
+    tail_rows = np.flatnonzero(reuse >= 0)
+    full_rows = np.flatnonzero(reuse < 0)
+    all_columns = np.arange(len(dates))
+
+    for name in METRICS:
+        columns[name][tail_rows, :old_count] = previous[name][reuse[tail_rows]] if len(tail_rows) else 0
+    tail = compute_metrics(prices[tail_rows], dates, all_columns[old_count:])
+    full = compute_metrics(prices[full_rows], dates, all_columns)
+    for name in METRICS:
+        columns[name][tail_rows, old_count:] = tail[name]
+        columns[name][full_rows] = full[name]
+
+    columns['version'] = np.array(METRICS_VERSION)
+    columns['stamp'] = stamp
+    history_store.write_partition(path, columns)
+    print('Metrics m{}: {} cards updated on {} new dates, {} rebuilt in {:.2f}s'.format(
+        metric, len(tail_rows), len(dates) - old_count, len(full_rows), time.time() - start))
+    return columns
+
+
+def load_metrics(metric=0, store_root=history_store.history_store_root, refresh=False):
+    """update_metrics() once per process and again only when the history store manifest changes"""
+    stamp = manifest_stamp(store_root)
+    cached = _metrics.get((store_root, metric))
+    if cached is None or not np.array_equal(cached[0], stamp) or refresh:
+        _metrics[(store_root, metric)] = (stamp, update_metrics(metric, store_root))
+    return _metrics[(store_root, metric)][1]
+
+
+# Queries #
+
+
+def find_card(metrics, card_name, condition=None, since=None):
+    """Row of a card: exact name and condition, else the latest scraped card whose name contains card_name, or -1.
+
+    Decklists name cards without rarity ('Lonefire Blossom'), the lists add it ('Lonefire Blossom Secret 1st'),
+    the most recently scraped match stands in for the copy the list tracks, the priciest one on ties.
+    Rows last scraped before since (the caller's own table dates) are stale variants and never match.
+    """
+    names = metrics['cards']
+    matches = np.flatnonzero(names == card_name)
+    if condition is not None and len(matches):
+        exact = matches[metrics['conditions'][matches] == condition]
+        matches = exact if len(exact) else matches
+    matches = current_rows(metrics, matches, since)
+    if not len(matches):
+        matches = current_rows(metrics, np.flatnonzero(np.char.find(names, card_name) >= 0), since)
+    if not len(matches):
+        return -1
+    latest = np.array([latest_column(metrics, row) for row in matches])
+    prices = metrics['prices'][matches, latest]
+    return int(matches[np.lexsort((prices, latest))[-1]])
+
+
+def current_rows(metrics, rows, since=None):
+    # Rows with a price, scraped on or after since when given
+    latest = np.array([latest_column(metrics, row) for row in rows], dtype=np.int64)
+    current = latest >= 0
+    if since is not None:
+        current &= metrics['dates'][np.maximum(latest, 0)] >= np.datetime64(since, 'D')
+    return rows[current]
+
+
+def latest_column(metrics, row):
+    priced = np.flatnonzero(~np.isnan(metrics['prices'][row]))
+    return int(priced[-1]) if len(priced) else -1
+
+
+def latest_metrics(metrics, card_name, condition=None, since=None):
+    """{'card', 'condition', 'date', 'price', volatility, drawdown, rolling_median, percentile} at the card's
+    latest scrape, None when the card has no priced history on or after since"""
+    row = find_card(metrics, card_name, condition, since)
+    if row < 0:
+        return None
+    column = latest_column(metrics, row)
+    values = {'card': str(metrics['cards'][row]), 'condition': str(metrics['conditions'][row]),
+              'date': str(metrics['dates'][column]), 'price': float(metrics['prices'][row, column])}
+    values.update({name: float(metrics[name][row, column]) for name in METRICS})
+    return values
+
+
+def format_metric(value, suffix='%'):
+    return '-' if value is None or np.isnan(value) else '{:.1f}{}'.format(value, suffix)
+
+
+if __name__ == '__main__':
+    history_store.ingest_archive()
+    for metric in range(len(history_store.METRIC_COLUMNS)):
+        columns = load_metrics(metric)
+        print('m{} ({}): {} cards x {} dates'.format(metric, history_store.METRIC_NAMES[metrics_format][metric],
+                                                     len(columns['cards']), len(columns['dates'])))
+
+# Rolling volatility, drawdown from peak, rolling median and percentile of history for every card in history_store
+# python .\history_metrics.py
+#       Builds or updates history_store/metrics/m0..m3.npz, later runs only compute the newly scraped dates.
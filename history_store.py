@@ -0,0 +1,423 @@
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import downsample
+
+# Configs
+listings_root = 'full_listings'
+history_store_root = 'history_store'
+incremental_ingest = True  # Only ingest snapshot files not already in the store
+
+FORMAT_LISTINGS = 0  # 2023+ tables: metrics are Min, Max, Mean, Median
+FORMAT_TCG = 1       # Pre-2023 tables: metrics are TCG Lowest, TCG Last Sold, TCG Market Price, -
+FORMAT_NAMES = {FORMAT_LISTINGS: 'listings', FORMAT_TCG: 'tcg'}
+METRIC_NAMES = {FORMAT_LISTINGS: ['Min', 'Max', 'Mean', 'Median'],
+                FORMAT_TCG: ['TCG Lowest', 'TCG Last Sold', 'TCG Market Price', None]}
+
+COLUMNS = ['date', 'card', 'condition', 'variant', 'format', 'qty', 'listings', 'm0', 'm1', 'm2', 'm3']
+MANIFEST_NAME = 'manifest.json'
+ROLLUP_DIRECTORY = 'rollups'  # history_store/rollups/<weekly|monthly>.npz, rebuilt after every ingest
+ROLLUP_PERIODS = downsample.PERIODS
+METRIC_COLUMNS = ['m0', 'm1', 'm2', 'm3']
+STORE_VERSION = 1
+
+file_name_pattern = re.compile(r'^(?P<list_name>.+)-(?P<date>\d{4}-\d{2}-\d{2})(?P<suffix>[A-Za-z]?)\.txt$')
+day_folder_pattern = re.compile(r'^\d{4}/\d{2}-[A-Za-z]{3}/\d{2}$')
+card_header_pattern = re.compile(r'^(?P<card>.*?)\s+\[(?P<qty>\d+(?:\.\d+)?)\]\s+-\s+(?P<condition>.*?)'
+                                 r'(?:\s+<(?P<listings>\d+)>)?$')
+
+
+# Archive walking #
+
+
+def find_snapshot_files(root=listings_root):
+    """Every list snapshot under root as (relative path, list name, date, variant)"""
+    snapshot_files = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        relative_dir = os.path.relpath(dirpath, root).replace(os.sep, '/')
+        for file_name in sorted(filenames):
+            match = file_name_pattern.match(file_name)
+            if not match:
+                continue
+            # Side folders such as 'pre iqr' or '19 - updated buylist' are kept apart from the daily snapshot
+            variant = '' if day_folder_pattern.match(relative_dir) else relative_dir
+            if match.group('suffix'):
+                variant = (variant + ' ' + match.group('suffix')).strip()
+            snapshot_files.append((relative_dir + '/' + file_name, match.group('list_name'),
+                                   match.group('date'), variant))
+    return snapshot_files
+
+
+# Snapshot parsing #
+
+
+def detect_table_format(column_names):
+    if 'TCG Lowest' in column_names or 'TCG Market Price' in column_names:
+        return FORMAT_TCG
+    if 'Min' in column_names and 'Max' in column_names:
+        return FORMAT_LISTINGS
+    return None
+
+
+def split_table_row(line):
+    if line[0] != '|':  # Early 2021 plain text tables, columns separated by runs of spaces
+        return re.split(r'\s{2,}', line.strip())
+    return [cell.strip() for cell in line.strip().strip('|').split('|')]
+
+
+def to_float(value):
+    try:
+        return float(value.replace(',', '').replace('$', ''))
+    except ValueError:
+        return np.nan
+
+
+def parse_snapshot_lines(lines):
+    """Rows of (card, condition, format, qty, listings, m0, m1, m2, m3) in file order, any table layout"""
+    rows = []
+    card = None
+    column_names = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            card = None
+            continue
+        if line[0] == '+':
+            continue
+        if line[0] == '|' or (card is not None and (column_names is not None or line.startswith('TCG Lowest'))):
+            if card is None:
+                continue
+            cells = split_table_row(line)
+            if column_names is None:
+                column_names = cells
+                continue
+            table_format = detect_table_format(column_names)
+            if table_format is None or len(cells) != len(column_names):
+                card = None
+                continue
+            values = dict(zip(column_names, cells))
+            metrics = [to_float(values[name]) if name in values else np.nan
+                       for name in METRIC_NAMES[table_format]]
+            rows.append((card[0], card[1], table_format, card[2], card[3], *metrics))
+            card = None
+        else:
+            match = card_header_pattern.match(line)
+            if match:
+                listings = int(match.group('listings')) if match.group('listings') else -1
+                card = (match.group('card').strip(), match.group('condition').strip(),
+                        float(match.group('qty')), listings)
+                column_names = None
+            else:
+                card = None
+    return rows
+
+
+def parse_sidecar_lines(lines):
+    """Same rows as parse_snapshot_lines, from a scraper .jsonl sidecar; timed out cards have no table so are skipped"""
+    rows = []
+    for line in lines:
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        if record['status'] == 'timeout':
+            continue
+        rows.append((record['card'], record['condition'], FORMAT_LISTINGS, float(record['qty']),
+                     int(record['listings']), float(record['min']), float(record['max']),
+                     float(record['mean']), float(record['median'])))
+    return rows
+
+
+def parse_snapshot_file(root, relative_path):
+    sidecar_path = os.path.join(root, os.path.splitext(relative_path)[0] + '.jsonl')
+    if os.path.exists(sidecar_path):  # Written by the scraper since sidecars were added, older dates fall back to text
+        with open(sidecar_path, 'r', encoding='utf-8') as file:
+            return relative_path, parse_sidecar_lines(file)
+    with open(os.path.join(root, relative_path), 'r', encoding='utf-8', errors='replace') as file:
+        return relative_path, parse_snapshot_lines(file.readlines())
+
+
+# Store layout #
+
+
+def partition_path(store_root, year, list_name):
+    return os.path.join(store_root, year, list_name + '.npz')
+
+
+def load_manifest(store_root=history_store_root):
+    manifest_path = os.path.join(store_root, MANIFEST_NAME)
+    try:
+        with open(manifest_path, 'r') as file:
+            manifest = json.load(file)
+        if manifest.get('version') == STORE_VERSION:
+            return manifest
+    except (OSError, ValueError):
+        pass
+    return {'version': STORE_VERSION, 'files': {}}
+
+
+def save_manifest(manifest, store_root=history_store_root):
+    manifest_path = os.path.join(store_root, MANIFEST_NAME)
+    with open(manifest_path + '.tmp', 'w') as file:
+        json.dump(manifest, file, indent=1, sort_keys=True)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+
+def rows_to_columns(snapshot_rows):
+    """snapshot_rows: list of (date, variant, parsed rows) -> dict of numpy columns"""
+    dates, cards, conditions, variants, formats, qtys, listings, metrics = [], [], [], [], [], [], [], []
+    for snapshot_date, variant, rows in snapshot_rows:
+        for card, condition, table_format, qty, listing_count, m0, m1, m2, m3 in rows:
+            dates.append(snapshot_date)
+            cards.append(card)
+            conditions.append(condition)
+            variants.append(variant)
+            formats.append(table_format)
+            qtys.append(qty)
+            listings.append(listing_count)
+            metrics.append((m0, m1, m2, m3))
+    metrics = np.array(metrics, dtype=np.float64).reshape(-1, 4)
+    return {
+        'date': np.array(dates, dtype='datetime64[D]'),
+        'card': np.array(cards, dtype=str),
+        'condition': np.array(conditions, dtype=str),
+        'variant': np.array(variants, dtype=str),
+        'format': np.array(formats, dtype=np.int8),
+        'qty': np.array(qtys, dtype=np.float64),
+        'listings': np.array(listings, dtype=np.int32),
+        'm0': metrics[:, 0], 'm1': metrics[:, 1], 'm2': metrics[:, 2], 'm3': metrics[:, 3],
+    }
+
+
+def read_partition(path):
+    with np.load(path, allow_pickle=False) as data:
+        return {column: data[column] for column in COLUMNS}
+
+
+def write_partition(path, columns):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = path[:-len('.npz')] + '.tmp.npz'
+    np.savez_compressed(temp_path, **columns)
+    os.replace(temp_path, path)
+
+
+def concat_columns(first, second):
+    return {column: np.concatenate([first[column], second[column]]) for column in COLUMNS}
+
+
+def sort_columns(columns):
+    order = np.lexsort((columns['variant'], columns['date']))  # Stable, keeps file order per snapshot
+    return {column: values[order] for column, values in columns.items()}
+
+
+# Ingestion #
+
+
+def ingest_archive(root=listings_root, store_root=history_store_root, incremental=incremental_ingest, workers=None):
+    """Parse every snapshot under root on a process pool and write one partition per (year, list)"""
+    start = time.time()
+    manifest = load_manifest(store_root) if incremental else {'version': STORE_VERSION, 'files': {}}
+
+    pending = []
+    for relative_path, list_name, snapshot_date, variant in find_snapshot_files(root):
+        stat = os.stat(os.path.join(root, relative_path))
+        signature = [stat.st_size, stat.st_mtime_ns]
+        if manifest['files'].get(relative_path) != signature:
+            pending.append((relative_path, list_name, snapshot_date, variant, signature))
+
+    if not pending:
+        print('History store is up to date: {}'.format(store_root))
+        if not all(os.path.exists(rollup_path(store_root, period)) for period in ROLLUP_PERIODS):
+            build_rollups(store_root)
+        return 0
+
+    changed = {relative_path for relative_path, *_ in pending if relative_path in manifest['files']}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        parsed = dict(executor.map(parse_snapshot_file, [root] * len(pending),
+                                   [item[0] for item in pending], chunksize=16))
+
+    partitions = {}
+    for relative_path, list_name, snapshot_date, variant, signature in pending:
+        partitions.setdefault((snapshot_date[:4], list_name), []).append(
+            (snapshot_date, variant, parsed[relative_path]))
+        manifest['files'][relative_path] = signature
+
+    for (year, list_name), snapshot_rows in sorted(partitions.items()):
+        new_columns = rows_to_columns(snapshot_rows)
+        path = partition_path(store_root, year, list_name)
+        if incremental and os.path.exists(path):
+            existing = read_partition(path)
+            if changed:  # Rewritten snapshot files replace their previous rows
+                replaced = {(snapshot_date, variant) for snapshot_date, variant, _ in snapshot_rows}
+                keep = np.array([(str(d), v) not in replaced
+                                 for d, v in zip(existing['date'], existing['variant'])], dtype=bool)
+                existing = {column: values[keep] for column, values in existing.items()}
+            new_columns = concat_columns(existing, new_columns)
+        write_partition(path, sort_columns(new_columns))
+
+    save_manifest(manifest, store_root)
+    build_rollups(store_root)
+    print('Ingested {} snapshot files into {} partitions in {:.1f}s'.format(
+        len(pending), len(partitions), time.time() - start))
+    return len(pending)
+
+
+# Rollups #
+
+
+def rollup_path(store_root, period):
+    return os.path.join(store_root, ROLLUP_DIRECTORY, period + '.npz')
+
+
+def rollup_columns(history, period):
+    """One row per (list, card, condition, format, period): last value of every metric plus its min and max"""
+    period_start = downsample.period_starts(history['date'], period)
+    order = np.lexsort((history['date'], period_start, history['format'], history['condition'], history['card'],
+                        history['list']))
+    keys = [history[column][order] for column in ('list', 'card', 'condition', 'format')] + [period_start[order]]
+    boundary = np.zeros(len(order), dtype=bool)
+    boundary[:1] = True
+    for key in keys:
+        boundary[1:] |= key[1:] != key[:-1]
+    first = np.flatnonzero(boundary)
+    last = np.r_[first[1:], len(order)] - 1
+
+    columns = {'date': keys[4][first], 'list': keys[0][first], 'card': keys[1][first], 'condition': keys[2][first],
+               'format': keys[3][first], 'qty': history['qty'][order][last],
+               'listings': history['listings'][order][last], 'points': np.diff(np.r_[first, len(order)])}
+    for metric in METRIC_COLUMNS:
+        values = history[metric][order]
+        columns[metric] = values[last]
+        columns[metric + '_min'] = np.fmin.reduceat(values, first) if len(first) else values
+        columns[metric + '_max'] = np.fmax.reduceat(values, first) if len(first) else values
+    return columns
+
+
+def build_rollups(store_root=history_store_root, periods=ROLLUP_PERIODS):
+    # Weekly / monthly rollups of the whole store, long range charts and queries read these instead of every row
+    start = time.time()
+    history = load_history(store_root)
+    for period in periods:
+        write_partition(rollup_path(store_root, period), rollup_columns(history, period))
+    print('Rolled up {} rows into {} in {:.1f}s'.format(len(history['date']), ', '.join(periods), time.time() - start))
+
+
+def load_rollups(period, store_root=history_store_root):
+    if not os.path.exists(rollup_path(store_root, period)):  # Store ingested before rollups existed
+        build_rollups(store_root)
+    with np.load(rollup_path(store_root, period), allow_pickle=False) as data:
+        return {column: data[column] for column in data.files}
+
+
+# Queries #
+
+
+def list_partitions(store_root=history_store_root):
+    partitions = []
+    for year in sorted(os.listdir(store_root)) if os.path.isdir(store_root) else []:
+        year_dir = os.path.join(store_root, year)
+        if year.isdigit() and os.path.isdir(year_dir):  # Skips rollups/
+            for file_name in sorted(os.listdir(year_dir)):
+                if file_name.endswith('.npz') and not file_name.endswith('.tmp.npz'):
+                    partitions.append((year, file_name[:-len('.npz')]))
+    return partitions
+
+
+def load_history(store_root=history_store_root, years=None, lists=None, include_variants=False):
+    """Columns for the selected partitions plus a 'list' column; side-folder snapshots are excluded by default"""
+    loaded = []
+    for year, list_name in list_partitions(store_root):
+        if (years and int(year) not in years) or (lists and list_name not in lists):
+            continue
+        columns = read_partition(partition_path(store_root, year, list_name))
+        if not include_variants:
+            keep = columns['variant'] == ''
+            columns = {column: values[keep] for column, values in columns.items()}
+        columns['list'] = np.full(len(columns['date']), list_name)
+        loaded.append(columns)
+
+    if not loaded:
+        empty = rows_to_columns([])
+        empty['list'] = np.array([], dtype=str)
+        return empty
+    return {column: np.concatenate([columns[column] for columns in loaded]) for column in COLUMNS + ['list']}
+
+
+def match_card_name(history, card_name, metric=0, condition=None):
+    """card_name when history has it, else the latest scraped card whose name contains it, priciest on ties, or None.
+
+    Decklists and queries name cards without rarity ('Judgment Dragon'), stored names add it
+    ('Judgment Dragon Secret 1st'), as history_metrics.find_card resolves them.
+    """
+    keep = np.ones(len(history['card']), dtype=bool) if condition is None else history['condition'] == condition
+    if np.any(keep & (history['card'] == card_name)):
+        return card_name
+    keep &= np.char.find(history['card'], card_name) >= 0
+    if not np.any(keep):
+        return None
+    values = np.nan_to_num(history['m{}'.format(metric)][keep], nan=-np.inf)
+    latest = np.lexsort((values, history['date'][keep]))[-1]
+    return str(history['card'][keep][latest])
+
+
+def card_history(history, card_name, metric=0, condition=None):
+    """(dates, values) for one card from load_history output, in date order.
+
+    Rows are per list and condition, a card kept in several lists is collapsed to one value per date, the mean
+    over them, as movers.price_matrix does. Filter history to one table format first.
+    """
+    keep = history['card'] == card_name
+    if condition is not None:
+        keep &= history['condition'] == condition
+    dates = history['date'][keep]
+    values = history['m{}'.format(metric)][keep]
+    order = np.argsort(dates, kind='stable')
+    dates, values = dates[order], values[order]
+    if not len(dates):
+        return dates, values
+    first = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+    counts = np.add.reduceat(~np.isnan(values), first)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.add.reduceat(np.nan_to_num(values), first) / counts
+    return dates[first], np.where(counts, means, np.nan)
+
+
+def card_rollup(rollups, card_name, metric=0, condition=None):
+    """(period starts, lows, highs, last values) for one card from load_rollups output, in date order.
+
+    Rollup rows are per list, a card kept in several lists is collapsed to one row per period: lowest low,
+    highest high and the mean of the last values, as movers.price_matrix averages a date across lists.
+    Filter rollups to one table format first, m0..m3 mean different prices in each.
+    """
+    keep = rollups['card'] == card_name
+    if condition is not None:
+        keep &= rollups['condition'] == condition
+    dates = rollups['date'][keep]
+    order = np.argsort(dates, kind='stable')
+    dates = dates[order]
+    metric = 'm{}'.format(metric)
+    lows, highs, last = (rollups[metric + '_min'][keep][order], rollups[metric + '_max'][keep][order],
+                         rollups[metric][keep][order])
+    if not len(dates):
+        return dates, lows, highs, last
+    first = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+    counts = np.add.reduceat(~np.isnan(last), first)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.add.reduceat(np.nan_to_num(last), first) / counts
+    return dates[first], np.fmin.reduceat(lows, first), np.fmax.reduceat(highs, first), np.where(counts, means, np.nan)
+
+
+if __name__ == '__main__':
+    ingest_archive()
+    history = load_history()
+    print('Rows: {}, Cards: {}, Dates: {} to {}'.format(len(history['date']), len(np.unique(history['card'])),
+                                                       history['date'].min() if len(history['date']) else '-',
+                                                       history['date'].max() if len(history['date']) else '-'))
+
+# Builds history_store/<year>/<list>.npz from every full_listings snapshot, both table formats.
+# python .\history_store.py
+#       Re-running only ingests snapshot files that are new or changed since the last run.
+#       Weekly / monthly rollups (min, max and last of every metric) are rebuilt into history_store/rollups/.
@@ -0,0 +1,129 @@
+import numpy as np
+
+# Configs
+default_trim_method = 'median_band'
+default_percentiles = (5, 25, 75, 95)
+median_band = (0.5, 1.75)  # Keep median * 0.5 < price < median * 1.75, the scraper's original rule
+iqr_factor = 1.5  # Keep Q1 - 1.5 IQR <= price <= Q3 + 1.5 IQR
+mad_factor = 3.0  # Keep |price - median| <= 3 scaled MADs
+seller_min_rating = 97.0  # 'seller' keeps listings from sellers rated at least this and with at least
+seller_min_sales = 10  # this many sales, then applies the median band to what is left
+
+TRIM_METHODS = ('median_band', 'iqr', 'mad', 'seller', 'none')
+MAD_SCALE = 1.4826  # MAD -> standard deviation for normally distributed prices
+MEAN_AD_SCALE = 1.2533  # Mean absolute deviation -> standard deviation, used when the MAD is 0
+
+
+# Single listing page #
+
+
+def to_array(values, dtype=np.float64):
+    # Seller sales / ratings come off the page as strings such as '16238 ' or '' when missing
+    if isinstance(values, np.ndarray):
+        return values.astype(dtype, copy=False)
+    converted = []
+    for value in values:
+        try:
+            converted.append(float(str(value).replace(',', '').strip()))
+        except ValueError:
+            converted.append(np.nan)
+    return np.array(converted, dtype=dtype)
+
+
+def trim_mask(prices, method=default_trim_method, sales=None, ratings=None):
+    """Boolean mask of the listings kept by a trimming method, in listing order.
+
+    'seller' needs the seller sales and ratings of every listing. When no seller qualifies, every listing is
+    judged by the median band alone so the card still gets a price.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    if len(prices) == 0 or method == 'none':
+        return np.ones(len(prices), dtype=bool)
+    if method == 'seller':
+        if sales is None or ratings is None:
+            raise ValueError('Trim method seller needs seller sales and ratings')
+        trusted = (np.nan_to_num(to_array(ratings)) >= seller_min_rating) & \
+                  (np.nan_to_num(to_array(sales)) >= seller_min_sales)
+        if not trusted.any():
+            return trim_mask(prices, 'median_band')
+        keep = np.zeros(len(prices), dtype=bool)
+        keep[trusted] = trim_mask(prices[trusted], 'median_band')
+        return keep
+    median = np.median(prices)
+    if method == 'median_band':
+        return (median * median_band[0] < prices) & (prices < median * median_band[1])
+    if method == 'iqr':
+        q1, q3 = np.percentile(prices, [25, 75])
+        spread = (q3 - q1) * iqr_factor
+        return (q1 - spread <= prices) & (prices <= q3 + spread)
+    if method == 'mad':
+        deviations = np.abs(prices - median)
+        scale = np.median(deviations) * MAD_SCALE
+        if scale == 0:
+            scale = deviations.mean() * MEAN_AD_SCALE
+        if scale == 0:
+            return np.ones(len(prices), dtype=bool)
+        return deviations <= scale * mad_factor
+    raise ValueError('Unknown trim method {}, expected one of {}'.format(method, TRIM_METHODS))
+
+
+def seller_weights(sales, ratings):
+    """Listing weights from seller quality: rating share times log of sales, missing values count as 0"""
+    sales = np.nan_to_num(to_array(sales), nan=0.0)
+    ratings = np.nan_to_num(to_array(ratings), nan=0.0)
+    return np.clip(ratings, 0, 100) / 100 * np.log1p(np.maximum(sales, 0))
+
+
+def weighted_median(values, weights):
+    order = np.argsort(values, kind='stable')
+    values, weights = values[order], weights[order]
+    cumulative = np.cumsum(weights)
+    if cumulative[-1] <= 0:
+        return float(np.median(values))
+    return float(values[np.searchsorted(cumulative, cumulative[-1] / 2)])
+
+
+def median_like_statistics(sorted_prices):
+    # statistics.median: middle value for an odd count (kept as an int for int prices), mean of the two for even
+    count = len(sorted_prices)
+    middle = count // 2
+    if count % 2:
+        value = sorted_prices[middle]
+        return int(value) if np.issubdtype(sorted_prices.dtype, np.integer) else float(value)
+    return float(sorted_prices[middle - 1] + sorted_prices[middle]) / 2
+
+
+def listing_stats(prices, sales=None, ratings=None, method=default_trim_method, weighted=False,
+                  percentiles=default_percentiles):
+    """Trim one card's listings and return every statistic in one call.
+
+    min / max / mean / median match calculate_data_prices exactly: mean is truncated to an int and the median
+    follows statistics.median. weighted_mean / weighted_median are only added when weighted is set.
+    """
+    prices = np.asarray(prices)
+    keep = trim_mask(prices, method, sales, ratings)
+    kept = np.sort(prices[keep])
+    stats = {'count': int(len(kept)), 'trimmed': int(len(prices) - len(kept)), 'mask': keep}
+    if not len(kept):
+        stats.update({'min': 0, 'max': 0, 'mean': 0, 'median': 0,
+                      'percentiles': {percent: 0.0 for percent in percentiles}})
+        return stats
+
+    stats['min'] = kept[0].item()
+    stats['max'] = kept[-1].item()
+    stats['mean'] = int(kept.sum() / len(kept))
+    stats['median'] = median_like_statistics(kept)
+    stats['percentiles'] = dict(zip(percentiles, (float(value) for value in np.percentile(kept, percentiles))))
+    if weighted and sales is not None and ratings is not None:
+        weights = seller_weights(sales, ratings)[keep]
+        kept_prices = prices[keep].astype(np.float64)
+        total = weights.sum()
+        stats['weighted_mean'] = float((kept_prices * weights).sum() / total) if total > 0 else float(kept_prices.mean())
+        stats['weighted_median'] = weighted_median(kept_prices, weights)
+    return stats
+
+
+def data_prices(prices, method='none'):
+    """(min, max, mean, median, listings) in the order scrape_website and the snapshot tables use"""
+    stats = listing_stats(prices, method=method, percentiles=())
+    return stats['min'], stats['max'], stats['mean'], stats['median'], stats['count']
@@ -1,22 +1,22 @@
-from utils import get_card_lists, scrape_website, sort_market_prices, append_console_to_txt, sum_total_prices, print_sums, sum_total_quantity, calculate_average_per_list
-from CardList import CardList
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
+from utils import scrape_website, sort_market_prices, sum_total_prices, print_sums, sum_total_quantity, calculate_average_per_list
+from collection_model import get_collection
+from session import BrowserSession, shard_lists
+import sys
 import time
 
 
 class Scraper:
 
-    def __init__(self):
-        # service = Service(executable_path=r'C:\Users\Richard Le\PycharmProjects\TCGPScraperRemastered\chromedriver.exe')
-        # self.browser = webdriver.Chrome(service=service)
-        self.browser = webdriver.Chrome()
-        self.card_lists = get_card_lists('lists.yaml')
+    def __init__(self, worker_id=0):
+        # Restores the saved login / view count session, only prompts the first time (see session.py),
+        # and recycles Chrome during long runs
+        self.worker_id = worker_id
+        self.browser = BrowserSession(worker_id)
+        self.card_lists = get_collection().lists
         self.current_list = ''
         self.current_list_data = ''
         self.current_list_name = ''
         self.file_path = ''
-        self.url = 'https://www.tcgplayer.com/product/33224'
         self.filters = '?Language=English&page=1&Condition=Near+Mint&ListingType=standard'
         self.sums = [0, 0, 0, 0]
         self.total_card_quantity = 0
@@ -24,27 +24,18 @@ class Scraper:
     def get_card_list(self):
         return self.card_lists
 
-    def open_link(self, link=''):
-        if not link:
-            self.browser.get(self.url)
-        else:
-            self.browser.get(link)
-
     def get_browser(self):
         return self.browser
 
-    def wait_for_login(self) -> int:
-        filler_char = input("Enter any key Selecting 50 view count: ")
-        return 0
-
     def close_browser(self):
+        self.browser.print_metrics()
         self.browser.quit()
 
     def scrape_current_list(self, current_deck_list, full_card_lists):
-        self.current_list = CardList(full_card_lists[current_deck_list]['path'], current_deck_list)
+        self.current_list = full_card_lists[current_deck_list]
         self.current_list_data = self.current_list.get_yaml_data()
         self.current_list_name = self.current_list.get_list_name()
-        self.file_path = scrape_website(self.current_list_data, self.current_list_name, scraper.get_browser())
+        self.file_path = scrape_website(self.current_list_data, self.current_list_name, self.get_browser())
 
     def sort_current_prices(self):
         sort_market_prices('sorted_pricing/max_prices.yaml', self.current_list_name)
@@ -52,9 +43,6 @@ class Scraper:
         sort_market_prices('sorted_pricing/mean_prices.yaml', self.current_list_name)
         sort_market_prices('sorted_pricing/median_prices.yaml', self.current_list_name)
 
-    def output_sorted_prices(self):
-        append_console_to_txt(self.file_path[0])
-
     def get_total_prices(self):
         self.sums = sum_total_prices(self.sums, self.file_path[1])
 
@@ -68,16 +56,12 @@ class Scraper:
         calculate_average_per_list(self.sums, self.total_card_quantity)
 
 
-if __name__ == '__main__':
-
-    scraper = Scraper()
-    scraper.open_link()
-    scraper.wait_for_login()
+def run_scrape(worker_id=0, worker_count=1, list_names=None):
+    scraper = Scraper(worker_id)
     card_lists = scraper.get_card_list()
-    for split_lists in card_lists:
+    for split_lists in shard_lists(list_names or card_lists, worker_count, worker_id):
         scraper.scrape_current_list(split_lists, card_lists)
         scraper.sort_current_prices()
-        scraper.output_sorted_prices()
         scraper.get_total_prices()
         scraper.get_total_quantity()
         time.sleep(1)
@@ -85,8 +69,17 @@ if __name__ == '__main__':
     print_sums(scraper.get_sums())
     scraper.get_average_of_list()
 
+
+if __name__ == '__main__':
+    run_scrape(int(sys.argv[1]) if len(sys.argv) > 1 else 0, int(sys.argv[2]) if len(sys.argv) > 2 else 1)
+
+# Step 0 (once, or whenever the saved session expires):
+# PS C:\Users\Richard Le\PycharmProjects\TCGPScraperRemastered> python .\session.py
+
 # Step 1:
 # To Run PS C:\Users\Richard Le\PycharmProjects\TCGPScraperRemastered> python .\main.py
+#       Unattended, e.g. on a schedule. Split across N workers: python .\main.py <worker id> <N>
+#       Worker ids count from 0, so 3 workers run python .\main.py 0 3, python .\main.py 1 3 and python .\main.py 2 3
 
 # Step 2:
 # NOTE - Run decklist_gallery.py afterwards for updating deck list pricings!
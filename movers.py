@@ -0,0 +1,227 @@
+import csv
+import os
+import time
+import numpy as np
+import history_store
+from utils import convert_raw_days_to_simplified_notation, format_difference_string
+
+# Configs
+report_root = 'movers_reports'  # movers_reports/movers-<latest snapshot date>.txt / .csv
+report_windows = [7, 14, 30, 60, 90, 180, 365, 730, 1460]  # Same windows as format_list_generator
+list_report_windows = [7, 30, 365]  # Per list sections only, the whole catalogue gets every window
+report_format = history_store.FORMAT_LISTINGS  # Pre-2023 TCG prices are a different metric, never mixed in
+top_count = 10
+min_price = 10  # Cards worth less than this now are left out of the rankings, not the csv
+min_valid_price = 1  # Prices at or below this are missing data, as in utils.get_date_price_value_list
+stale_days = 90  # Cards and lists without a snapshot this close to the latest one are not current
+max_gap_ratio = 0.5  # The reference point must lie within window * ratio of its target date
+
+METRICS = {'min': 0, 'max': 1, 'mean': 2, 'median': 3}
+
+
+# Card x date matrix #
+
+
+def price_matrix(history, metric=0, table_format=report_format):
+    """(cards, conditions, dates, prices[card, date], row card index) for one metric of load_history columns.
+
+    A card is a (name, condition) pair, its price on a date is the mean over every list it was scraped in.
+    Rows of other table formats get card index -1.
+    """
+    selected = np.flatnonzero(history['format'] == table_format)
+    card, condition = history['card'][selected], history['condition'][selected]
+    order = np.lexsort((condition, card))
+    boundary = np.zeros(len(order), dtype=bool)
+    boundary[:1] = True
+    boundary[1:] = (card[order][1:] != card[order][:-1]) | (condition[order][1:] != condition[order][:-1])
+    first = order[boundary]
+    card_index = np.empty(len(order), dtype=np.int64)
+    card_index[order] = np.cumsum(boundary) - 1
+
+    values = history['m{}'.format(metric)][selected]
+    priced = values > min_valid_price  # NaN compares False
+    dates, date_index = np.unique(history['date'][selected], return_inverse=True)
+    cells = card_index[priced] * len(dates) + date_index[priced]
+    size = len(first) * len(dates)
+    sums = np.bincount(cells, weights=values[priced], minlength=size)
+    counts = np.bincount(cells, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        prices = (sums / counts).reshape(len(first), len(dates))
+
+    row_card = np.full(len(history['date']), -1, dtype=np.int64)
+    row_card[selected] = card_index
+    return card[first], condition[first], dates, prices, row_card
+
+
+def window_changes(dates, prices, windows=report_windows):
+    """Latest price of every card and its change over each window, all cards at once.
+
+    The reference price is the card's own point closest to (latest date - window), earlier on ties, like
+    utils.get_closest_date_from_current_date. Points further than window * max_gap_ratio from that target leave
+    the change as NaN so a card with one month of history does not rank for 1Y.
+    Returns (now index, now price, reference index[card, window], difference, percent).
+    """
+    card_count, date_count = prices.shape
+    positions = np.arange(date_count)
+    priced = ~np.isnan(prices)
+    previous = np.maximum.accumulate(np.where(priced, positions, -1), axis=1)  # Latest priced column <= d
+    following = np.minimum.accumulate(np.where(priced, positions, date_count)[:, ::-1], axis=1)[:, ::-1]
+
+    now_index = previous[:, -1] if date_count else np.full(card_count, -1)
+    cards = np.arange(card_count)
+    now = np.where(now_index >= 0, prices[cards, np.maximum(now_index, 0)], np.nan)
+    days = dates.astype(np.int64)
+    now_day = days[np.maximum(now_index, 0)] if date_count else np.zeros(card_count, dtype=np.int64)
+
+    reference = np.full((card_count, len(windows)), -1, dtype=np.int64)
+    difference = np.full((card_count, len(windows)), np.nan)
+    percent = np.full((card_count, len(windows)), np.nan)
+    for column, window in enumerate(windows):
+        target = now_day - window
+        split = np.searchsorted(days, target)  # First column on or after the target date
+        before = np.where(split > 0, previous[cards, np.maximum(split - 1, 0)], -1)
+        after = np.where(split < date_count, following[cards, np.minimum(split, date_count - 1)], date_count)
+        before_gap = np.where(before >= 0, target - days[np.maximum(before, 0)], np.iinfo(np.int64).max)
+        after_gap = np.where(after < date_count, days[np.minimum(after, date_count - 1)] - target,
+                             np.iinfo(np.int64).max)
+        closest = np.where(before_gap <= after_gap, before, after)
+        usable = (now_index >= 0) & (np.minimum(before_gap, after_gap) <= window * max_gap_ratio) & \
+                 (closest != now_index)
+        old = prices[cards, np.clip(closest, 0, max(date_count - 1, 0))]
+        reference[:, column] = np.where(usable, closest, -1)
+        difference[:, column] = np.where(usable, now - old, np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            percent[:, column] = np.where(usable, np.round((now - old) / old * 100, 1), np.nan)
+    return now_index, now, reference, difference, percent
+
+
+# Report #
+
+
+def list_holdings(history, row_card, card_count, dates, table_format=report_format):
+    """list name -> (latest snapshot date, qty per card) for every list scraped within stale_days of the latest date"""
+    holdings = {}
+    selected = (history['format'] == table_format) & (row_card >= 0)
+    if not len(dates):
+        return holdings
+    for list_name in np.unique(history['list'][selected]).tolist():
+        rows = selected & (history['list'] == list_name)
+        latest = history['date'][rows].max()
+        if latest < dates[-1] - np.timedelta64(stale_days, 'D'):
+            continue
+        rows &= history['date'] == latest
+        holdings[list_name] = (latest, np.bincount(row_card[rows], weights=history['qty'][rows],
+                                                   minlength=card_count))
+    return holdings
+
+
+def rank(percent, eligible, count=None):
+    # (gainers, losers) card indexes for one window, biggest moves first, top_count of each by default
+    count = top_count if count is None else count
+    candidates = np.flatnonzero(eligible & ~np.isnan(percent))
+    ordered = candidates[np.argsort(-percent[candidates], kind='stable')]
+    gainers = ordered[percent[ordered] > 0][:count]
+    losers = ordered[percent[ordered] < 0][::-1][:count]
+    return gainers, losers
+
+
+def movers_table(title, card_indexes, column, report, quantities=None):
+    from prettytable import PrettyTable
+    cards, conditions, dates, now, now_index, reference, difference, percent = report
+    headers = ['Card', 'Condition', 'Now', 'Change', 'Since']
+    if quantities is not None:
+        headers += ['Qty', 'Value Change']
+    table = PrettyTable(headers)
+    table.align = 'l'
+    table.title = title
+    for card in card_indexes:
+        row = [cards[card], conditions[card], '{:.2f}'.format(now[card]),
+               format_difference_string(round(difference[card, column], 2), percent[card, column]),
+               dates[reference[card, column]]]
+        if quantities is not None:
+            row += ['{:g}'.format(quantities[card]), '{:+.2f}'.format(difference[card, column] * quantities[card])]
+        table.add_row(row)
+    return table
+
+
+def build_report(history, metric=0, lists=None, windows=report_windows):
+    """Every section of the movers report as (title, table) pairs plus the csv rows"""
+    cards, conditions, dates, prices, row_card = price_matrix(history, metric)
+    now_index, now, reference, difference, percent = window_changes(dates, prices, windows)
+    report = (cards, conditions, dates, now, now_index, reference, difference, percent)
+    if not len(dates):
+        return [], []
+    current = (now_index >= 0) & (dates[np.maximum(now_index, 0)] >= dates[-1] - np.timedelta64(stale_days, 'D'))
+    eligible = current & (now >= min_price)
+    holdings = list_holdings(history, row_card, len(cards), dates)
+
+    sections = []
+    for column, window in enumerate(windows):
+        notation = convert_raw_days_to_simplified_notation(window)
+        for label, indexes in zip(('gainers', 'losers'), rank(percent[:, column], eligible)):
+            if len(indexes):  # Windows shorter than the scrape interval have no reference point
+                title = 'Top {} {} - all cards'.format(label, notation)
+                sections.append((title, movers_table(title, indexes, column, report)))
+
+    for list_name, (latest, quantities) in holdings.items():
+        if lists and list_name not in lists:
+            continue
+        held = quantities > 0
+        for window in list_report_windows:
+            if window not in windows:
+                continue
+            column = windows.index(window)
+            notation = convert_raw_days_to_simplified_notation(window)
+            for label, indexes in zip(('gainers', 'losers'), rank(percent[:, column], eligible & held)):
+                if len(indexes):
+                    title = 'Top {} {} - {} ({})'.format(label, notation, list_name, latest)
+                    sections.append((title, movers_table(title, indexes, column, report, quantities)))
+
+    csv_rows = []
+    for card in np.flatnonzero(now_index >= 0):
+        held_in = [name for name, (_, quantities) in holdings.items() if quantities[card] > 0]
+        row = [cards[card], conditions[card], ' '.join(held_in), '{:g}'.format(
+            sum(holdings[name][1][card] for name in held_in)), dates[now_index[card]], '{:.2f}'.format(now[card])]
+        for column in range(len(windows)):
+            row += ['' if np.isnan(difference[card, column]) else '{:.2f}'.format(difference[card, column]),
+                    '' if np.isnan(percent[card, column]) else '{:.1f}'.format(percent[card, column])]
+        csv_rows.append(row)
+    return sections, csv_rows
+
+
+def write_report(history, metric=0, lists=None, root=report_root):
+    """movers-<date>.txt with the ranked tables and movers-<date>.csv with every card's window changes"""
+    start = time.time()
+    sections, csv_rows = build_report(history, metric, lists)
+    if not sections:
+        print('No {} snapshots in the history store'.format(history_store.FORMAT_NAMES[report_format]))
+        return None
+    latest = str(max(row[4] for row in csv_rows))
+    os.makedirs(root, exist_ok=True)
+    report_path = os.path.join(root, 'movers-{}.txt'.format(latest))
+    with open(report_path, 'w', encoding='utf-8') as file:
+        file.write('Market movers, {} price, latest snapshot {}\n\n'.format(
+            history_store.METRIC_NAMES[report_format][metric], latest))
+        for _, table in sections:
+            file.write(str(table) + '\n\n')
+
+    headers = ['Card', 'Condition', 'Lists', 'Qty', 'Date', 'Now']
+    for window in report_windows:
+        notation = convert_raw_days_to_simplified_notation(window)
+        headers += [notation, notation + ' %']
+    with open(os.path.join(root, 'movers-{}.csv'.format(latest)), 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(headers)
+        writer.writerows(csv_rows)
+    print('Movers report for {} cards written to {} in {:.2f}s'.format(len(csv_rows), report_path,
+                                                                      time.time() - start))
+    return report_path
+
+
+if __name__ == '__main__':
+    history_store.ingest_archive()
+    write_report(history_store.load_history())
+
+# Ranks the biggest price moves of every card in history_store, overall and per list, over 1W to 4Y windows
+# python .\movers.py
+#       Writes movers_reports/movers-<date>.txt (top gainers / losers tables) and .csv (every card, every window).
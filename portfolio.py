@@ -0,0 +1,249 @@
+import calendar
+import csv
+import datetime
+import os
+import re
+import time
+import numpy as np
+import history_store
+
+# Configs
+portfolio_file = 'portfolio.npz'  # history_store/portfolio.npz, one row per list snapshot
+excluded_prefixes = ('buylist_',)  # Buylists price cards still to buy, they are not part of the collection
+portfolio_format = history_store.FORMAT_LISTINGS  # Series never mix formats, pre-2023 TCG m0..m3 are other prices
+carry_days = 90  # A list counts towards the collection value for this long after its last snapshot
+chart_size = (12, 6)
+chart_dpi = 100
+
+METRICS = {'min': 0, 'max': 1, 'mean': 2, 'median': 3}
+VALUE_COLUMNS = ['v0', 'v1', 'v2', 'v3']  # Sum of qty * m0..m3, the "Sum of Min/Max/Mean/Median Listed" lines
+PORTFOLIO_COLUMNS = ['date', 'list', 'format', 'cards', 'qty'] + VALUE_COLUMNS
+PORTFOLIO_VERSION = 1
+
+_portfolio = None  # (partition stamps, portfolio columns) for this process, see load_portfolio()
+
+since_pattern = re.compile(r'^(?P<count>\d+)(?P<unit>[dwmy])$')
+
+
+# Aggregation #
+
+
+def snapshot_totals(history, list_name=None):
+    """One row per (list, date, format) of load_history / read_partition columns: cards, quantity and value"""
+    count = len(history['date'])
+    lists = history['list'] if 'list' in history else np.full(count, list_name)
+    order = np.lexsort((history['format'], history['date'], lists))
+    keys = [lists[order], history['date'][order], history['format'][order]]
+    boundary = np.zeros(count, dtype=bool)
+    boundary[:1] = True
+    for key in keys:
+        boundary[1:] |= key[1:] != key[:-1]
+    first = np.flatnonzero(boundary)
+
+    qty = history['qty'][order]
+    columns = {'date': keys[1][first], 'list': keys[0][first], 'format': keys[2][first],
+               'cards': np.diff(np.r_[first, count]).astype(np.int32),
+               'qty': np.add.reduceat(qty, first) if count else qty}
+    for metric, value in zip(history_store.METRIC_COLUMNS, VALUE_COLUMNS):
+        # Cards without a price (missing data, the unused 4th TCG metric) add nothing, like utils.scrape_website
+        values = np.nan_to_num(history[metric][order]) * qty
+        columns[value] = np.add.reduceat(values, first) if count else values
+    return columns
+
+
+def empty_portfolio():
+    columns = snapshot_totals(history_store.rows_to_columns([]), '')
+    columns['list'] = columns['list'].astype(str)
+    return columns
+
+
+# Store #
+
+
+def portfolio_path(store_root):
+    return os.path.join(store_root, portfolio_file)
+
+
+def partition_stamps(store_root):
+    # (year/list, mtime_ns, size) of every partition, a changed stamp means that partition was re-ingested
+    stamps = []
+    for year, list_name in history_store.list_partitions(store_root):
+        stat = os.stat(history_store.partition_path(store_root, year, list_name))
+        stamps.append((year + '/' + list_name, stat.st_mtime_ns, stat.st_size))
+    return stamps
+
+
+def read_portfolio(store_root):
+    try:
+        with np.load(portfolio_path(store_root), allow_pickle=False) as data:
+            if int(data['version']) != PORTFOLIO_VERSION:
+                return [], empty_portfolio()
+            stamps = list(zip(data['stamp_keys'].tolist(), data['stamp_mtimes'].tolist(),
+                              data['stamp_sizes'].tolist()))
+            return stamps, {column: data[column] for column in PORTFOLIO_COLUMNS}
+    except (OSError, KeyError, ValueError):
+        return [], empty_portfolio()
+
+
+def write_portfolio(store_root, stamps, columns):
+    keys, mtimes, sizes = zip(*stamps) if stamps else ((), (), ())
+    history_store.write_partition(portfolio_path(store_root), dict(
+        columns, version=np.array(PORTFOLIO_VERSION), stamp_keys=np.array(keys, dtype=str),
+        stamp_mtimes=np.array(mtimes, dtype=np.int64), stamp_sizes=np.array(sizes, dtype=np.int64)))
+
+
+def update_portfolio(store_root=history_store.history_store_root):
+    """Portfolio rows for the whole store, re-aggregating only the partitions ingested since the last update"""
+    start = time.time()
+    stamps = partition_stamps(store_root)
+    previous_stamps, previous = read_portfolio(store_root)
+    if stamps == previous_stamps:
+        return previous
+
+    unchanged = set(previous_stamps) & set(stamps)
+    row_partitions = np.char.add(np.char.add(previous['date'].astype('datetime64[Y]').astype(str), '/'),
+                                 previous['list'])
+    keep = np.isin(row_partitions, [key for key, _, _ in unchanged])
+    loaded = [{column: values[keep] for column, values in previous.items()}]
+    for key, mtime, size in stamps:
+        if (key, mtime, size) in unchanged:
+            continue
+        year, list_name = key.split('/', 1)
+        columns = history_store.read_partition(history_store.partition_path(store_root, year, list_name))
+        main = columns['variant'] == ''  # Side-folder snapshots are excluded, as in load_history
+        loaded.append(snapshot_totals({column: values[main] for column, values in columns.items()}, list_name))
+
+    portfolio = {column: np.concatenate([columns[column] for columns in loaded]) for column in PORTFOLIO_COLUMNS}
+    order = np.lexsort((portfolio['format'], portfolio['list'], portfolio['date']))
+    portfolio = {column: values[order] for column, values in portfolio.items()}
+    write_portfolio(store_root, stamps, portfolio)
+    print('Portfolio: {} of {} partitions re-aggregated in {:.2f}s'.format(
+        len(stamps) - len(unchanged), len(stamps), time.time() - start))
+    return portfolio
+
+
+def load_portfolio(store_root=history_store.history_store_root, refresh=False):
+    """update_portfolio() once per process, later calls only stat the partitions"""
+    global _portfolio
+    stamps = partition_stamps(store_root)
+    if _portfolio is None or _portfolio[0] != stamps or refresh:
+        _portfolio = (stamps, update_portfolio(store_root))
+    return _portfolio[1]
+
+
+# Queries #
+
+
+def parse_since(since, today=None):
+    """'3y', '6m', '8w', '90d' or a YYYY-MM-DD date -> datetime64[D], None for everything"""
+    if not since:
+        return None
+    match = since_pattern.match(since)
+    if not match:
+        return np.datetime64(since, 'D')
+    today = today or datetime.date.today()
+    count, unit = int(match.group('count')), match.group('unit')
+    if unit in 'dw':
+        return np.datetime64(today - datetime.timedelta(days=count * (7 if unit == 'w' else 1)), 'D')
+    year, month = divmod(today.year * 12 + today.month - 1 - count * (12 if unit == 'y' else 1), 12)
+    day = min(today.day, calendar.monthrange(year, month + 1)[1])  # 29 Feb - 1y -> 28 Feb
+    return np.datetime64(datetime.date(year, month + 1, day), 'D')
+
+
+def collection_lists(portfolio):
+    return [name for name in np.unique(portfolio['list']).tolist() if not name.startswith(excluded_prefixes)]
+
+
+def list_values(portfolio, metric=0, lists=None, since=None, until=None, table_format=None):
+    """(dates, list names, values[list, date]) where every list holds its latest snapshot value on each date.
+
+    Only snapshots of one table format (portfolio_format by default) count, m0..m3 are Min/Max/Mean/Median in
+    2023+ tables but TCG Lowest/Last Sold/Market Price/- before.
+    A list stops counting carry_days after its last snapshot, so retired lists drop out of the total.
+    Dates are every date any selected list was scraped on.
+    """
+    table_format = portfolio_format if table_format is None else table_format
+    if history_store.METRIC_NAMES[table_format][metric] is None:
+        raise ValueError('{} tables have no metric {}'.format(history_store.FORMAT_NAMES[table_format], metric))
+    lists = collection_lists(portfolio) if lists is None else list(lists)
+    keep = np.isin(portfolio['list'], lists) & (portfolio['format'] == table_format)
+    dates = np.unique(portfolio['date'][keep])
+    names, inverse = np.unique(portfolio['list'][keep], return_inverse=True)
+    list_index = np.array([lists.index(name) for name in names.tolist()], dtype=np.int64)[inverse]
+    date_index = np.searchsorted(dates, portfolio['date'][keep])
+
+    values = np.zeros((len(lists), len(dates)))
+    np.add.at(values, (list_index, date_index), portfolio[VALUE_COLUMNS[metric]][keep])
+    scraped = np.zeros((len(lists), len(dates)), dtype=bool)
+    scraped[list_index, date_index] = True
+
+    # Forward fill: index of each list's latest snapshot at or before every date
+    latest = np.maximum.accumulate(np.where(scraped, np.arange(len(dates)), -1), axis=1)
+    filled = np.take_along_axis(values, np.maximum(latest, 0), axis=1)
+    age = dates - dates[np.maximum(latest, 0)]
+    filled[(latest < 0) | (age > np.timedelta64(carry_days, 'D'))] = 0
+
+    window = np.ones(len(dates), dtype=bool)
+    if since is not None:
+        window &= dates >= since
+    if until is not None:
+        window &= dates <= until
+    return dates[window], lists, filled[:, window]
+
+
+def collection_value(metric=0, since=None, lists=None, store_root=history_store.history_store_root,
+                     table_format=None):
+    """(dates, total value) of the collection, e.g. collection_value(0, parse_since('3y'))"""
+    dates, _, values = list_values(load_portfolio(store_root), metric, lists, since, table_format=table_format)
+    return dates, values.sum(axis=0)
+
+
+# Output #
+
+
+def export_csv(path, dates, lists, values):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(['date', 'total'] + lists)
+        for date, total, row in zip(dates.astype(str), values.sum(axis=0), values.T):
+            writer.writerow([date, '{:.2f}'.format(total)] + ['{:.2f}'.format(value) for value in row])
+
+
+def plot_portfolio(path, dates, lists, values, title='Collection value'):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.ticker import FuncFormatter
+    from utils import human_format
+    shown = values.any(axis=1)  # Lists with no value in the window would only crowd the legend
+    x = dates.astype('datetime64[D]').astype(object)
+    fig, ax = plt.subplots(figsize=chart_size)
+    ax.stackplot(x, values[shown], labels=[name for name, show in zip(lists, shown) if show], step='post', alpha=0.8)
+    ax.plot(x, values.sum(axis=0), color='black', linewidth=1, drawstyle='steps-post', label='Total')
+    ax.yaxis.set_major_formatter(FuncFormatter(lambda value, _: '$' + human_format(value)))
+    ax.set_title(title)
+    ax.legend(loc='upper left', fontsize='small', ncol=2)
+    fig.autofmt_xdate()
+    fig.tight_layout()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    fig.savefig(path, dpi=chart_dpi)
+    plt.close(fig)
+
+
+if __name__ == '__main__':
+    history_store.ingest_archive()
+    start = time.perf_counter()
+    portfolio = load_portfolio()
+    dates, lists, values = list_values(portfolio, METRICS['min'], since=parse_since('3y'))
+    elapsed = time.perf_counter() - start
+    totals = values.sum(axis=0)
+    for date, total in list(zip(dates.astype(str), totals))[-10:]:
+        print('{}  ${:>12,.2f}'.format(date, total))
+    print('{} snapshots, {} lists, {} dates in {:.1f}ms'.format(len(portfolio['date']), len(lists), len(dates),
+                                                                 elapsed * 1000))
+
+# Collection value per snapshot date from history_store, built incrementally into history_store/portfolio.npz
+# python .\portfolio.py
+#       Ingests new snapshots, then prints the last 10 collection totals (Sum of Min) of the last 3 years.
+#       python .\cli.py portfolio --since 3y --csv portfolio.csv --chart portfolio.png for exports and charts.
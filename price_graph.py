@@ -1,11 +1,24 @@
 from datetime import datetime  # Goes first
 import datetime  # Goes Second
-import matplotlib.dates
-import matplotlib.pyplot as plt
-from matplotlib.offsetbox import AnchoredOffsetbox, TextArea, VPacker
-from mplcursors import cursor
+import os
+import re
+import sys
+import time
 from decklist_gallery import DeckBuilder
-from utils import find_lines_of_all_input, get_date_price_value_list, calculate_difference_between_timedelta
+from collection_model import get_collection
+from utils import get_number_out_of_string, calculate_difference_between_timedelta
+
+# Configs
+chart_root = 'price_charts'  # Batch charts land in price_charts/<deck, list or collection>/<card>.png
+chart_format = 'png'  # or 'svg'
+chart_size = (10, 5)
+chart_dpi = 100
+chart_workers = None  # Render processes, None for one per CPU
+chart_period = None  # None plots every scraped point, 'weekly' / 'monthly' plots the last value with a min-max band
+downsample_charts = True  # Plot at most the min and max point per pixel column, spikes stay, hover stays quick
+timedelta_list = [7, 14, 30, 60, 90, 180, 365, 730, 1460]
+
+_chart_figure = None  # One figure per render process, redrawn for every card
 
 
 # Price Graph Chart
@@ -42,33 +55,80 @@ def get_pricing_time_period(year):
     return pricing_variable_full[year]
 
 
-def get_price_graph(card_name):
-    pricing_variable_full = get_pricing_time_period(2023)
-
-    fig = plt.figure(figsize=(10, 5))
+def parse_price_table(lines):
+    # One pass over a sorted price file: (date, card cell, value) per row in file order, values <= 1 dropped like
+    # get_date_price_value_list. The date comes from the "<list> - <date>" title above each table.
+    rows = []
+    date = None
+    previous = ''
+    for line in lines:
+        if '--------' in line:
+            if '|' not in previous and '--------' not in previous:
+                dates = re.findall(r'\d{4}-\d{2}-\d{2}', previous)
+                date = dates[0] if dates else None
+        elif line.startswith('|') and date is not None:
+            try:
+                value = get_number_out_of_string(line)
+            except IndexError:  # The Card | Price header row
+                continue
+            if value > 1:
+                rows.append((date, line.split('|')[1].strip(), value))
+        previous = line
+    return rows
+
+
+def load_price_history(pricing_variable_full, card_names):
+    """{card: [(label, dates, values), ...]} for many cards, reading every sorted price file once.
+
+    A card matches every row whose name contains it, as find_lines_of_all_input does, so 'Honest' also
+    picks up 'Honest Ghost 1st'. Tables without a single point for a card are left out.
+    """
+    history = {card_name: [] for card_name in card_names}
+    for price_table in pricing_variable_full:
+        with open('sorted_pricing/' + price_table[0], 'r') as file:
+            rows = parse_price_table(file)
+        rows_by_name = {}
+        for index, row in enumerate(rows):
+            rows_by_name.setdefault(row[1], []).append(index)
+        for card_name in card_names:
+            indexes = sorted(index for name, found in rows_by_name.items() if card_name in name for index in found)
+            if indexes:
+                history[card_name].append((price_table[1], [rows[index][0] for index in indexes],
+                                           [rows[index][2] for index in indexes]))
+    return history
+
+
+def plot_series(ax, label, dates, values, pixel_width):
+    # Differences above always use every point, only what gets drawn is reduced
+    import numpy as np
+    import downsample
+    dates = np.array(dates, dtype='datetime64[D]')
+    values = np.asarray(values, dtype=np.float64)
+    if chart_period:
+        dates, lows, highs, values = downsample.rollup(dates, values, chart_period)
+        line = ax.plot(dates.astype(datetime.date), values, marker='.', label=label)[0]
+        ax.fill_between(dates.astype(datetime.date), lows, highs, color=line.get_color(), alpha=0.2, linewidth=0)
+        return
+    if downsample_charts:
+        keep = downsample.minmax_downsample(dates, values, max(int(pixel_width), 1))
+        dates, values = dates[keep], values[keep]
+    ax.plot(dates.astype(datetime.date), values, marker='.', label=label)
+
+
+def draw_price_chart(fig, card_name, series, rarity):
+    # Clears and redraws fig, so one figure can be reused for every card of a batch
+    import matplotlib.dates
+    from matplotlib.offsetbox import AnchoredOffsetbox, TextArea, VPacker
+    fig.clf()
+    ax = fig.add_subplot(111)
 
-    data_lock = False
     difference_data_summary = []
+    for label, dates, values in series:
+        if not difference_data_summary:  # Differences of the first table only
+            for delta in timedelta_list:
+                difference_data_summary.append(calculate_difference_between_timedelta(dates, values, delta)[2])
+        plot_series(ax, label, dates, values, fig.get_figwidth() * fig.dpi)
 
-    timedelta_list = [7, 14, 30, 60, 90, 180, 365, 730, 1460]
-    for price_table in pricing_variable_full:
-        price_table_path_root = 'sorted_pricing/'
-        with open(price_table_path_root + price_table[0], 'r') as file:
-            lines = file.readlines()  # Raw text taken from .txt
-        line_numbers = find_lines_of_all_input(card_name, lines)
-        plot_points = get_date_price_value_list(line_numbers, lines)
-        dates = [item[0] for item in plot_points]
-        values = [item[1] for item in plot_points]
-
-        for delta in timedelta_list:
-            difference, percent_diff, percent_diff_data_formatted_string, _ = calculate_difference_between_timedelta(dates, values, delta)
-            if not data_lock:
-                difference_data_summary.append(percent_diff_data_formatted_string)
-        dates = [datetime.datetime.strptime(date, '%Y-%m-%d').date() for date in dates]
-        plt.plot(dates, values, marker='.', label=price_table[1])
-        data_lock = True
-
-    ax = plt.subplot(111)
     ax.set_ylim(ymin=0)
     text_to_add = []
     for entry in difference_data_summary:
@@ -78,24 +138,116 @@ def get_price_graph(card_name):
     anchored_box = AnchoredOffsetbox(loc=5, child=box, pad=0.1, frameon=True,
                                      bbox_to_anchor=(1, 0.20), bbox_transform=ax.transAxes, borderpad=0., )
     ax.add_artist(anchored_box)
-    plt.gca().fmt_xdata = matplotlib.dates.DateFormatter("%d-%b-%Y")
+    ax.fmt_xdata = matplotlib.dates.DateFormatter("%d-%b-%Y")
+
+    ax.set_title('{} {}'.format(card_name, rarity))
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Value')
+    ax.legend()
+    return ax
 
-    rarity = get_rarity_from_card_code(card_name)
-    plt.title('{} {}'.format(card_name, rarity))
-    plt.xlabel('Date')
-    plt.ylabel('Value')
+
+def get_price_graph(card_name):
+    import matplotlib.pyplot as plt  # Plotting libraries only load once a graph is drawn
+    from mplcursors import cursor
+    series = load_price_history(get_pricing_time_period(2023), [card_name])[card_name]
+    if not series:
+        print('No price history for {}'.format(card_name))
+        return
+
+    fig = plt.figure(figsize=chart_size)
+    draw_price_chart(fig, card_name, series, get_rarity_from_card_code(card_name))
     cursor(hover=True)  # Allows hovering over points
-    plt.legend()
     plt.show()
 
 
+# Batch charts #
+
+
+def chart_cards(source):
+    """Card names of a deck or list from the collection, or of every scraped list for 'collection'"""
+    collection = get_collection()
+    if source == 'collection':
+        card_sets = list(collection.lists.values())
+    elif source in collection.lists:
+        card_sets = [collection.lists[source]]
+    elif source in collection.decks:
+        deck = collection.decks[source].get_yaml_data()
+        return list(dict.fromkeys(card.rstrip('.') for node in deck if node != 'Header'
+                                  for card in (deck[node] or {}) if card != 'None'))
+    else:
+        raise ValueError('{} is not a list, a deck or collection'.format(source))
+    return list(dict.fromkeys(card for card_set in card_sets for card in (card_set.get_yaml_data() or {})))
+
+
+def card_rarity(card_name, catalogue):
+    # get_rarity_from_card_code without the warning, list names such as 'Honest Ghost 1st' aren't catalogue keys
+    codes = catalogue.get(card_name)
+    return codes[0].split('-')[3] if codes else ''
+
+
+def chart_file_name(card_name, file_format):
+    return re.sub(r'[\\/:*?"<>|]', '_', card_name) + '.' + file_format
+
+
+def init_chart_worker():
+    global _chart_figure
+    from matplotlib.figure import Figure  # Agg canvas, no pyplot / GUI backend in batch mode
+    _chart_figure = Figure(figsize=chart_size)
+
+
+def render_chart(task):
+    card_name, series, rarity, output_path = task
+    if _chart_figure is None:
+        init_chart_worker()
+    draw_price_chart(_chart_figure, card_name, series, rarity)
+    _chart_figure.savefig(output_path, dpi=chart_dpi)
+    return output_path
+
+
+def batch_price_graphs(source, file_format=chart_format, workers=chart_workers):
+    """Charts for every card of a deck, list or the whole collection, saved under price_charts/<source>/"""
+    start = time.perf_counter()
+    card_names = chart_cards(source)
+    history = load_price_history(get_pricing_time_period(2023), card_names)
+    loaded = time.perf_counter()
+
+    output_directory = os.path.join(chart_root, source)
+    os.makedirs(output_directory, exist_ok=True)
+    catalogue = get_collection().catalogue
+    tasks = [(card_name, history[card_name], card_rarity(card_name, catalogue),
+              os.path.join(output_directory, chart_file_name(card_name, file_format)))
+             for card_name in card_names if history[card_name]]
+    missing = [card_name for card_name in card_names if not history[card_name]]
+
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(tasks) < 4 * workers:  # Starting processes costs more than a few charts
+        chart_paths = [render_chart(task) for task in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_chart_worker) as executor:
+            chart_paths = list(executor.map(render_chart, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+    print('{} charts in {} (history {:.1f}s, render {:.1f}s)'.format(
+        len(chart_paths), output_directory, loaded - start, time.perf_counter() - loaded))
+    if missing:
+        print('No price history for: {}'.format(', '.join(missing)))
+    return chart_paths
+
+
 if __name__ == '__main__':
     deckbuilder = DeckBuilder()
     card_code_list = deckbuilder.get_card_code_list()
-    get_price_graph('Demise King of Armageddon')
+    if len(sys.argv) > 1:
+        batch_price_graphs(sys.argv[1], *sys.argv[2:3])
+    else:
+        get_price_graph('Demise King of Armageddon')
 
 # Script will generate a graph based on card name and pricing_variable_full
 #       Simply select which time period you want to scrape from, via get_pricing_time_period()
 #       Provides on-demand data, based on already saved .txt database. Does not save any new data.
 
 #  python .\price_graph.py
+# Batch mode, every card of a deck / list / the whole collection saved as png (or svg), no clicking through windows:
+#  python .\price_graph.py collection
+#  python .\price_graph.py 2009-02-teledad svg
@@ -0,0 +1,136 @@
+import json
+import math
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# Configs
+scrape_timing_root = 'scrape_timing'  # Trace files land in scrape_timing/<list>-<date>.jsonl
+slowest_cards_shown = 10
+
+# Per card phases, in the order scrape_website runs them
+CARD_PHASES = ['navigate', 'wait', 'sleep', 'page_source', 'parse', 'extra_pages', 'extract', 'stats',
+               'write_min', 'write_max', 'write_mean', 'write_median']
+
+
+def percentile(sorted_values, percent):
+    # Nearest rank, sorted_values must already be sorted
+    if not sorted_values:
+        return 0.0
+    rank = max(int(math.ceil(percent / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[rank]
+
+
+class ScrapeTimer:
+    # Records wall time per phase for every card of one list scrape, then prints a summary and writes a trace.
+
+    def __init__(self, list_name, trace_root=scrape_timing_root):
+        self.list_name = list_name
+        self.trace_root = trace_root
+        self.started = time.time()
+        self.cards = []  # {'card', 'status', 'phases': {phase: seconds}, 'total'}
+        self.list_phases = {}  # Phases that run once per list, e.g. the snapshot write
+        self.current = None
+        self.card_start = 0.0
+
+    def start_card(self, card):
+        self.current = {'card': card, 'status': 'ok', 'phases': {}, 'total': 0.0}
+        self.card_start = time.perf_counter()
+
+    def end_card(self, status='ok'):
+        if self.current is None:
+            return
+        self.current['status'] = status
+        self.current['total'] = time.perf_counter() - self.card_start
+        self.cards.append(self.current)
+        self.current = None
+
+    @contextmanager
+    def phase(self, name):
+        phases = self.current['phases'] if self.current is not None else self.list_phases
+        start = time.perf_counter()
+        try:
+            yield
+        finally:  # A timed out wait still counts towards the card
+            phases[name] = phases.get(name, 0.0) + time.perf_counter() - start
+
+    def phase_names(self):
+        names = [name for name in CARD_PHASES if any(name in card['phases'] for card in self.cards)]
+        for card in self.cards:
+            for name in card['phases']:
+                if name not in names:
+                    names.append(name)
+        return names
+
+    def summary_lines(self):
+        lines = ['Timing for {}: {} cards in {:.1f}s'.format(self.list_name, len(self.cards),
+                                                             time.time() - self.started)]
+        lines.append('{:<14}{:>10}{:>10}{:>10}{:>12}'.format('Phase', 'p50', 'p95', 'max', 'total'))
+        for name in self.phase_names() + ['total']:
+            if name == 'total':
+                values = sorted(card['total'] for card in self.cards)
+            else:
+                values = sorted(card['phases'][name] for card in self.cards if name in card['phases'])
+            lines.append('{:<14}{:>10.3f}{:>10.3f}{:>10.3f}{:>12.1f}'.format(
+                name, percentile(values, 50), percentile(values, 95), values[-1] if values else 0.0, sum(values)))
+        for name, seconds in self.list_phases.items():
+            lines.append('{:<14}{:>42.3f}'.format(name, seconds))
+
+        slowest = sorted(self.cards, key=lambda card: card['total'], reverse=True)[:slowest_cards_shown]
+        if slowest:
+            lines.append('Slowest cards:')
+            for card in slowest:
+                top_phase = max(card['phases'], key=card['phases'].get) if card['phases'] else '-'
+                lines.append('    {:>7.2f}s  {} ({}, mostly {})'.format(card['total'], card['card'],
+                                                                       card['status'], top_phase))
+        return lines
+
+    def print_summary(self):
+        for line in self.summary_lines():
+            print(line)
+
+    def write_trace(self):
+        # One JSON object per card, then one for the list level phases
+        os.makedirs(self.trace_root, exist_ok=True)
+        trace_path = os.path.join(self.trace_root, '{}-{}.jsonl'.format(
+            self.list_name, datetime.now().strftime('%Y-%m-%d_%H%M%S')))
+        with open(trace_path, 'w', encoding='utf-8') as trace:
+            for card in self.cards:
+                trace.write(json.dumps({'list': self.list_name, **card}) + '\n')
+            trace.write(json.dumps({'list': self.list_name, 'card': None, 'status': 'list',
+                                    'phases': self.list_phases, 'total': time.time() - self.started}) + '\n')
+        return trace_path
+
+
+class NullTimer:
+    # Stands in for ScrapeTimer when timing is switched off, every call is a no-op
+
+    def start_card(self, card):
+        pass
+
+    def end_card(self, status='ok'):
+        pass
+
+    @contextmanager
+    def phase(self, name):
+        yield
+
+
+def load_trace(trace_path):
+    with open(trace_path, 'r', encoding='utf-8') as trace:
+        return [json.loads(line) for line in trace if line.strip()]
+
+
+if __name__ == '__main__':
+    import sys
+    for path in sys.argv[1:]:
+        records = load_trace(path)
+        timer = ScrapeTimer(records[0]['list'] if records else path)
+        timer.cards = [record for record in records if record['status'] != 'list']
+        timer.list_phases = next((record['phases'] for record in records if record['status'] == 'list'), {})
+        timer.started = time.time() - next((record['total'] for record in records if record['status'] == 'list'), 0)
+        timer.print_summary()
+
+# Summarises saved traces again without scraping
+# python .\scrape_timing.py scrape_timing\<list>-<date>.jsonl
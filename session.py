@@ -0,0 +1,282 @@
+import json
+import os
+import re
+import threading
+import time
+from selenium import webdriver
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.wait import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+# Configs
+profile_root = 'browser_profiles'  # One Chrome user data dir per worker, kept between runs for its cache
+session_file = 'browser_profiles/session.json'  # Cookies and local storage saved after the one time setup
+readiness_url = 'https://www.tcgplayer.com/product/33224?Language=English&page=1&Condition=Near+Mint&ListingType=standard'
+site_url = 'https://www.tcgplayer.com/'
+view_count = 50  # Listings per page the session must show, picked by hand once then restored every run
+readiness_timeout = 20
+headless = False
+
+recycle_after_pages = 300  # Fresh Chrome after this many page loads
+recycle_above_rss_mb = 1500  # ... or once Chrome's processes use more than this, needs psutil
+block_page_assets = True  # Listing pages only need the DOM text, skip images, fonts and CSS
+blocked_url_patterns = ['*.css', '*.woff', '*.woff2', '*.ttf', '*.otf', '*.png', '*.jpg', '*.jpeg', '*.gif',
+                        '*.webp', '*.svg']
+metrics_window_pages = 50
+
+try:
+    import psutil
+except ImportError:  # Optional, without it recycling is by page count only
+    psutil = None
+
+showing_pattern = re.compile(r'Showing\s+1\s*-\s*(\d+)\s+of\s+(\d[\d,]*)', re.IGNORECASE)
+
+
+def worker_profile_dir(worker_id=0):
+    # Chrome locks its user data dir, so every worker gets its own; the login comes from session_file
+    worker_profile = os.path.abspath(os.path.join(profile_root, 'worker-{}'.format(worker_id)))
+    os.makedirs(worker_profile, exist_ok=True)
+    return worker_profile
+
+
+def chrome_options(worker_id=0, extra_arguments=(), prefs=None):
+    options = webdriver.ChromeOptions()
+    options.add_argument('--user-data-dir={}'.format(worker_profile_dir(worker_id)))
+    if headless:
+        options.add_argument('--headless=new')
+    for argument in extra_arguments:
+        options.add_argument(argument)
+    if prefs:
+        options.add_experimental_option('prefs', prefs)
+    return options
+
+
+def start_browser(worker_id=0, extra_arguments=(), prefs=None):
+    return webdriver.Chrome(options=chrome_options(worker_id, extra_arguments, prefs))
+
+
+# Saved session #
+
+
+def save_session(browser, path=session_file):
+    # Cookies plus local storage, which is where the site keeps preferences such as the view count
+    local_storage = browser.execute_script(
+        'var items = {}; for (var i = 0; i < localStorage.length; i++) {'
+        ' var key = localStorage.key(i); items[key] = localStorage.getItem(key); } return items;')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + '.tmp', 'w') as file:
+        json.dump({'saved': time.time(), 'cookies': browser.get_cookies(), 'local_storage': local_storage}, file,
+                  indent=1)
+    os.replace(path + '.tmp', path)
+
+
+def restore_session(browser, path=session_file):
+    if not os.path.exists(path):
+        return False
+    with open(path, 'r') as file:
+        saved = json.load(file)
+    browser.get(site_url)  # Cookies can only be set for the domain currently open
+    for cookie in saved.get('cookies', []):
+        if cookie.get('sameSite') not in ('Strict', 'Lax', 'None'):
+            cookie.pop('sameSite', None)
+        try:
+            browser.add_cookie(cookie)
+        except Exception as e:
+            print('Skipping cookie {}: {}'.format(cookie.get('name'), e))
+    for key, value in saved.get('local_storage', {}).items():
+        browser.execute_script('localStorage.setItem(arguments[0], arguments[1]);', key, value)
+    return True
+
+
+def is_ready(browser, timeout=readiness_timeout):
+    # Ready means listings load and, when the card has enough of them, the first page shows view_count listings
+    browser.get(readiness_url)
+    try:
+        WebDriverWait(browser, timeout).until(
+            EC.presence_of_element_located((By.CLASS_NAME, 'product-details__listings')))
+    except Exception:
+        print('Readiness check: listings did not load')
+        return False
+    match = showing_pattern.search(browser.find_element(By.TAG_NAME, 'body').text)
+    if match:
+        shown, total = int(match.group(1)), int(match.group(2).replace(',', ''))
+        if shown < min(view_count, total):
+            print('Readiness check: page shows {} listings, expected {}'.format(shown, view_count))
+            return False
+    return True
+
+
+def bootstrap_session(worker_id=0, interactive=None, extra_arguments=(), prefs=None):
+    """Browser for one worker with the saved session restored and checked, no prompt once a session was saved"""
+    if interactive is None:
+        interactive = not os.path.exists(session_file)
+    browser = start_browser(worker_id, extra_arguments, prefs)
+    if restore_session(browser) and is_ready(browser):
+        return browser
+    if not interactive:
+        browser.quit()
+        raise RuntimeError('Saved browser session for worker {} is not ready, run once with a person present: '
+                           'python .\\session.py'.format(worker_id))
+
+    browser.get(readiness_url)
+    input('Log in and select the {} view count, then press Enter: '.format(view_count))
+    save_session(browser)
+    if not is_ready(browser):
+        print('Warning: session still does not look ready, continuing anyway')
+    return browser
+
+
+# Long runs #
+
+
+class BrowserSession:
+    # Wraps the Chrome driver for a whole run. Recycles it after recycle_after_pages loads or once it grows past
+    # recycle_above_rss_mb, swapping in a spare that was started in the background so the run does not stall.
+    # Every other attribute (page_source, find_element, switch_to, ...) is passed through to the current driver.
+
+    def __init__(self, worker_id=0, keep_spare=True):
+        self.worker_id = worker_id
+        self.keep_spare = keep_spare
+        self.slot = 0  # Alternates between two profile dirs, the live driver and its spare can't share one
+        self.driver = self.start_driver(self.slot, interactive=None)
+        self.spare = None
+        self.spare_thread = None
+        self.quit_thread = None  # Old driver shutting down, it holds its slot's profile lock until it exits
+        self.pages_on_driver = 0
+        self.recycles = 0
+        self.page_log = []  # (finished at, seconds in get(), rss MB or None) per page load
+        self.started = time.time()
+        if keep_spare:
+            self.start_spare()
+
+    def __getattr__(self, name):
+        if name == 'driver':  # Not started yet
+            raise AttributeError(name)
+        return getattr(self.driver, name)
+
+    def profile_id(self, slot):
+        return '{}-{}'.format(self.worker_id, slot)
+
+    def start_driver(self, slot, interactive=False):
+        prefs = None
+        if block_page_assets:
+            prefs = {'profile.managed_default_content_settings.images': 2}
+        driver = bootstrap_session(self.profile_id(slot), interactive=interactive, prefs=prefs)
+        if block_page_assets:
+            try:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': blocked_url_patterns})
+            except Exception as e:  # Only Chromium drivers speak CDP
+                print('Could not block page assets: {}'.format(e))
+        return driver
+
+    def start_spare(self):
+        quit_thread = self.quit_thread
+
+        def warm_up():
+            if quit_thread is not None:  # The spare reuses the old driver's profile dir, wait for it to let go
+                quit_thread.join()
+            try:
+                self.spare = self.start_driver(1 - self.slot)
+            except Exception as e:
+                print('Spare browser failed to start: {}'.format(e))
+                self.spare = None
+        self.spare_thread = threading.Thread(target=warm_up, daemon=True)
+        self.spare_thread.start()
+
+    def rss_mb(self):
+        if psutil is None:
+            return None
+        try:
+            process = psutil.Process(self.driver.service.process.pid)
+            processes = [process] + process.children(recursive=True)
+            return sum(child.memory_info().rss for child in processes) / (1024 * 1024)
+        except (AttributeError, psutil.Error):
+            return None
+
+    def needs_recycle(self, rss):
+        if self.pages_on_driver >= recycle_after_pages:
+            return True
+        return rss is not None and rss >= recycle_above_rss_mb
+
+    def recycle(self):
+        old_driver = self.driver
+        if self.spare_thread is not None:
+            self.spare_thread.join()
+        if self.spare is not None:
+            self.driver, self.spare = self.spare, None
+            self.slot = 1 - self.slot
+        else:
+            old_driver.quit()
+            old_driver = None
+            self.driver = self.start_driver(self.slot)
+        self.pages_on_driver = 0
+        self.recycles += 1
+        print('Recycled browser after {} pages ({} recycles)'.format(len(self.page_log), self.recycles))
+        if old_driver is not None:
+            self.quit_thread = threading.Thread(target=old_driver.quit, daemon=True)
+            self.quit_thread.start()
+        if self.keep_spare:
+            self.start_spare()
+
+    def get(self, url):
+        rss = self.page_log[-1][2] if self.page_log else None
+        if self.needs_recycle(rss):
+            self.recycle()
+        start = time.perf_counter()
+        self.driver.get(url)
+        finished = time.perf_counter()
+        self.pages_on_driver += 1
+        # RSS is sampled every tenth page, walking Chrome's process tree is not free
+        rss = self.rss_mb() if self.pages_on_driver % 10 == 0 else (self.page_log[-1][2] if self.page_log else None)
+        self.page_log.append((time.time(), finished - start, rss))
+
+    def metrics(self, window=metrics_window_pages):
+        # Pages/sec, mean get() seconds and last RSS per window of page loads, to check the rate stays flat
+        rows = []
+        previous_end = self.started
+        for first in range(0, len(self.page_log), window):
+            pages = self.page_log[first:first + window]
+            elapsed = pages[-1][0] - previous_end
+            rows.append({'pages': first + len(pages), 'pages_per_sec': len(pages) / elapsed if elapsed > 0 else 0.0,
+                         'mean_get_seconds': sum(page[1] for page in pages) / len(pages), 'rss_mb': pages[-1][2]})
+            previous_end = pages[-1][0]
+        return rows
+
+    def print_metrics(self):
+        print('{:>8}{:>12}{:>12}{:>10}'.format('Pages', 'Pages/sec', 'get() s', 'RSS MB'))
+        for row in self.metrics():
+            print('{:>8}{:>12.3f}{:>12.2f}{:>10}'.format(row['pages'], row['pages_per_sec'], row['mean_get_seconds'],
+                                                         '-' if row['rss_mb'] is None else int(row['rss_mb'])))
+        print('Browser recycles: {}'.format(self.recycles))
+
+    def quit(self):
+        if self.spare_thread is not None:
+            self.spare_thread.join()
+        if self.quit_thread is not None:
+            self.quit_thread.join()
+        for driver in (self.driver, self.spare):
+            if driver is not None:
+                driver.quit()
+        self.spare = None
+
+
+# Workers #
+
+
+def shard_lists(card_lists, worker_count=1, worker_id=0):
+    # Round robin over lists.yaml order so every worker gets a similar mix of big and small lists.
+    # Workers still share sorted_pricing/, so run each one from its own working copy / machine.
+    return [list_name for index, list_name in enumerate(card_lists) if index % worker_count == worker_id]
+
+
+if __name__ == '__main__':
+    setup_browser = bootstrap_session(interactive=True)
+    save_session(setup_browser)
+    setup_browser.quit()
+    print('Session saved to {}'.format(session_file))
+
+# One time setup, saves cookies / local storage after logging in and picking the view count by hand:
+# python .\session.py
+# After that main.py starts without any prompt, optionally as one of N workers:
+# python .\main.py <worker id> <worker count>
@@ -1,17 +1,13 @@
 from datetime import datetime
-from bs4 import BeautifulSoup
 import time
 from time import gmtime
 from time import strftime
-import prettytable
-import yaml
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.wait import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
+from yaml_io import read_config, read_yaml, write_yaml
 from csv import DictWriter
+import json
 import os
 import re
-import statistics
+from scrape_timing import NullTimer, ScrapeTimer
 
 base_url = 'https://www.tcgplayer.com/product/'
 current_date = str(datetime.date(datetime.now()))
@@ -19,6 +15,16 @@ current_year_full = datetime.now().strftime('%Y')  # 2018
 current_month = datetime.now().strftime('%m')  # 02 //This is 0 padded
 current_month_text = datetime.now().strftime('%h')  # Feb
 current_day = datetime.now().strftime('%d')  # // 23 //This is also padded
+price_table_columns = ['Min', 'Max', 'Mean', 'Median']
+listing_wait_seconds = 10  # Max wait for the listings element before a card counts as a timeout
+listing_settle_seconds = 6  # Fixed wait after the listings appear so every listing has rendered
+listing_trim_method = 'median_band'  # Outlier trimming, one of listing_stats.TRIM_METHODS
+fetch_all_listing_pages = True  # Open page 2, 3, ... in parallel tabs when a card has more listings than one page
+listings_per_page = 50  # View count picked at login
+max_listing_pages = 10
+listing_count_patterns = [re.compile(r'\bof\s+(\d[\d,]*)\s+(?:Listings|Results)', re.IGNORECASE),
+                          re.compile(r'^\s*(\d[\d,]*)\s+Listings', re.IGNORECASE)]  # Only as the header itself
+record_scrape_timing = True  # Per card / per phase timings, summary printed and trace saved after each list
 
 
 def condition_edition_url_filters(condition_edition, language='english', photos=False):
@@ -50,68 +56,158 @@ def condition_edition_url_filters(condition_edition, language='english', photos=
 
 
 def scrape_website(card_data_yaml, list_name, browser):
-    delete_console_txt()
+    # Selenium is only needed while scraping, history tools import utils without it
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.wait import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    log = ListingLog(list_name)
+    timer = ScrapeTimer(list_name) if record_scrape_timing else NullTimer()
     start = time.time()
-    file_path = ''
 
-    timer = 10
     total_card_quantity = 0
     max_price_total = 0
     min_price_total = 0
     mean_price_total = 0
     median_price_total = 0
 
-    for card in card_data_yaml:
-        condition_edition = card_data_yaml[card]['edition']
-        card_quantity = card_data_yaml[card]['qty']
-
-        url_mod = condition_edition_url_filters(condition_edition)
-        url = '{}{}{}{}{}{}'.format(base_url, card_data_yaml[card]['url'], url_mod[0], url_mod[1], url_mod[2],
-                                    url_mod[3])
-        browser.get(url)
-
-        try:  # If it errors out here, might need to update chrome driver.
-            WebDriverWait(browser, timer).until(
-                EC.presence_of_element_located((By.CLASS_NAME, 'product-details__listings')))
-            time.sleep(6)
-            no_table = False
-        except:
-            output_to_txt_console('Timeout No Results for: {}'.format(card))
-            no_table = True
-        if no_table:
-            continue  # increments to the next element in for loop.
-
-        html = browser.page_source
-        soup = BeautifulSoup(html, 'html.parser')
-        for script in soup(['script', 'style']):
-            script.extract()
-
-        current_price_point_text = extract_listing_prices(soup, card)
-        data_prices_new = calculate_data_prices(current_price_point_text, card)
-
-        min_price_total += data_prices_new[0] * card_quantity
-        max_price_total += data_prices_new[1] * card_quantity
-        mean_price_total += data_prices_new[2] * card_quantity
-        median_price_total += data_prices_new[3] * card_quantity
-        total_card_quantity += card_quantity
-
-        price_yaml_generator(card, data_prices_new[0], 'sorted_pricing/min_prices.yaml')
-        price_yaml_generator(card, data_prices_new[1], 'sorted_pricing/max_prices.yaml')
-        price_yaml_generator(card, data_prices_new[2], 'sorted_pricing/mean_prices.yaml')
-        price_yaml_generator(card, data_prices_new[3], 'sorted_pricing/median_prices.yaml')
-
-        my_table = create_pretty_table(data_prices_new)
-        file_path = output_to_txt(card, my_table, card_quantity, condition_edition, list_name, data_prices_new[4])
-
-    output_to_txt_console('Sum of Min Listed: ${:,.2f}'.format(min_price_total))
-    output_to_txt_console('Sum of Max Listed: ${:,.2f}'.format(max_price_total))
-    output_to_txt_console('Sum of Mean Listed: ${:,.2f}'.format(mean_price_total))
-    output_to_txt_console('Sum of Median Listed: ${:,.2f}'.format(median_price_total))
+    try:
+        for card in card_data_yaml:
+            condition_edition = card_data_yaml[card]['edition']
+            card_quantity = card_data_yaml[card]['qty']
+            timer.start_card(card)
+
+            url_mod = condition_edition_url_filters(condition_edition)
+            url = '{}{}{}{}{}{}'.format(base_url, card_data_yaml[card]['url'], url_mod[0], url_mod[1], url_mod[2],
+                                        url_mod[3])
+            with timer.phase('navigate'):
+                browser.get(url)
+
+            try:  # If it errors out here, might need to update chrome driver.
+                with timer.phase('wait'):
+                    WebDriverWait(browser, listing_wait_seconds).until(
+                        EC.presence_of_element_located((By.CLASS_NAME, 'product-details__listings')))
+                with timer.phase('sleep'):
+                    time.sleep(listing_settle_seconds)
+                no_table = False
+            except:
+                log.output_to_console('Timeout No Results for: {}'.format(card))
+                log.add_timeout(card, card_quantity, condition_edition)
+                no_table = True
+            if no_table:
+                timer.end_card('timeout')
+                continue  # increments to the next element in for loop.
+
+            with timer.phase('page_source'):
+                html = browser.page_source
+            with timer.phase('parse'):
+                soup = html_to_soup(html)
+
+            extra_pages = []
+            if fetch_all_listing_pages:
+                page_urls = listing_page_urls(url, get_total_listing_count(soup))
+                if page_urls:
+                    with timer.phase('extra_pages'):
+                        extra_pages = [html_to_soup(page_html) for page_html in fetch_listing_pages(browser, page_urls)]
+
+            with timer.phase('extract'):
+                current_price_point_text = extract_listing_prices(soup, card, extra_pages)
+            with timer.phase('stats'):
+                data_prices_new = calculate_data_prices(current_price_point_text, card, log)
+
+            min_price_total += data_prices_new[0] * card_quantity
+            max_price_total += data_prices_new[1] * card_quantity
+            mean_price_total += data_prices_new[2] * card_quantity
+            median_price_total += data_prices_new[3] * card_quantity
+            total_card_quantity += card_quantity
+
+            with timer.phase('write_min'):
+                price_yaml_generator(card, data_prices_new[0], 'sorted_pricing/min_prices.yaml')
+            with timer.phase('write_max'):
+                price_yaml_generator(card, data_prices_new[1], 'sorted_pricing/max_prices.yaml')
+            with timer.phase('write_mean'):
+                price_yaml_generator(card, data_prices_new[2], 'sorted_pricing/mean_prices.yaml')
+            with timer.phase('write_median'):
+                price_yaml_generator(card, data_prices_new[3], 'sorted_pricing/median_prices.yaml')
+
+            log.add_entry(card, data_prices_new, card_quantity, condition_edition)
+            timer.end_card('ok' if data_prices_new[4] else 'missing')
+
+        log.output_to_console('Sum of Min Listed: ${:,.2f}'.format(min_price_total))
+        log.output_to_console('Sum of Max Listed: ${:,.2f}'.format(max_price_total))
+        log.output_to_console('Sum of Mean Listed: ${:,.2f}'.format(mean_price_total))
+        log.output_to_console('Sum of Median Listed: ${:,.2f}'.format(median_price_total))
+    finally:
+        # A crash, timeout exception or Ctrl-C part way through still writes the cards scraped so far
+        # (and closes console.txt), as the per card appends used to
+        with timer.phase('write_snapshot'):
+            file_path = log.write()
     done = time.time()
     print_time_duration(done - start)
+    if record_scrape_timing:
+        timer.print_summary()
+        print('Timing trace: {}'.format(timer.write_trace()))
     return file_path, [min_price_total, max_price_total, mean_price_total, median_price_total], total_card_quantity
 
 
+def html_to_soup(html):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    for script in soup(['script', 'style']):
+        script.extract()
+    return soup
+
+
+def get_total_listing_count(soup):
+    # Heuristic, the header of the listings element reads like 'Showing 1 - 50 of 132 Listings' or '132 Listings'.
+    # Only that element is searched, counts elsewhere on the page (related products, seller stats) are not this card's
+    listings = soup.find(class_='product-details__listings')
+    if listings is None:
+        return None
+    page_text = listings.get_text()
+    for pattern in listing_count_patterns:
+        match = pattern.search(page_text)
+        if match:
+            return int(match.group(1).replace(',', ''))
+    return None
+
+
+def listing_page_urls(url, total_listings):
+    # URLs for page 2 onwards, nothing when the count is unknown or fits on the first page
+    if not total_listings or total_listings <= listings_per_page:
+        return []
+    page_count = min(-(-total_listings // listings_per_page), max_listing_pages)
+    base = re.sub(r'&page=\d+', '', url)
+    return ['{}&page={}'.format(base, page) for page in range(2, page_count + 1)]
+
+
+def fetch_listing_pages(browser, page_urls):
+    # All pages load at once in their own tabs, then each is read and closed, so extra pages cost about one load
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.wait import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    main_handle = browser.current_window_handle
+    existing_handles = set(browser.window_handles)
+    for page_url in page_urls:
+        browser.execute_script('window.open(arguments[0], "_blank");', page_url)
+    new_handles = [handle for handle in browser.window_handles if handle not in existing_handles]
+
+    pages = []
+    try:
+        time.sleep(listing_settle_seconds)
+        for handle in new_handles:
+            browser.switch_to.window(handle)
+            try:
+                WebDriverWait(browser, listing_wait_seconds).until(
+                    EC.presence_of_element_located((By.CLASS_NAME, 'product-details__listings')))
+                pages.append(browser.page_source)
+            except Exception:
+                print('Timeout on extra listing page: {}'.format(browser.current_url))
+            browser.close()
+    finally:
+        browser.switch_to.window(main_handle)
+    return pages
+
+
 def print_time_duration(time_duration):
     print('Runtime: {}'.format(strftime("%H:%M:%S", gmtime(int(time_duration)))))
 
@@ -126,21 +222,12 @@ def write_to_excel(column_names, price_dict, csv_name):
 
 
 def price_yaml_generator(card_name, price, yaml_name):
-    with open(yaml_name, 'r') as stream:
-        current_yaml = yaml.safe_load(stream)
-        current_yaml.update({card_name: price})
-
-    with open(yaml_name, 'w') as stream:
-        yaml.safe_dump(current_yaml, stream)
+    current_yaml = read_yaml(yaml_name)
+    current_yaml.update({card_name: price})
+    write_yaml(yaml_name, current_yaml)
     return 0
 
 
-def delete_console_txt():
-    console = 'sorted_pricing/console.txt'
-    with open(console, 'w') as f:
-        f.write('')
-
-
 def output_to_txt_console(string):
     print(string)
     txt_console = 'sorted_pricing/console.txt'
@@ -148,47 +235,118 @@ def output_to_txt_console(string):
         my_file.write(string + '\n')
 
 
-def output_to_txt(card_name, my_table, card_quantity, condition_edition, list_name, num_listings):
+def get_full_listing_file_path(list_name):
     yaml_name = list_name + '-' + current_date + '.txt'
-    directory = 'full_listings/{0}/{1}-{2}/{3}'.format(current_year_full,
-                                                       current_month,
-                                                       current_month_text,
-                                                       current_day)
-    try:
-        os.makedirs(directory)
-    except FileExistsError:
-        pass  # directory already exists
-
-    full_listing_file_path = 'full_listings/{0}/{1}-{2}/{3}/{4}'.format(current_year_full,
-                                                                        current_month,
-                                                                        current_month_text,
-                                                                        current_day, yaml_name)
-    with open(full_listing_file_path, 'a') as my_file:
-        my_file.write('{0} [{1}] - {2} <{3}>\n'.format(card_name, card_quantity, condition_edition, num_listings))
-        my_file.write(str(my_table) + '\n\n')
+    return 'full_listings/{0}/{1}-{2}/{3}/{4}'.format(current_year_full,
+                                                      current_month,
+                                                      current_month_text,
+                                                      current_day, yaml_name)
+
+
+def get_sidecar_file_path(full_listing_file_path):
+    # Machine readable twin of a full_listings snapshot, one JSON object per card
+    return os.path.splitext(full_listing_file_path)[0] + '.jsonl'
+
+
+class ListingLog:
+    # Buffers one list's console summary ("Missing Data for", "Sum of ...") and card results in memory,
+    # so its full_listings file is rendered in one pass and written once, summary first.
+    # A .jsonl sidecar with the same results (status ok / missing / timeout) is written alongside it.
+
+    def __init__(self, list_name, console_path='sorted_pricing/console.txt'):
+        self.list_name = list_name
+        self.console_lines = []
+        self.entries = []
+        self.records = []
+        self.console = open(console_path, 'w')  # One handle for the whole list, console.txt still mirrors the run
+
+    def output_to_console(self, string):
+        print(string)
+        self.console_lines.append(string + '\n')
+        self.console.write(string + '\n')
+
+    def add_entry(self, card_name, data_prices, card_quantity, condition_edition):
+        self.entries.append((card_name, data_prices, card_quantity, condition_edition))
+        self.records.append({'card': card_name, 'qty': card_quantity, 'condition': condition_edition,
+                             'min': data_prices[0], 'max': data_prices[1], 'mean': data_prices[2],
+                             'median': data_prices[3], 'listings': data_prices[4],
+                             'status': 'ok' if data_prices[4] else 'missing'})
+
+    def add_timeout(self, card_name, card_quantity, condition_edition):
+        self.records.append({'card': card_name, 'qty': card_quantity, 'condition': condition_edition,
+                             'min': None, 'max': None, 'mean': None, 'median': None, 'listings': None,
+                             'status': 'timeout'})
+
+    def render_entries(self):
+        rendered = []
+        for card_name, data_prices, card_quantity, condition_edition in self.entries:
+            rendered.append('{0} [{1}] - {2} <{3}>\n'.format(card_name, card_quantity, condition_edition, data_prices[4]))
+            rendered.append(render_price_table(data_prices) + '\n\n')
+        return ''.join(rendered)
+
+    def render_records(self):
+        return ''.join(json.dumps(record) + '\n' for record in self.records)
+
+    def write(self):
+        self.console.close()
+        if not self.entries:
+            return ''
+        full_listing_file_path = get_full_listing_file_path(self.list_name)
+        sidecar_file_path = get_sidecar_file_path(full_listing_file_path)
+        os.makedirs(os.path.dirname(full_listing_file_path), exist_ok=True)
+        previous_data = ''
+        previous_records = ''
+        if os.path.exists(full_listing_file_path):  # Same list scraped earlier today
+            with open(full_listing_file_path, 'r') as original:
+                previous_data = original.read()
+            if os.path.exists(sidecar_file_path):
+                with open(sidecar_file_path, 'r', encoding='utf-8') as original:
+                    previous_records = original.read()
+        write_file_atomic(full_listing_file_path,
+                          ''.join(self.console_lines) + '\n' + previous_data + self.render_entries())
+        write_file_atomic(sidecar_file_path, previous_records + self.render_records(), encoding='utf-8')
         return full_listing_file_path
 
 
-def create_pretty_table(data_prices):
-    my_table = prettytable.PrettyTable(['Min', 'Max', 'Mean', 'Median'])
-    my_table.add_row([data_prices[0], data_prices[1], data_prices[2], data_prices[3]])
-    return my_table
+def write_file_atomic(file_path, contents, encoding=None):
+    temp_file_path = file_path + '.tmp'
+    with open(temp_file_path, 'w', encoding=encoding) as my_file:
+        my_file.write(contents)
+    os.replace(temp_file_path, file_path)  # Never leaves a half written snapshot behind
+
 
+def center_cell(text, width):
+    # Same centring as PrettyTable: odd spare space goes right of odd length text, left of even length text
+    excess = width - len(text)
+    if excess % 2:
+        if len(text) % 2:
+            return ' ' * (excess // 2) + text + ' ' * (excess // 2 + 1)
+        return ' ' * (excess // 2 + 1) + text + ' ' * (excess // 2)
+    return ' ' * (excess // 2) + text + ' ' * (excess // 2)
 
-def calculate_data_prices(price_table, card):
+
+def render_price_table(data_prices):
+    # Byte identical to str() of a PrettyTable(['Min', 'Max', 'Mean', 'Median']) holding one row
+    values = [str(data_prices[0]), str(data_prices[1]), str(data_prices[2]), str(data_prices[3])]
+    widths = [max(len(header), len(value)) for header, value in zip(price_table_columns, values)]
+    border = '+' + '+'.join('-' * (width + 2) for width in widths) + '+'
+    header_row = '|' + '|'.join(' {} '.format(center_cell(header, width))
+                                for header, width in zip(price_table_columns, widths)) + '|'
+    value_row = '|' + '|'.join(' {} '.format(center_cell(value, width)) for value, width in zip(values, widths)) + '|'
+    return '\n'.join([border, header_row, border, value_row, border])
+
+
+def calculate_data_prices(price_table, card, log=None):
     if not price_table:
         print('No data found for {}'.format(card))
-        output_to_txt_console('Missing Data for:    {}'.format(card))
+        if log:
+            log.output_to_console('Missing Data for:    {}'.format(card))
+        else:
+            output_to_txt_console('Missing Data for:    {}'.format(card))
         return 0, 0, 0, 0, 0
-    card_prices = []
-    for item in price_table:
-        card_prices.append(int(item[0]))
-
-    min_val = (min(card_prices))
-    max_val = (max(card_prices))
-    mean_val = int((sum(card_prices) / len(card_prices)))
-    median_val = (statistics.median(card_prices))
-    num_listings = len(price_table)
+    import listing_stats  # NumPy, only loaded once listings are parsed
+    card_prices = [listing.price for listing in price_table]
+    min_val, max_val, mean_val, median_val, num_listings = listing_stats.data_prices(card_prices)
     # print('{} - Max: {}, Min: {}, Mean: {}, Median: {}, # Listings: {}'.format(
     #     card, max_val, min_val, mean_val, median_val, num_listings))
     return min_val, max_val, mean_val, median_val, num_listings
@@ -217,91 +375,92 @@ def calculate_data_prices(price_table, card):
 
 
 def get_card_lists(yaml_name):
-    with open(yaml_name, 'r') as stream:
-        try:
-            card_lists = yaml.safe_load(stream)
-        except yaml.YAMLError:
-            pass
-        return card_lists
+    return read_config(yaml_name)
 
 
-def extract_listing_prices(raw_html, card):
-    text_only = raw_html.get_text()
-    text_only = text_only.split('Clear All')[1].split('TCGplayer Core Value')[0]  # Last Configurable filter on Left hand side
-    # Previous = Ship To UNITED STATES
+class Listing:
+    # One seller listing off a product page
+    __slots__ = ('price', 'seller_sales', 'seller_rating')
 
-    list_extract = []
-    x = text_only.split('Shipping')
-    for item in x:
-        item = item.replace('\n', '')
-        list_extract.append(item)
+    def __init__(self, price, seller_sales, seller_rating):
+        self.price = price  # Whole dollars
+        self.seller_sales = seller_sales
+        self.seller_rating = seller_rating  # Percent, 0.0 when the page shows none
 
-    for item in list_extract:
-        if '$' not in item:
-            list_extract.remove(item)
+    def __repr__(self):
+        return 'Listing({}, {}, {})'.format(self.price, self.seller_sales, self.seller_rating)
 
-    second_list = []
-    for x in range(0, len(list_extract)):
-        second_list.append([0, 0, 0])
 
-    # Trim listings with "Free Shipping on Orders over $5"
-    for x in range(0, len(list_extract)):
-        if 'on Orders Over' in list_extract[x]:
-            list_extract[x] = list_extract[x][20:]  # trim out 'on Orders Over $511  '
+def extract_listing_prices(raw_html, card, extra_pages=()):
+    text_only = raw_html.get_text()
+    text_only = text_only.split('Clear All')[1].split('TCGplayer Core Value')[0]  # Last Configurable filter on Left hand side
+    # Previous = Ship To UNITED STATES
+    listings = parse_listings(text_only, card)
+    for page in extra_pages:  # Later pages of the same card, merged before trimming so stats see every listing
+        page_text = page.get_text()
+        if 'Clear All' in page_text:
+            listings += parse_listings(page_text.split('Clear All')[1].split('TCGplayer Core Value')[0], card)
+    return trim_listings(listings)
+
+
+def parse_listings(text_only, card):
+    # Every listing ends in its shipping line, so each chunk between 'Shipping's is one listing, parsed in one pass
+    listings = []
+    for item in text_only.replace('\n', '').split('Shipping'):
+        if '$' not in item:
+            continue
+        if 'on Orders Over' in item:  # Trim listings with "Free Shipping on Orders over $5"
+            item = item[20:]  # trim out 'on Orders Over $511  '
 
-    # Get Card Price
-    x = 0
-    for item in list_extract:
-        try:
-            price = item.split('$')[1].split('.')[0].replace(',', '')
-        except IndexError:
+        dollar_index = item.find('$')
+        if dollar_index < 0:
             print('Unexpected Index Error for {}. Skipping this one'.format(card))
             continue
+        price = item[dollar_index + 1:].split('.')[0].replace(',', '')
         try:
-            second_list[x][0] = int(price)
+            price = int(price)
         except ValueError:
             print('Value Error for {}. Skipping. Price: {}'.format(card, price))
-            second_list[x][0] = second_list[x - 1][0]
-        x += 1
+            price = listings[-1].price if listings else 0
 
-    # Get Seller # Sales
-    x = 0
-    for item in list_extract:
-        try:
-            seller_stats = item.split('Sales)')[0].split('(')[1]
-            second_list[x][1] = seller_stats
-        except IndexError:
-            print('Index Error for Seller Stats. Skipping')
-            second_list[x][1] = 0
-        x += 1
-
-    # Get Seller % Stat
-    x = 0
-    for item in list_extract:
-        percent_index = item.find('%')
-        percent_lower_bound = percent_index - 4
-        seller_percent = item[percent_lower_bound:percent_index]
-        result = re.sub(r'[^0-9\.]', '', seller_percent)
-        second_list[x][2] = result
-        x += 1
-
-    # trim second_list for listings out of iqr range (1.5) - remove extremities
-    calc_median_list = []
-    for item in second_list:
-        calc_median_list.append(int(item[0]))
+        listings.append(Listing(price, parse_seller_sales(item), parse_seller_rating(item)))
+    return listings
+
+
+def parse_seller_sales(item):
+    # '(16238 Sales)' -> 16238
+    sales_index = item.find('Sales)')
+    open_index = item.rfind('(', 0, sales_index)
+    if sales_index < 0 or open_index < 0:
+        return 0
     try:
-        median_val = (statistics.median(calc_median_list))
-    except statistics.StatisticsError:
-        print('Empty list')
-        return second_list
+        return int(item[open_index + 1:sales_index].replace(',', ''))
+    except ValueError:
+        return 0
+
+
+def parse_seller_rating(item):
+    # '99.8%' -> 99.8, reads back from the first % so '100.0%' is not cut to '00.0'
+    percent_index = item.find('%')
+    start = percent_index
+    while start > 0 and item[start - 1] in '0123456789.':
+        start -= 1
+    try:
+        return float(item[start:percent_index]) if start < percent_index else 0.0
+    except ValueError:
+        return 0.0
+
 
-    trimmed_list = []
-    for x, item in enumerate(second_list):
-        if median_val / 2 < second_list[x][0] < median_val * 1.75:
-            trimmed_list.append(second_list[x])
-        # else:
-        #     print('Value outside IQR, skipping: {}'.format(second_list[x][0]))
-    return trimmed_list
+def trim_listings(listings):
+    # trim listings outside listing_trim_method's range - remove extremities
+    if not listings:
+        print('Empty list')
+        return listings
+    import listing_stats
+    keep = listing_stats.trim_mask([listing.price for listing in listings], listing_trim_method,
+                                   [listing.seller_sales for listing in listings],
+                                   [listing.seller_rating for listing in listings])
+    return [listing for listing, kept in zip(listings, keep) if kept]
 
 
 # def extract_text_only(input_html, edition):
@@ -331,15 +490,8 @@ def dollar_string_to_int(dollar_string):
 
 
 def sort_market_prices(yaml_name, name):
-    with open(yaml_name, 'r') as stream:
-        try:
-            yaml_data = yaml.safe_load(stream)
-            card_list = list()
-            for cards in yaml_data:
-                card_list.append(cards)
-        except yaml.YAMLError:
-            pass
-    yaml_data = yaml_data
+    import prettytable
+    yaml_data = read_yaml(yaml_name)
 
     prices_sorted = {k: v for k, v in sorted(yaml_data.items(), key=lambda x: x[1], reverse=True)}
 
@@ -358,19 +510,7 @@ def sort_market_prices(yaml_name, name):
 
 def delete_yaml_contents(yaml_name):
     test_dict = {'test': 0}
-    with open(yaml_name, 'w') as stream:
-        yaml.safe_dump(test_dict, stream)
-
-
-def append_console_to_txt(path):
-    console = 'sorted_pricing/console.txt'
-    with open(console, 'r') as console:
-        console_data = console.read()
-    with open(path, 'r') as original:
-        data = original.read()
-    with open(path, 'w') as modified:
-        modified.write(console_data + "\n" + data)
-    delete_console_txt()
+    write_yaml(yaml_name, test_dict)
 
 
 def sum_total_prices(current_sums, list_of_sums):
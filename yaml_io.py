@@ -0,0 +1,47 @@
+import os
+import yaml
+
+try:  # libyaml bindings, several times faster than the pure Python loader / dumper
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader, SafeDumper
+
+YAMLError = yaml.YAMLError
+WITH_LIBYAML = SafeLoader is not yaml.SafeLoader
+
+_config_cache = {}  # path -> ((mtime_ns, size), parsed yaml), see read_config()
+
+
+def file_stamp(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_yaml(stream):
+    # yaml.safe_load with the C loader when available, stream can also be a string
+    return yaml.load(stream, Loader=SafeLoader)
+
+
+def dump_yaml(data, stream=None, **kwargs):
+    # yaml.safe_dump with the C dumper when available, same defaults (sorted keys, block style)
+    return yaml.dump(data, stream, Dumper=SafeDumper, **kwargs)
+
+
+def read_yaml(path):
+    with open(path, 'r') as stream:
+        return load_yaml(stream)
+
+
+def write_yaml(path, data):
+    with open(path, 'w') as stream:
+        dump_yaml(data, stream)
+
+
+def read_config(path):
+    # Cached parse of a read only config (lists, decklists, card codes), reparsed only when the file changes.
+    # Every caller gets the same object back, so never modify it; use read_yaml() for files that get written.
+    stamp = file_stamp(path)
+    cached = _config_cache.get(path)
+    if cached is None or cached[0] != stamp:
+        cached = _config_cache[path] = (stamp, read_yaml(path))
+    return cached[1]